@@ -0,0 +1,24 @@
+"""Bearer-token checks for operator-only endpoints.
+
+Tokens come from the environment.  An endpoint whose token is unset is
+disabled and answers 404, as if it did not exist.
+"""
+from typing import Optional
+import hmac
+
+from fastapi import HTTPException, Request
+
+
+def token_matches(header: Optional[str], token: Optional[str]) -> bool:
+    """Whether an ``Authorization: Bearer ...`` header carries ``token``."""
+    if not token or not header or not header.startswith("Bearer "):
+        return False
+    return hmac.compare_digest(header[len("Bearer "):].encode(), token.encode())
+
+
+def check_bearer(request: Request, token: Optional[str]) -> None:
+    """Raise unless ``request`` is authorized by ``token``."""
+    if token is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not token_matches(request.headers.get("authorization"), token):
+        raise HTTPException(status_code=401, detail="Invalid token", headers={"WWW-Authenticate": "Bearer"})
@@ -0,0 +1,15 @@
+"""Benchmarks for the chat, graph, stock lookup and upload queue hot paths.
+
+Run from the repository root::
+
+    python -m benchmarks                    # every case
+    python -m benchmarks --quick            # skip the largest inputs
+    python -m benchmarks graph stock.query  # cases whose key starts with these
+    python -m benchmarks --compare benchmarks/results/baseline.json
+
+Inputs are generated from fixed seeds (graphs of 100, 10k and 100k boxes,
+a 500k-row stock report, a 100k-entry queue file).  Each case reports
+p50/p99 latency per operation, throughput and peak memory; a run's results
+are written as JSON under ``benchmarks/results`` and ``--compare`` exits
+non-zero when a case got slower or bigger than the baseline allows.
+"""
@@ -0,0 +1,108 @@
+"""Command line runner; see the package docstring."""
+from datetime import datetime, timezone
+from typing import List
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+
+from benchmarks import bench_chat, bench_graph, bench_queue, bench_stock  # noqa: F401 (registers the cases)
+from benchmarks.harness import CASES, compare, run_case
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+# Allowed growth of p50 latency and peak memory before --compare fails
+THRESHOLD = 0.25
+
+
+def _selected(patterns: List[str], quick: bool) -> List[str]:
+    keys = [key for key, registered in CASES.items() if not (quick and registered.slow)]
+    if patterns:
+        keys = [key for key in keys if any(key.startswith(pattern) for pattern in patterns)]
+    return keys
+
+
+def _run_isolated(key: str) -> dict:
+    """Run one case in a fresh interpreter so its peak memory is its own."""
+    with tempfile.NamedTemporaryFile(suffix=".json") as output:
+        subprocess.run([sys.executable, "-m", "benchmarks", "--case", key, "--case-output", output.name],
+                       cwd=ROOT, check=True)
+        with open(output.name) as f:
+            return json.load(f)
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def _summary(result: dict) -> str:
+    seconds = result["seconds"]
+    return (f"{result['key']:<40} p50 {seconds['p50'] * 1000:10.3f} ms  p99 {seconds['p99'] * 1000:10.3f} ms  "
+            f"{result['throughput']:12,.0f} {result['unit']}/s  peak {result['peak_rss_bytes'] / 2**20:7.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the benchmark suite")
+    parser.add_argument("patterns", nargs="*", help="run only cases whose key starts with one of these")
+    parser.add_argument("--quick", action="store_true", help="skip the cases on the largest inputs")
+    parser.add_argument("--list", action="store_true", help="list the selected cases and exit")
+    parser.add_argument("--output", help="results file (default: a new file in benchmarks/results)")
+    parser.add_argument("--compare", help="results file to compare against")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="relative growth that counts as a regression (default: %(default)s)")
+    parser.add_argument("--case", help=argparse.SUPPRESS)
+    parser.add_argument("--case-output", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        with open(args.case_output, "w") as f:
+            json.dump(run_case(args.case), f)
+        return
+
+    keys = _selected(args.patterns, args.quick)
+    if args.list:
+        print("\n".join(keys))
+        return
+    if not keys:
+        parser.error("no benchmark case matches")
+
+    started = datetime.now(timezone.utc)
+    results = []
+    for key in keys:
+        result = _run_isolated(key)
+        print(_summary(result), flush=True)
+        results.append(result)
+
+    output = args.output or os.path.join(RESULTS_DIR, started.strftime("%Y%m%dT%H%M%SZ") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({
+            "created": started.isoformat(),
+            "commit": _git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "quick": args.quick,
+            "results": results,
+        }, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(baseline, results, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""Chat endpoints of both apps: function suggestions and box creation."""
+import random
+
+from benchmarks.harness import case
+from json_response import dumps
+
+REQUESTS = 2000
+JSON = {"content-type": "application/json"}
+_MESSAGES = ["add two numbers", "string length", "format a message", "random number", "uppercase string",
+             "concatenate and add", "what can you do?", "multiply then format the result"]
+
+
+def _bodies():
+    rng = random.Random(1)
+    return [dumps({"message": rng.choice(_MESSAGES)}) for _ in range(REQUESTS)]
+
+
+def _post(client, path: str, body: bytes):
+    response = client.post(path, content=body, headers=JSON)
+    if response.status_code >= 400:
+        raise RuntimeError(f"POST {path}: {response.status_code} {response.text[:500]}")
+    return response
+
+
+@case("chat.suggest")
+def bench_suggest(recorder):
+    """``app.py``'s POST /api/chat."""
+    from fastapi.testclient import TestClient
+    import app
+    with TestClient(app.app) as client:
+        for body in _bodies():
+            recorder.time(lambda: _post(client, "/api/chat", body))
+
+
+@case("chat.boxes")
+def bench_boxes(recorder):
+    """``old_app``'s POST /chat, which adds the suggested boxes to the graph."""
+    from fastapi.testclient import TestClient
+    import old_app
+    with TestClient(old_app.app) as client:
+        for body in _bodies():
+            recorder.time(lambda: _post(client, "/chat", body))
@@ -0,0 +1,104 @@
+"""Graph editor endpoints of ``old_app`` on synthetic graphs.
+
+Requests go through Starlette's in-process test client, so timings include
+routing, validation and JSON encoding but no network.  Request bodies are
+encoded once up front so the client's own encoding is not measured.
+"""
+import random
+
+from benchmarks.harness import case
+from benchmarks.synthetic import graph_payload
+from json_response import dumps
+
+# Timed operations per case, by graph size
+REPEAT = {100: 50, 10_000: 10, 100_000: 3}
+VIEWPORT_REQUESTS = 500
+VIEWPORT = (1600, 900)
+JSON = {"content-type": "application/json"}
+
+
+def _client():
+    from fastapi.testclient import TestClient
+    import old_app
+    return TestClient(old_app.app)
+
+
+def _check(response):
+    if response.status_code >= 400:
+        raise RuntimeError(f"{response.request.method} {response.request.url}: "
+                           f"{response.status_code} {response.text[:500]}")
+    return response
+
+
+def _import(client, body: bytes):
+    return _check(client.post("/import?replace=true", content=body, headers=JSON))
+
+
+@case("graph.import", slow=True, boxes=100_000)
+@case("graph.import", boxes=10_000)
+@case("graph.import", boxes=100)
+def bench_import(recorder, boxes: int):
+    """Replace the graph with a new one of ``boxes`` boxes, laid out."""
+    body = dumps(graph_payload(boxes)["graph"])
+    recorder.unit, recorder.items_per_op = "box", boxes
+    with _client() as client:
+        for _ in range(REPEAT[boxes]):
+            recorder.time(lambda: _import(client, body))
+
+
+@case("graph.export", slow=True, boxes=100_000)
+@case("graph.export", boxes=10_000)
+@case("graph.export", boxes=100)
+def bench_export(recorder, boxes: int):
+    recorder.unit, recorder.items_per_op = "box", boxes
+    with _client() as client:
+        _import(client, dumps(graph_payload(boxes)["graph"]))
+        for _ in range(REPEAT[boxes]):
+            recorder.time(lambda: _check(client.get("/export")))
+
+
+@case("graph.viewport", slow=True, boxes=100_000)
+@case("graph.viewport", boxes=10_000)
+@case("graph.viewport", boxes=100)
+def bench_viewport(recorder, boxes: int):
+    """Screen-sized viewport queries at random places on the canvas."""
+    rng = random.Random(1)
+    with _client() as client:
+        _import(client, dumps(graph_payload(boxes)["graph"]))
+        placed = _check(client.get("/boxes")).json()
+        right = max(box["x"] for box in placed)
+        bottom = max(box["y"] for box in placed)
+        for _ in range(VIEWPORT_REQUESTS):
+            left, top = rng.uniform(0, right), rng.uniform(0, bottom)
+            url = f"/viewport?left={left}&top={top}&right={left + VIEWPORT[0]}&bottom={top + VIEWPORT[1]}"
+            recorder.time(lambda: _check(client.get(url)))
+
+
+@case("graph.execute", slow=True, boxes=100_000)
+@case("graph.execute", boxes=10_000)
+@case("graph.execute", boxes=100)
+def bench_execute(recorder, boxes: int):
+    """Run the whole graph with an empty result cache."""
+    payload = graph_payload(boxes)
+    request = dumps({"inputs": payload["inputs"]})
+    recorder.unit, recorder.items_per_op = "box", boxes
+    with _client() as client:
+        _import(client, dumps(payload["graph"]))
+        for _ in range(REPEAT[boxes]):
+            _check(client.delete("/cache"))
+            recorder.time(lambda: _check(client.post("/execute", content=request, headers=JSON)))
+
+
+@case("graph.execute_cached", slow=True, boxes=100_000)
+@case("graph.execute_cached", boxes=10_000)
+@case("graph.execute_cached", boxes=100)
+def bench_execute_cached(recorder, boxes: int):
+    """Re-run an unchanged graph: every box is a result cache hit."""
+    payload = graph_payload(boxes)
+    request = dumps({"inputs": payload["inputs"]})
+    recorder.unit, recorder.items_per_op = "box", boxes
+    with _client() as client:
+        _import(client, dumps(payload["graph"]))
+        _check(client.post("/execute", content=request, headers=JSON))
+        for _ in range(REPEAT[boxes]):
+            recorder.time(lambda: _check(client.post("/execute", content=request, headers=JSON)))
@@ -0,0 +1,58 @@
+"""Folder queue operations on a queue file of synthetic upload folders.
+
+The queue file is the one-folder-per-line format the old pastebin worker
+consumed, which ``FolderQueue`` still reads.  Each case works on a fresh
+file in a temporary directory.
+"""
+import tempfile
+import os
+
+from benchmarks.harness import case
+from benchmarks.synthetic import queue_lines, write_queue_file
+
+PUT_MANY_BATCH = 1000
+
+
+@case("queue.put", slow=True, entries=100_000)
+@case("queue.put", entries=10_000)
+def bench_put(recorder, entries: int):
+    """One ``put`` per folder, as producers enqueue them."""
+    from folder_queue import FolderQueue
+    with tempfile.TemporaryDirectory() as directory:
+        queue = FolderQueue(os.path.join(directory, "shared_queue.txt"))
+        for folder in queue_lines(entries):
+            recorder.time(lambda: queue.put(folder))
+
+
+@case("queue.put_many", slow=True, entries=100_000)
+@case("queue.put_many", entries=10_000)
+def bench_put_many(recorder, entries: int):
+    from folder_queue import FolderQueue
+    lines = queue_lines(entries)
+    recorder.unit, recorder.items_per_op = "entry", PUT_MANY_BATCH
+    with tempfile.TemporaryDirectory() as directory:
+        queue = FolderQueue(os.path.join(directory, "shared_queue.txt"))
+        for start in range(0, entries, PUT_MANY_BATCH):
+            batch = lines[start:start + PUT_MANY_BATCH]
+            recorder.time(lambda: queue.put_many(batch))
+
+
+@case("queue.drain", slow=True, entries=100_000)
+@case("queue.drain", entries=10_000)
+def bench_drain(recorder, entries: int):
+    """Claim and ack every entry one at a time, compacting as the worker would."""
+    from folder_queue import FolderQueue
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "shared_queue.txt")
+        write_queue_file(path, entries)
+        queue = FolderQueue(path)
+
+        def claim_and_ack():
+            claimed = queue.claim()
+            for entry in claimed:
+                queue.ack(entry)
+            return claimed
+
+        while recorder.time(claim_and_ack):
+            pass
+        recorder.durations.pop()  # the final claim found the queue empty
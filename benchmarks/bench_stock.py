@@ -0,0 +1,70 @@
+"""Loading the stock report and answering stock queries.
+
+The synthetic workbook is written to ``benchmarks/data`` on first use and
+reused afterwards; writing the 500k-row one takes a while.
+"""
+import os
+import random
+
+from benchmarks.harness import case
+from benchmarks.synthetic import write_stock_workbook
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+LOAD_REPEAT = {50_000: 3, 500_000: 2}
+QUERIES = {50_000: 500, 500_000: 200}
+PHONES = 50
+
+
+def workbook(rows: int, seed: int = 1) -> str:
+    path = os.path.join(DATA_DIR, f"stock-{rows}-{seed}.xlsx")
+    if not os.path.exists(path):
+        os.makedirs(DATA_DIR, exist_ok=True)
+        write_stock_workbook(path, rows, seed)
+    return path
+
+
+@case("stock.load", slow=True, rows=500_000)
+@case("stock.load", rows=50_000)
+def bench_load(recorder, rows: int):
+    from stock_report import load_stock_report
+    path = workbook(rows)
+    recorder.unit, recorder.items_per_op = "row", rows
+    for _ in range(LOAD_REPEAT[rows]):
+        report = recorder.time(lambda: load_stock_report(path))
+        del report  # so the next load's peak does not include this one
+
+
+def _queries(report, count: int):
+    """A mix of part numbers, description words, paging and refinements."""
+    rng = random.Random(1)
+    codes = report.column("MaterialCode")
+    descriptions = report.column("MaterialDiscription")
+    branches = sorted(set(report.column("Branch")))
+    queries = []
+    for _ in range(count):
+        phone = f"+9190000{rng.randrange(PHONES):05d}"
+        roll = rng.random()
+        if roll < 0.4:
+            message = rng.choice(codes)
+        elif roll < 0.6:
+            message = rng.choice(rng.choice(descriptions).split()[1:])
+        elif roll < 0.8:
+            message = " ".join(rng.sample(rng.choice(descriptions).split(), 2))
+        elif roll < 0.9:
+            message = "more"
+        else:
+            message = f"only {rng.choice(branches)}"
+        queries.append((phone, message))
+    return queries
+
+
+@case("stock.query", slow=True, rows=500_000)
+@case("stock.query", rows=50_000)
+def bench_query(recorder, rows: int):
+    """``handle_query`` over one report, as the WhatsApp bot would call it."""
+    from stock_report import load_stock_report
+    from stock_session import SessionStore, handle_query
+    report = load_stock_report(workbook(rows))
+    store = SessionStore()
+    for phone, message in _queries(report, QUERIES[rows]):
+        recorder.time(lambda: handle_query(store, report, phone, message))
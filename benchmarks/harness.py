@@ -0,0 +1,134 @@
+"""Timing, memory and result bookkeeping shared by the benchmark modules.
+
+A case is a function taking a ``Recorder`` and its parameters as keywords:
+it does its (untimed) setup, then calls ``recorder.time`` once per measured
+operation.  Cases marked slow (the largest inputs) are left out of quick
+runs.  Every case runs in a fresh interpreter, so the peak resident set
+size reported for it is its own and not left over from an earlier case;
+the peak already reached when timing started is reported next to it.
+"""
+from time import perf_counter
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+import math
+import resource
+import sys
+
+
+class Case(NamedTuple):
+    function: Callable[..., None]
+    name: str
+    params: Dict[str, Any]
+    slow: bool
+
+
+# Registered cases by key: the name plus its parameters, e.g. graph.run[boxes=100]
+CASES: Dict[str, Case] = {}
+
+
+def case_key(name: str, params: Dict[str, Any]) -> str:
+    if not params:
+        return name
+    return name + "[" + ",".join(f"{key}={value}" for key, value in params.items()) + "]"
+
+
+def case(name: str, slow: bool = False, **params: Any):
+    """Register the decorated function as benchmark ``name`` with ``params``.
+
+    Stack the decorator to register one function for several parameter sets.
+    """
+    key = case_key(name, params)
+
+    def register(function):
+        if key in CASES:
+            raise ValueError(f"benchmark case {key} is registered twice")
+        CASES[key] = Case(function, name, params, slow)
+        return function
+    return register
+
+
+def peak_rss() -> int:
+    """Peak resident set size of this process so far, in bytes."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+class Recorder:
+    """Collects the durations of a case's measured operations.
+
+    ``items_per_op`` scales throughput, e.g. to boxes or rows per second
+    for operations that each handle a whole graph or report.
+    """
+
+    def __init__(self, name: str, params: Dict[str, Any]):
+        self.name = name
+        self.params = params
+        self.unit = "op"
+        self.items_per_op = 1
+        self.durations: List[float] = []
+        self._setup_peak: Optional[int] = None
+
+    def time(self, operation: Callable[[], Any]) -> Any:
+        """Run ``operation`` once, recording how long it took."""
+        if self._setup_peak is None:
+            self._setup_peak = peak_rss()
+        start = perf_counter()
+        result = operation()
+        self.durations.append(perf_counter() - start)
+        return result
+
+    def result(self) -> Dict[str, Any]:
+        ordered = sorted(self.durations)
+        total = sum(ordered)
+        return {
+            "key": case_key(self.name, self.params),
+            "name": self.name,
+            "params": self.params,
+            "unit": self.unit,
+            "ops": len(ordered),
+            "items_per_op": self.items_per_op,
+            "seconds": {
+                "total": total,
+                "min": ordered[0] if ordered else 0.0,
+                "mean": total / len(ordered) if ordered else 0.0,
+                "p50": percentile(ordered, 0.50),
+                "p99": percentile(ordered, 0.99),
+                "max": ordered[-1] if ordered else 0.0,
+            },
+            # Items per second
+            "throughput": len(ordered) * self.items_per_op / total if total else 0.0,
+            "peak_rss_bytes": peak_rss(),
+            "setup_peak_rss_bytes": self._setup_peak if self._setup_peak is not None else peak_rss(),
+        }
+
+
+def run_case(key: str) -> Dict[str, Any]:
+    registered = CASES[key]
+    recorder = Recorder(registered.name, registered.params)
+    registered.function(recorder, **registered.params)
+    return recorder.result()
+
+
+def compare(baseline: List[Dict[str, Any]], current: List[Dict[str, Any]], threshold: float) -> List[str]:
+    """Lines describing cases whose p50 or peak memory grew by more than ``threshold``."""
+    previous = {result["key"]: result for result in baseline}
+    regressions = []
+    for result in current:
+        old = previous.get(result["key"])
+        if old is None:
+            continue
+        before, after = old["seconds"]["p50"], result["seconds"]["p50"]
+        if before and after / before > 1 + threshold:
+            regressions.append(f"{result['key']}: p50 {before * 1000:.3f} ms -> {after * 1000:.3f} ms "
+                               f"({after / before:.2f}x)")
+        before, after = old["peak_rss_bytes"], result["peak_rss_bytes"]
+        if before and after / before > 1 + threshold:
+            regressions.append(f"{result['key']}: peak RSS {before / 2**20:.1f} MiB -> {after / 2**20:.1f} MiB "
+                               f"({after / before:.2f}x)")
+    return regressions
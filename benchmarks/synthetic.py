@@ -0,0 +1,195 @@
+"""Seeded generators for benchmark inputs.
+
+Everything is derived from a ``random.Random(seed)``, so two runs with the
+same seed benchmark exactly the same graphs, report rows and queue lines.
+"""
+from typing import Any, Dict, List
+from xml.sax.saxutils import escape
+import itertools
+import os
+import random
+import zipfile
+
+# Columns of the enterprise stock report, in sheet order
+STOCK_HEADERS = [
+    "PurchasingGroup", "Branch", "StorageLocation", "MaterialCode", "VenderPartNo.", "MaterialGroup",
+    "Mat.Grp.1", "Mat.Grp.1 Desc.", "MaterialDiscription", "Basic Material", "Valuation Type",
+    "TodayStock", "BlockedStk", "ARP",
+]
+
+_VENDORS = ["TOS", "SMC", "HPE", "DEL", "LEN", "CIS", "NET", "SEA", "WDC", "INT", "AMD", "MIC", "SAM", "KIN"]
+_BRANCHES = [
+    "Delhi", "Mumbai", "Chennai", "Kolkata", "Bangalore", "Hyderabad", "Pune", "Ahmedabad", "Jaipur",
+    "Lucknow", "Chandigarh", "Kochi", "Indore", "Bhopal", "Nagpur", "Surat", "Vadodara", "Patna",
+    "Guwahati", "Bhubaneswar", "Coimbatore", "Visakhapatnam", "Ludhiana", "Kanpur", "Noida", "Gurgaon",
+    "Raipur", "Ranchi", "Dehradun", "Mysore", "Madurai", "Trivandrum", "Vijayawada", "Nashik", "Goa",
+    "Jammu", "Siliguri", "Agra",
+]
+_GROUPS = ["HDD", "SSD", "ACC", "CPU", "MEM", "NIC", "PSU", "SRV", "STG", "SW", "CBL", "RACK", "UPS",
+           "GPU", "MB", "FAN", "OPT", "KVM", "SWH"]
+_VALUATION = ["IMPORTED", "LOCAL", "DOMESTIC", "REFURB", "DEMO", "RMA", "SAMPLE"]
+_WORDS = ["SAS", "SATA", "NVME", "2.5", "3.5", "INCH", "12GBPS", "6GBPS", "10K", "15K", "7.2K", "ENT",
+          "128MB", "256MB", "1.2TB", "600GB", "2TB", "4TB", "8TB", "16GB", "32GB", "64GB", "DDR4", "DDR5",
+          "RDIMM", "LRDIMM", "1U", "2U", "REDNT", "PWS", "3000W", "800W", "54V/12V", "OUTPUT", "10GBE",
+          "25GBE", "SFP+", "QSFP28", "PCIE", "GEN4", "XEON", "EPYC", "CORE", "KIT", "TRAY", "CADDY",
+          "BRACKET", "CABLE", "1M", "3M", "FIBER", "COPPER", "HOTPLUG", "SERVER", "STORAGE", "ARRAY"]
+
+
+def graph_payload(boxes: int, seed: int = 1) -> Dict[str, List[Dict[str, Any]]]:
+    """An acyclic ``/import`` graph of ``boxes`` built-in boxes and its inputs.
+
+    Mostly ``add_numbers`` boxes, each fed by a recent earlier box so the
+    graph is deep as well as wide, with ``to_string``/``get_length``/
+    ``uppercase`` boxes mixed in.  Returns ``{"graph": ..., "inputs": ...}``
+    where ``inputs`` gives every unconnected input a distinct value, so a
+    cold run computes every box instead of hitting the result cache.
+    """
+    rng = random.Random(seed)
+    int_port = lambda name: {"name": name, "type": "int"}
+    str_port = lambda name: {"name": name, "type": "str"}
+    kinds = {
+        "add_numbers": ([int_port("a"), int_port("b")], [int_port("result")]),
+        "to_string": ([int_port("value")], [str_port("text")]),
+        "get_length": ([str_port("text")], [int_port("length")]),
+        "uppercase": ([str_port("text")], [str_port("upper_text")]),
+    }
+    graph_boxes, connections = [], []
+    inputs: Dict[str, Dict[str, Any]] = {}
+    # (box id, output name) of recent boxes, by output type
+    producers: Dict[str, List[tuple]] = {"int": [], "str": []}
+    for i in range(boxes):
+        roll = rng.random()
+        if roll < 0.7 or not producers["str"]:
+            name = "add_numbers" if roll < 0.85 or not producers["int"] else "to_string"
+        else:
+            name = "get_length" if roll < 0.85 else "uppercase"
+        box_inputs, box_outputs = kinds[name]
+        box_id = f"b{i}"
+        graph_boxes.append({"id": box_id, "name": name, "description": "", "inputs": box_inputs,
+                            "outputs": box_outputs, "x": 100, "y": 100})
+        for port in box_inputs:
+            recent = producers[port["type"]][-50:]
+            # The second input of an add is always a given value, which keeps
+            # the sums small and every box's arguments distinct
+            if recent and not (name == "add_numbers" and port["name"] == "b"):
+                source, output = rng.choice(recent)
+                connections.append({"id": f"c{len(connections)}", "source_box": source, "source_output": output,
+                                    "target_box": box_id, "target_input": port["name"]})
+            else:
+                inputs.setdefault(box_id, {})[port["name"]] = i if port["type"] == "int" else f"text {i}"
+        for port in box_outputs:
+            producers[port["type"]].append((box_id, port["name"]))
+    return {"graph": {"boxes": graph_boxes, "connections": connections}, "inputs": inputs}
+
+
+def _stock_rows(rows: int, rng: random.Random):
+    # About two rows (branches) per material, as in the real report
+    materials = []
+    for _ in range(max(1, rows // 2)):
+        vendor = rng.choice(_VENDORS)
+        code = f"{rng.choice('ABCDEFGHJKLMNPRSTUVWXYZ')}{rng.choice('ABCDEFGHJKLMNPRSTUVWXYZ')}" \
+               f"{rng.randrange(10, 100)}{rng.choice(_GROUPS)[:2]}{rng.randrange(1000, 100000)}"
+        description = " ".join([vendor] + rng.sample(_WORDS, rng.randint(3, 7)))
+        materials.append((vendor, code, rng.choice(_GROUPS), description, rng.choice(_GROUPS) + "INT"))
+    for _ in range(rows):
+        vendor, code, group, description, basic = rng.choice(materials)
+        branch = rng.randrange(len(_BRANCHES))
+        yield [vendor, _BRANCHES[branch], f"S{_BRANCHES[branch][:2].upper()}{rng.randint(1, 3)}", code,
+               code if rng.random() < 0.8 else f"{code}-{rng.randint(1, 9)}", group, "Z02", "ENTERPRISE",
+               description, basic, rng.choice(_VALUATION), rng.randint(0, 200), rng.choice((0, 0, 0, 0, 1, 2)),
+               round(rng.uniform(50, 250000), 2)]
+
+
+def _column_letter(index: int) -> str:
+    letters = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord("A") + remainder) + letters
+    return letters
+
+
+_WORKBOOK_PARTS = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/sharedStrings.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/>'
+        '</Types>'),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/></Relationships>'),
+    "xl/workbook.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Sheet1" sheetId="1" r:id="rId1"/></sheets></workbook>'),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '<Relationship Id="rId2" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings" '
+        'Target="sharedStrings.xml"/></Relationships>'),
+}
+
+
+def write_stock_workbook(path: str, rows: int, seed: int = 1) -> None:
+    """Write an .xlsx stock report of ``rows`` rows with the real column set.
+
+    Text cells use the shared string table and numbers are inline, like the
+    workbooks Excel exports, so ``load_stock_report`` takes its usual path.
+    """
+    rng = random.Random(seed)
+    strings: Dict[str, int] = {}
+    numeric = {index for index, name in enumerate(STOCK_HEADERS) if name in ("TodayStock", "BlockedStk", "ARP")}
+    letters = [_column_letter(index) for index in range(len(STOCK_HEADERS))]
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with zipfile.ZipFile(temporary, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, content in _WORKBOOK_PARTS.items():
+            archive.writestr(name, content)
+        with archive.open("xl/worksheets/sheet1.xml", "w") as sheet:
+            sheet.write(b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                        b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>')
+            for number, values in enumerate(itertools.chain([STOCK_HEADERS], _stock_rows(rows, rng)), start=1):
+                cells = []
+                for index, value in enumerate(values):
+                    ref = f"{letters[index]}{number}"
+                    if number > 1 and index in numeric:
+                        cells.append(f'<c r="{ref}"><v>{value}</v></c>')
+                    else:
+                        sid = strings.setdefault(value, len(strings))
+                        cells.append(f'<c r="{ref}" t="s"><v>{sid}</v></c>')
+                sheet.write(f'<row r="{number}">{"".join(cells)}</row>'.encode())
+            sheet.write(b"</sheetData></worksheet>")
+        with archive.open("xl/sharedStrings.xml", "w") as shared:
+            shared.write(f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                         f'<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+                         f'count="{len(strings)}" uniqueCount="{len(strings)}">'.encode())
+            for text in strings:
+                shared.write(f"<si><t>{escape(text)}</t></si>".encode())
+            shared.write(b"</sst>")
+    os.replace(temporary, path)
+
+
+def queue_lines(entries: int, seed: int = 1) -> List[str]:
+    """Folder paths in the one-folder-per-line queue file format."""
+    rng = random.Random(seed)
+    return [f"/srv/uploads/{rng.choice(_BRANCHES).lower()}/batch-{i // 1000:04d}/folder-{i:06d}-{rng.getrandbits(32):08x}"
+            for i in range(entries)]
+
+
+def write_queue_file(path: str, entries: int, seed: int = 1) -> None:
+    with open(path, "w") as f:
+        f.writelines(line + "\n" for line in queue_lines(entries, seed))
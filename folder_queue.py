@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""Append-only folder queue with a persisted consumer offset.
+
+The queue file keeps the old one-folder-per-line format, but entries are
+never removed from it.  Consumers claim lines by advancing a byte offset
+stored next to it, so enqueue and dequeue touch only the lines involved
+instead of reading and rewriting the whole file.  Once most of the file
+has been consumed, ``compact`` copies the unconsumed tail to a new file and
+renames it over the old one.
+
+A claim is a lease: the entry is recorded as held by one consumer until
+a deadline.  The holder ``ack``s it (done), ``nack``s it (appended to the
+queue again) or ``renew``s the lease while it is still working.  If the
+lease runs out, e.g. because the consumer crashed mid-upload, the next
+``claim`` by any consumer redelivers the entry, so processing is
+at-least-once and two live consumers never hold the same entry.  Idle
+consumers block in ``wait``, which sleeps on inotify until the queue file
+changes.
+
+    shared_queue.txt           folder lines, append-only
+    shared_queue.txt.offset    bytes dropped by compaction, and the offset
+                               of the first unclaimed line
+    shared_queue.txt.inflight  leased entries: folder, holder, expiry (JSON)
+    shared_queue.txt.lock      flock taken for the few microseconds of each op
+"""
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+import ctypes
+import ctypes.util
+import fcntl
+import json
+import os
+import select
+import socket
+import struct
+import sys
+import time
+import uuid
+
+# Compact once this many bytes have been consumed and they are more than
+# half of the file
+COMPACT_THRESHOLD = 1 << 20
+
+# Seconds a claimed entry stays leased to its consumer without renewal
+LEASE_SECONDS = 60.0
+
+_OFFSET_WIDTH = 20
+
+# Seconds between stat() checks where inotify is not available
+FALLBACK_POLL = 0.05
+
+_IN_MODIFY = 0x002
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_NONBLOCK = os.O_NONBLOCK
+_IN_CLOEXEC = os.O_CLOEXEC
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class Entry(NamedTuple):
+    # Position of the line counted from the very first byte ever queued;
+    # unlike the physical offset it survives compaction, so it is the id
+    offset: int
+    folder: str
+    consumer: str = ""
+    lease_until: float = 0.0
+
+
+class _FileWatcher:
+    """Blocks until ``path`` is written to or replaced.
+
+    Uses inotify on the containing directory (so compaction's rename is
+    seen too); elsewhere it falls back to cheap ``stat`` polling.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._name = os.fsencode(os.path.basename(path))
+        self._fd: Optional[int] = None
+        self._stat = None
+        libc_name = ctypes.util.find_library("c")
+        libc = ctypes.CDLL(libc_name, use_errno=True) if libc_name else None
+        if libc is not None and hasattr(libc, "inotify_init1"):
+            fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+            if fd >= 0:
+                directory = os.fsencode(os.path.dirname(os.path.abspath(path)))
+                mask = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+                if libc.inotify_add_watch(fd, directory, mask) >= 0:
+                    self._fd = fd
+                else:
+                    os.close(fd)
+        if self._fd is None:
+            self._stat = self._snapshot()
+
+    def _snapshot(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_size, st.st_mtime_ns
+
+    def _drain(self) -> bool:
+        """Consume queued events; True if any concerned the watched file."""
+        hit = False
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                return hit
+            pos = 0
+            while pos < len(data):
+                _, _, _, length = _EVENT_HEADER.unpack_from(data, pos)
+                pos += _EVENT_HEADER.size
+                name = data[pos:pos + length].rstrip(b"\0")
+                pos += length
+                if name == self._name:
+                    hit = True
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """True once the file changes, False if ``timeout`` runs out first."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        if self._fd is None:
+            while True:
+                current = self._snapshot()
+                if current != self._stat:
+                    self._stat = current
+                    return True
+                if deadline is not None and time.monotonic() >= deadline:
+                    return False
+                time.sleep(FALLBACK_POLL)
+
+        poller = select.poll()
+        poller.register(self._fd, select.POLLIN)
+        while True:
+            if self._drain():
+                return True
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+            poller.poll(None if remaining is None else remaining * 1000)
+
+    def close(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class FolderQueue:
+    def __init__(
+        self,
+        filename: str,
+        compact_threshold: int = COMPACT_THRESHOLD,
+        consumer: Optional[str] = None,
+        lease_seconds: float = LEASE_SECONDS,
+    ):
+        self.filename = filename
+        self.compact_threshold = compact_threshold
+        self.consumer = consumer or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.lease_seconds = lease_seconds
+        self._offset_path = filename + ".offset"
+        self._inflight_path = filename + ".inflight"
+        self._lock_path = filename + ".lock"
+        self._watcher: Optional[_FileWatcher] = None
+        # Create the files once so later opens never race on existence
+        open(filename, "a").close()
+        fd = os.open(self._offset_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size == 0:
+                os.pwrite(fd, self._encode_offset(0, 0), 0)
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def _encode_offset(base: int, offset: int) -> bytes:
+        return b"%0*d %0*d\n" % (_OFFSET_WIDTH, base, _OFFSET_WIDTH, offset)
+
+    @contextmanager
+    def _locked(self):
+        """Exclusive lock for one queue operation; blocks instead of retrying."""
+        fd = os.open(self._lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)
+
+    def _read_offset(self) -> Tuple[int, int]:
+        """``(base, offset)``: bytes compacted away, and the read position."""
+        with open(self._offset_path, "rb") as f:
+            fields = f.read().split()
+        if len(fields) == 1:
+            # Written before compaction bases were recorded
+            return 0, int(fields[0])
+        return int(fields[0]), int(fields[1])
+
+    def _write_offset(self, base: int, offset: int) -> None:
+        # Fixed-width record, so an update is a single small pwrite
+        fd = os.open(self._offset_path, os.O_WRONLY)
+        try:
+            os.pwrite(fd, self._encode_offset(base, offset), 0)
+        finally:
+            os.close(fd)
+
+    def _read_inflight(self) -> Dict[str, list]:
+        """``{entry id: [folder, consumer, lease_until]}``."""
+        try:
+            with open(self._inflight_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _write_inflight(self, inflight: Dict[str, list]) -> None:
+        tmp = self._inflight_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(inflight, f)
+        os.replace(tmp, self._inflight_path)
+
+    def put(self, folder: str) -> None:
+        self.put_many([folder])
+
+    def put_many(self, folders: Iterable[str]) -> None:
+        """Append ``folders`` to the end of the queue in one write."""
+        data = "".join(f"{folder.strip()}\n" for folder in folders if folder.strip())
+        if not data:
+            return
+        with self._locked():
+            with open(self.filename, "a") as f:
+                f.write(data)
+
+    def claim(self, count: int = 1) -> List[Entry]:
+        """Lease up to ``count`` entries to this consumer.
+
+        Entries whose lease expired are redelivered first, then new lines
+        are taken off the head of the queue.  Each call hands out a disjoint
+        batch, so several consumers can share one queue file.  A trailing
+        line without its newline is left for a later call, since its
+        producer may still be writing it.
+        """
+        entries: List[Entry] = []
+        with self._locked():
+            now = time.time()
+            lease_until = now + self.lease_seconds
+            inflight = self._read_inflight()
+            for key, (folder, _, expires) in inflight.items():
+                if len(entries) >= count:
+                    break
+                if expires <= now:
+                    entries.append(Entry(int(key), folder, self.consumer, lease_until))
+
+            base, offset = self._read_offset()
+            size = None
+            if len(entries) < count:
+                with open(self.filename, "rb") as f:
+                    f.seek(offset)
+                    while len(entries) < count:
+                        line = f.readline()
+                        if not line.endswith(b"\n"):
+                            break
+                        folder = line.decode().strip()
+                        if folder:
+                            entries.append(Entry(base + offset, folder, self.consumer, lease_until))
+                        offset += len(line)
+                    size = os.fstat(f.fileno()).st_size
+            if entries:
+                # Leases are on disk before the offset moves past them
+                inflight.update((str(e.offset), [e.folder, e.consumer, e.lease_until]) for e in entries)
+                self._write_inflight(inflight)
+            if size is not None:
+                self._write_offset(base, offset)
+                if offset >= self.compact_threshold and offset * 2 >= size:
+                    self._compact(base, offset)
+        return entries
+
+    def _release(self, entry: Entry, inflight: Dict[str, list]) -> bool:
+        """Drop ``entry``'s lease if its consumer still holds it."""
+        lease = inflight.get(str(entry.offset))
+        if lease is None or lease[1] != entry.consumer:
+            # Lease expired and went to someone else (or was already acked)
+            return False
+        del inflight[str(entry.offset)]
+        return True
+
+    def ack(self, entry: Entry) -> bool:
+        """Mark a leased entry as done; False if the lease was lost."""
+        with self._locked():
+            inflight = self._read_inflight()
+            if not self._release(entry, inflight):
+                return False
+            self._write_inflight(inflight)
+            return True
+
+    def nack(self, entry: Entry) -> bool:
+        """Give a leased entry back; it is re-queued at the tail."""
+        with self._locked():
+            inflight = self._read_inflight()
+            if not self._release(entry, inflight):
+                return False
+            with open(self.filename, "a") as f:
+                f.write(f"{entry.folder}\n")
+            self._write_inflight(inflight)
+            return True
+
+    def renew(self, entries: Iterable[Entry]) -> List[Entry]:
+        """Extend the leases still held on ``entries``; returns the renewed ones."""
+        renewed = []
+        with self._locked():
+            inflight = self._read_inflight()
+            lease_until = time.time() + self.lease_seconds
+            for entry in entries:
+                lease = inflight.get(str(entry.offset))
+                if lease is not None and lease[1] == entry.consumer:
+                    lease[2] = lease_until
+                    renewed.append(entry._replace(lease_until=lease_until))
+            if renewed:
+                self._write_inflight(inflight)
+        return renewed
+
+    def in_flight(self) -> List[Entry]:
+        with self._locked():
+            return [Entry(int(k), *v) for k, v in self._read_inflight().items()]
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until complete unclaimed lines are there to claim.
+
+        Returns True at once if they already are, otherwise sleeps on
+        changes to the queue file and checks again after each one, so
+        writes that add no complete line (a trailing line still being
+        written, another process opening the file) do not wake the caller.
+        Returns False if ``timeout`` runs out first.  The watch is set up on
+        the first call and kept, so writes that land between a failed
+        ``claim`` and the next ``wait`` are not missed.
+        """
+        if self._watcher is None:
+            self._watcher = _FileWatcher(self.filename)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.pending() == 0:
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+            self._watcher.wait(remaining)
+        return True
+
+    def pending(self) -> int:
+        """Bytes of complete, claimable lines not yet claimed."""
+        with self._locked():
+            offset = self._read_offset()[1]
+            with open(self.filename, "rb") as f:
+                end = os.fstat(f.fileno()).st_size
+                # Walk back over a trailing line without its newline
+                while end > offset:
+                    start = max(offset, end - 4096)
+                    f.seek(start)
+                    newline = f.read(end - start).rfind(b"\n")
+                    if newline >= 0:
+                        return start + newline + 1 - offset
+                    end = start
+            return 0
+
+    def compact(self) -> None:
+        with self._locked():
+            self._compact(*self._read_offset())
+
+    def _compact(self, base: int, offset: int) -> None:
+        """Copy the unclaimed tail into a fresh file and swap it in."""
+        tmp = self.filename + ".compact"
+        with open(self.filename, "rb") as src, open(tmp, "wb") as dst:
+            src.seek(offset)
+            while True:
+                chunk = src.read(1 << 16)
+                if not chunk:
+                    break
+                dst.write(chunk)
+            dst.flush()
+            os.fsync(dst.fileno())
+        # Reset the offset first: a crash before the rename then replays
+        # already-claimed lines rather than skipping unclaimed ones
+        self._write_offset(base + offset, 0)
+        os.replace(tmp, self.filename)
+
+
+def main(argv: List[str]) -> int:
+    if len(argv) < 3 or argv[2] not in ("put", "status"):
+        print(f"usage: {argv[0]} QUEUE_FILE put FOLDER... | {argv[0]} QUEUE_FILE status")
+        return 2
+    queue = FolderQueue(argv[1])
+    if argv[2] == "put":
+        queue.put_many(argv[3:])
+    else:
+        print(f"{queue.pending()} bytes pending")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
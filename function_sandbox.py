@@ -0,0 +1,349 @@
+"""Run user-registered functions in a pool of warm, isolated worker processes.
+
+Each worker is a separate ``python -I`` process running this file.  Before
+it reads its first call it locks itself down:
+
+* resource limits on CPU time, address space and open files;
+* when started as root: ``chroot`` into an empty directory, a fresh
+  network namespace, and a switch to an unprivileged uid/gid;
+* ``no_new_privs`` and a seccomp filter that fails every syscall for
+  opening files, creating sockets, starting processes or threads,
+  signalling other processes and changing the filesystem.
+
+A worker that cannot install the filter refuses to serve, so user code
+never runs unconfined.  Calls and results travel as JSON lines over the
+worker's stdin/stdout; the server never unpickles anything a worker
+sends.  Registered source is compiled once per worker and cached by
+digest, so a warm call costs little more than encoding its arguments.
+
+A call that exceeds its wall-clock timeout, or kills its worker by hitting
+a limit, fails alone: only that worker is replaced.  The restricted
+builtins only keep honest code honest; isolation comes from the process
+boundary, the limits and the filter.
+"""
+from hashlib import sha256
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+import ast
+import asyncio
+import builtins
+import ctypes
+import json
+import os
+import platform
+import shutil
+import struct
+import sys
+import tempfile
+
+try:
+    import resource
+except ImportError:  # Windows: workers run without limits
+    resource = None
+
+WORKERS = os.cpu_count() or 2
+CPU_SECONDS = 5
+MEMORY_BYTES = 512 * 1024 * 1024
+OPEN_FILES = 16
+CALL_TIMEOUT = 10.0
+# Rows per task when a function is mapped over columns
+CHUNK_ROWS = 10_000
+# Largest reply line accepted from a worker
+MAX_REPLY_BYTES = 64 * 1024 * 1024
+# Workers started as root drop to this uid/gid ("nobody")
+SANDBOX_UID = 65534
+SANDBOX_GID = 65534
+
+SAFE_BUILTINS = {
+    name: getattr(builtins, name) for name in (
+        "abs", "all", "any", "bool", "dict", "divmod", "enumerate", "filter", "float", "format",
+        "int", "isinstance", "len", "list", "map", "max", "min", "pow", "range", "repr", "reversed",
+        "round", "set", "sorted", "str", "sum", "tuple", "zip",
+        "ArithmeticError", "Exception", "IndexError", "KeyError", "TypeError", "ValueError",
+        "ZeroDivisionError",
+    )
+}
+
+
+class SandboxError(Exception):
+    pass
+
+
+class UserFunction(NamedTuple):
+    """Source of a registered function; ``digest`` keys the workers' compile cache."""
+    name: str
+    source: str
+    digest: str
+
+
+def prepare_function(name: str, source: str, arity: int) -> UserFunction:
+    """Check that ``source`` defines ``name`` taking ``arity`` positional arguments."""
+    try:
+        tree = ast.parse(source)
+    except SyntaxError as e:
+        raise SandboxError(f"syntax error on line {e.lineno}: {e.msg}") from None
+    definition = next((node for node in tree.body if isinstance(node, ast.FunctionDef) and node.name == name), None)
+    if definition is None:
+        raise SandboxError(f"source must define a function named {name!r}")
+    args = definition.args
+    if args.vararg is None and len(args.posonlyargs) + len(args.args) != arity:
+        raise SandboxError(f"{name} must take {arity} argument(s), one per input")
+    compile(tree, f"<{name}>", "exec")
+    return UserFunction(name, source, sha256(source.encode()).hexdigest())
+
+
+# Worker side
+
+# Syscalls a worker may not make, by seccomp audit architecture
+_AUDIT_ARCH = {"x86_64": 0xC000003E, "aarch64": 0xC00000B7}
+_DENIED_SYSCALLS = {
+    "x86_64": [
+        2, 85, 257, 437,                      # open, creat, openat, openat2
+        59, 322, 56, 57, 58, 435,             # execve, execveat, clone, fork, vfork, clone3
+        41, 53, 42, 49, 50, 43, 288,          # socket, socketpair, connect, bind, listen, accept, accept4
+        62, 101, 310, 311,                    # kill, ptrace, process_vm_readv/writev
+        87, 263, 82, 264, 316, 83, 258, 84,   # unlink(at), rename(at/at2), mkdir(at), rmdir
+        88, 266, 86, 265, 133, 259, 76,       # symlink(at), link(at), mknod(at), truncate
+        90, 91, 268, 92, 93, 94, 260,         # chmod family, chown family
+        165, 166, 161, 155, 272, 308,         # mount, umount2, chroot, pivot_root, unshare, setns
+        303, 304, 321, 323, 298, 425, 319,    # *_handle_at, bpf, userfaultfd, perf_event_open, io_uring, memfd
+        135, 248, 249, 250, 175, 313, 176, 246,  # personality, keys, modules, kexec_load
+    ],
+    "aarch64": [
+        56, 437,                              # openat, openat2
+        221, 281, 220, 435,                   # execve, execveat, clone, clone3
+        198, 199, 203, 200, 201, 202, 242,    # socket, socketpair, connect, bind, listen, accept, accept4
+        129, 117, 270, 271,                   # kill, ptrace, process_vm_readv/writev
+        35, 38, 276, 34, 36, 37, 33, 45,      # unlinkat, renameat(2), mkdirat, symlinkat, linkat, mknodat, truncate
+        52, 53, 54, 55,                       # fchmod(at), fchown(at)
+        40, 39, 51, 41, 97, 268,              # mount, umount2, chroot, pivot_root, unshare, setns
+        264, 265, 280, 282, 241, 425, 279,    # *_handle_at, bpf, userfaultfd, perf_event_open, io_uring, memfd
+        92, 217, 218, 219, 105, 273, 106, 104,  # personality, keys, modules, kexec_load
+    ],
+}
+_PR_SET_NO_NEW_PRIVS = 38
+_PR_SET_SECCOMP = 22
+_SECCOMP_MODE_FILTER = 2
+_SECCOMP_RET_KILL_PROCESS = 0x80000000
+_SECCOMP_RET_ERRNO_EPERM = 0x00050000 | 1
+_SECCOMP_RET_ALLOW = 0x7FFF0000
+_X32_SYSCALL_BIT = 0x40000000
+_CLONE_NEWNET = 0x40000000
+
+
+def _bpf(code: int, k: int, jt: int = 0, jf: int = 0) -> bytes:
+    return struct.pack("HBBI", code, jt, jf, k)
+
+
+def _seccomp_program(machine: str) -> bytes:
+    ld_arch, ld_nr = _bpf(0x20, 4), _bpf(0x20, 0)  # BPF_LD|BPF_W|BPF_ABS
+    kill = _bpf(0x06, _SECCOMP_RET_KILL_PROCESS)     # BPF_RET|BPF_K
+    program = [ld_arch, _bpf(0x15, _AUDIT_ARCH[machine], 1, 0), kill, ld_nr]  # BPF_JMP|BPF_JEQ|BPF_K
+    if machine == "x86_64":
+        # x32 syscalls would bypass the numbers below
+        program += [_bpf(0x35, _X32_SYSCALL_BIT, 0, 1), kill]  # BPF_JMP|BPF_JGE|BPF_K
+    for number in _DENIED_SYSCALLS[machine]:
+        program += [_bpf(0x15, number, 0, 1), _bpf(0x06, _SECCOMP_RET_ERRNO_EPERM)]
+    program.append(_bpf(0x06, _SECCOMP_RET_ALLOW))
+    return b"".join(program)
+
+
+def _isolate(jail: Optional[str], cpu_seconds: int, memory_bytes: int, open_files: int) -> None:
+    """Confine this worker process; raises if the seccomp filter cannot be installed."""
+    machine = platform.machine()
+    if not sys.platform.startswith("linux") or machine not in _AUDIT_ARCH:
+        raise OSError(f"no seccomp filter for {sys.platform}/{machine}")
+    libc = ctypes.CDLL(None, use_errno=True)
+    if resource is not None:
+        for limit, value in ((resource.RLIMIT_CPU, cpu_seconds), (resource.RLIMIT_AS, memory_bytes),
+                             (resource.RLIMIT_NOFILE, open_files), (resource.RLIMIT_FSIZE, 0)):
+            resource.setrlimit(limit, (value, value))
+    if os.geteuid() == 0:
+        # Best effort: the filter below blocks sockets even without a namespace
+        libc.unshare(_CLONE_NEWNET)
+        if jail is not None:
+            os.chroot(jail)
+            os.chdir("/")
+        os.setgroups([])
+        os.setgid(SANDBOX_GID)
+        os.setuid(SANDBOX_UID)
+    program = _seccomp_program(machine)
+    buffer = ctypes.create_string_buffer(program)
+    fprog = struct.pack("HxxxxxxP", len(program) // 8, ctypes.addressof(buffer))
+    if libc.prctl(_PR_SET_NO_NEW_PRIVS, 1, 0, 0, 0) != 0:
+        raise OSError(ctypes.get_errno(), "prctl(PR_SET_NO_NEW_PRIVS) failed")
+    if libc.prctl(_PR_SET_SECCOMP, _SECCOMP_MODE_FILTER, ctypes.c_char_p(fprog), 0, 0) != 0:
+        raise OSError(ctypes.get_errno(), "installing the seccomp filter failed")
+
+
+def _worker_main(jail: Optional[str], cpu_seconds: int, memory_bytes: int, open_files: int) -> None:
+    stdin, stdout = sys.stdin.buffer, sys.stdout.buffer
+
+    def reply(message: Dict[str, Any]) -> None:
+        try:
+            data = json.dumps(message, separators=(",", ":")).encode()
+        except (TypeError, ValueError) as e:
+            data = json.dumps({"error": f"result is not JSON: {e}"}).encode()
+        stdout.write(data + b"\n")
+        stdout.flush()
+
+    try:
+        _isolate(jail, cpu_seconds, memory_bytes, open_files)
+    except Exception as e:
+        reply({"error": f"isolation failed: {e}"})
+        return
+    reply({"ready": os.getpid()})
+
+    compiled: Dict[str, Any] = {}
+    for line in stdin:
+        request = json.loads(line)
+        try:
+            function = compiled.get(request["digest"])
+            if function is None:
+                namespace = {"__builtins__": SAFE_BUILTINS, "__name__": "user_function"}
+                exec(compile(request["source"], f"<{request['name']}>", "exec"), namespace)
+                function = compiled[request["digest"]] = namespace[request["name"]]
+            if "columns" in request:
+                columns = request["columns"]
+                result = ([function(*row) for row in zip(*columns)] if columns
+                          else [function() for _ in range(request["rows"])])
+            else:
+                result = function(*request["args"])
+        except Exception as e:
+            reply({"error": f"raised {type(e).__name__}: {e}"})
+        else:
+            reply({"result": result})
+
+
+# Parent side
+
+class _Worker:
+    __slots__ = ("process", "loaded")
+
+    def __init__(self, process: asyncio.subprocess.Process):
+        self.process = process
+        self.loaded: set = set()  # digests this worker has compiled
+
+    async def request(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        self.process.stdin.write(json.dumps(message, separators=(",", ":")).encode() + b"\n")
+        await self.process.stdin.drain()
+        line = await self.process.stdout.readline()
+        if not line:
+            raise EOFError("worker exited")
+        return json.loads(line)
+
+    def kill(self) -> None:
+        if self.process.returncode is None:
+            self.process.kill()
+
+
+class SandboxPool:
+    def __init__(self, workers: int = WORKERS, cpu_seconds: int = CPU_SECONDS,
+                 memory_bytes: int = MEMORY_BYTES, open_files: int = OPEN_FILES,
+                 timeout: float = CALL_TIMEOUT):
+        self.workers = workers
+        self.timeout = timeout
+        self._limits = (cpu_seconds, memory_bytes, open_files)
+        self._jail: Optional[str] = None
+        # Idle workers; None marks a slot whose worker died and could not be replaced yet
+        self._idle: Optional[asyncio.Queue] = None
+
+    async def _spawn(self) -> _Worker:
+        args = [sys.executable, "-I", os.path.abspath(__file__), "--worker", self._jail or "",
+                *(str(limit) for limit in self._limits)]
+        process = await asyncio.create_subprocess_exec(
+            *args, stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL, limit=MAX_REPLY_BYTES)
+        worker = _Worker(process)
+        try:
+            ready = json.loads(await asyncio.wait_for(process.stdout.readline(), self.timeout) or b"{}")
+        except (asyncio.TimeoutError, ValueError):
+            ready = {}
+        if "ready" not in ready:
+            worker.kill()
+            await process.wait()
+            raise SandboxError(f"sandbox worker failed to start: {ready.get('error', 'no response')}")
+        return worker
+
+    async def start(self) -> None:
+        """Start every worker now instead of on first use.
+
+        Slots whose worker fails to start are retried on the next call,
+        which reports the failure.
+        """
+        if self._idle is not None:
+            return
+        if self._jail is None and hasattr(os, "geteuid") and os.geteuid() == 0:
+            self._jail = tempfile.mkdtemp(prefix="sandbox-")
+            os.chmod(self._jail, 0o555)
+        self._idle = asyncio.Queue()
+        for result in await asyncio.gather(*(self._spawn() for _ in range(self.workers)), return_exceptions=True):
+            self._idle.put_nowait(result if isinstance(result, _Worker) else None)
+
+    async def call(self, function: UserFunction, args: Sequence[Any]) -> Any:
+        return await self._run(function, {"args": list(args)})
+
+    async def map(self, function: UserFunction, columns: Sequence[Sequence[Any]], rows: int,
+                  chunk_rows: int = CHUNK_ROWS) -> List[Any]:
+        """``function`` applied to each row of ``columns``, in chunks spread over the workers."""
+        chunks = await asyncio.gather(*(
+            self._run(function, {"columns": [list(column[start:start + chunk_rows]) for column in columns],
+                                 "rows": min(chunk_rows, rows - start)})
+            for start in range(0, rows, chunk_rows)))
+        return [value for chunk in chunks for value in chunk]
+
+    async def _run(self, function: UserFunction, call: Dict[str, Any]) -> Any:
+        if self._idle is None:
+            await self.start()
+        worker = await self._idle.get()
+        try:
+            if worker is None:
+                worker = await self._spawn()
+            message = {"digest": function.digest, "name": function.name, **call}
+            if function.digest not in worker.loaded:
+                message["source"] = function.source
+            reply = await asyncio.wait_for(worker.request(message), self.timeout)
+            worker.loaded.add(function.digest)
+        except SandboxError:
+            worker = None
+            raise
+        except asyncio.CancelledError:
+            # Its reply would be read by the next call
+            worker.kill()
+            worker = None
+            raise
+        except asyncio.TimeoutError:
+            # The worker cannot be interrupted; replace just this one
+            worker = await self._replace(worker)
+            raise SandboxError(f"{function.name} timed out after {self.timeout:g}s") from None
+        except (EOFError, OSError, ValueError):
+            # Killed by a limit, or it wrote something that is not a reply
+            worker = await self._replace(worker)
+            raise SandboxError(f"{function.name} was killed (resource limit exceeded?)") from None
+        finally:
+            self._idle.put_nowait(worker)
+        if "error" in reply:
+            raise SandboxError(f"{function.name} {reply['error']}")
+        return reply["result"]
+
+    async def _replace(self, worker: _Worker) -> Optional[_Worker]:
+        worker.kill()
+        await worker.process.wait()
+        try:
+            return await self._spawn()
+        except SandboxError:
+            return None
+
+    async def shutdown(self) -> None:
+        idle, self._idle = self._idle, None
+        while idle is not None and not idle.empty():
+            worker = idle.get_nowait()
+            if worker is not None:
+                worker.kill()
+                await worker.process.wait()
+        if self._jail is not None:
+            shutil.rmtree(self._jail, ignore_errors=True)
+            self._jail = None
+
+
+if __name__ == "__main__" and sys.argv[1:2] == ["--worker"]:
+    _worker_main(sys.argv[2] or None, *(int(value) for value in sys.argv[3:6]))
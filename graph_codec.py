@@ -0,0 +1,193 @@
+"""Compact wire format for composer graphs.
+
+The verbose form the composer page used to post repeats each box's whole
+function definition and spells every connection endpoint out as an object.
+The compact form lists each distinct function once and refers to it, to
+boxes and to connectors by index::
+
+    {"v": 1,
+     "functions": ["add_numbers", {"name": "custom", ...}],
+     "boxes": [[function, x, y], ...],
+     "connections": [[from_box, output, to_box, input], ...]}
+
+A function present in the catalog is referenced by its name (its catalog
+id); anything else is carried as a full definition.  The same structure can
+be sent as msgpack when the optional ``msgpack`` package is installed.
+"""
+from typing import Any, Dict, List, Optional
+
+from json_response import dumps, loads
+
+try:
+    import msgpack
+except ImportError:  # optional: JSON is always available
+    msgpack = None
+
+FORMAT_VERSION = 1
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+
+
+class GraphFormatError(ValueError):
+    pass
+
+
+def _coordinate(value) -> float:
+    # A tenth of a pixel is plenty for layout and keeps the encoding short
+    value = round(float(value), 1)
+    return int(value) if value.is_integer() else value
+
+
+def _list(graph: Dict[str, Any], key: str) -> list:
+    items = graph.get(key, [])
+    if not isinstance(items, list):
+        raise GraphFormatError(f"{key} must be a list")
+    return items
+
+
+def _number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _endpoint(connection: Dict[str, Any], key: str, i: int) -> Dict[str, Any]:
+    endpoint = connection.get(key)
+    if not (isinstance(endpoint, dict) and isinstance(endpoint.get("boxId"), str) and _index(endpoint.get("index"))):
+        raise GraphFormatError(f"connection {i} {key} must be a {{boxId, index}} object")
+    return endpoint
+
+
+def encode_graph(graph: Dict[str, Any], catalog: Dict[str, dict]) -> Dict[str, Any]:
+    """Compact form of a verbose ``{"boxes": [...], "connections": [...]}`` graph."""
+    if not isinstance(graph, dict):
+        raise GraphFormatError("graph must be an object")
+    functions: List[Any] = []
+    function_ids: Dict[str, int] = {}
+    box_index: Dict[str, int] = {}
+    boxes = []
+    for i, box in enumerate(_list(graph, "boxes")):
+        if not (isinstance(box, dict) and isinstance(box.get("id"), str)):
+            raise GraphFormatError(f"box {i} must be an object with an id")
+        definition = box.get("function")
+        if not isinstance(definition, dict):
+            raise GraphFormatError(f"box {i} function must be a definition")
+        position = box.get("position", {})
+        if not (isinstance(position, dict) and _number(position.get("x", 0)) and _number(position.get("y", 0))):
+            raise GraphFormatError(f"box {i} position must be an {{x, y}} object")
+        key = dumps(definition).decode()
+        function_id = function_ids.get(key)
+        if function_id is None:
+            function_id = function_ids[key] = len(functions)
+            name = definition.get("name")
+            functions.append(name if isinstance(name, str) and catalog.get(name) == definition else definition)
+        box_index[box["id"]] = i
+        boxes.append([function_id, _coordinate(position.get("x", 0)), _coordinate(position.get("y", 0))])
+
+    connections = []
+    for i, connection in enumerate(_list(graph, "connections")):
+        if not isinstance(connection, dict):
+            raise GraphFormatError(f"connection {i} must be a {{from, to}} object")
+        source, target = _endpoint(connection, "from", i), _endpoint(connection, "to", i)
+        if source.get("direction") == "input":
+            source, target = target, source
+        try:
+            connections.append([box_index[source["boxId"]], source["index"],
+                                box_index[target["boxId"]], target["index"]])
+        except KeyError as e:
+            raise GraphFormatError(f"connection refers to unknown box {e}") from None
+    return {"v": FORMAT_VERSION, "functions": functions, "boxes": boxes, "connections": connections}
+
+
+def _check_ports(definition: dict, key: str, i: int) -> None:
+    ports = definition.get(key)
+    if not isinstance(ports, list):
+        raise GraphFormatError(f"function {i} {key} must be a list")
+    for port in ports:
+        if not (isinstance(port, dict) and isinstance(port.get("name"), str) and isinstance(port.get("type"), str)):
+            raise GraphFormatError(f"function {i} {key} must be {{name, type}} objects")
+
+
+def _function(entry: Any, catalog: Dict[str, dict], i: int) -> dict:
+    # A catalog name, or a full definition with typed inputs and outputs
+    if isinstance(entry, str):
+        if entry not in catalog:
+            raise GraphFormatError(f"unknown function {entry!r}")
+        return catalog[entry]
+    if not (isinstance(entry, dict) and isinstance(entry.get("name"), str)):
+        raise GraphFormatError(f"function {i} must be a catalog name or a definition with a name")
+    _check_ports(entry, "inputs", i)
+    _check_ports(entry, "outputs", i)
+    return entry
+
+
+def _index(value: Any) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def decode_graph(compact: Dict[str, Any], catalog: Dict[str, dict]) -> Dict[str, Any]:
+    """Verbose graph from its compact form, validating every reference."""
+    if not isinstance(compact, dict):
+        raise GraphFormatError("graph must be an object")
+    if compact.get("v") != FORMAT_VERSION:
+        raise GraphFormatError(f"unsupported graph format version {compact.get('v')!r}")
+    definitions = [_function(entry, catalog, i) for i, entry in enumerate(_list(compact, "functions"))]
+
+    boxes = []
+    for i, box in enumerate(_list(compact, "boxes")):
+        if not (isinstance(box, list) and len(box) == 3 and _index(box[0])
+                and all(map(_number, box[1:]))):
+            raise GraphFormatError(f"box {i} must be [function, x, y]")
+        function_id, x, y = box
+        if not 0 <= function_id < len(definitions):
+            raise GraphFormatError(f"box {i} refers to missing function {function_id}")
+        boxes.append({"id": f"box-{i + 1}", "function": definitions[function_id], "position": {"x": x, "y": y}})
+
+    connections = []
+    for connection in _list(compact, "connections"):
+        if not (isinstance(connection, list) and len(connection) == 4 and all(map(_index, connection))):
+            raise GraphFormatError(f"connection {connection!r} must be [from_box, output, to_box, input]")
+        source_box, output, target_box, input_ = connection
+        if not (0 <= source_box < len(boxes) and 0 <= target_box < len(boxes)):
+            raise GraphFormatError(f"connection refers to missing box {source_box} or {target_box}")
+        if source_box == target_box:
+            raise GraphFormatError(f"connection from box {source_box} to itself")
+        outputs = boxes[source_box]["function"]["outputs"]
+        inputs = boxes[target_box]["function"]["inputs"]
+        if not (0 <= output < len(outputs) and 0 <= input_ < len(inputs)):
+            raise GraphFormatError(f"connection refers to missing connector {output} or {input_}")
+        if outputs[output]["type"] != inputs[input_]["type"]:
+            raise GraphFormatError(f"type mismatch: {outputs[output]['type']} -> {inputs[input_]['type']}")
+        connections.append({
+            "from": {"boxId": boxes[source_box]["id"], "index": output, "type": outputs[output]["type"]},
+            "to": {"boxId": boxes[target_box]["id"], "index": input_, "type": inputs[input_]["type"]},
+        })
+    return {"boxes": boxes, "connections": connections}
+
+
+def is_msgpack(content_type: Optional[str]) -> bool:
+    return (content_type or "").split(";")[0].strip().lower() in MSGPACK_MEDIA_TYPES
+
+
+def wants_msgpack(accept: Optional[str]) -> bool:
+    """Whether an ``Accept`` header asks for msgpack."""
+    return any(is_msgpack(media_range) for media_range in (accept or "").split(","))
+
+
+def load_payload(body: bytes, content_type: Optional[str]) -> Dict[str, Any]:
+    """Parse a request body as msgpack or JSON according to its media type."""
+    use_msgpack = is_msgpack(content_type)
+    if use_msgpack and msgpack is None:
+        raise GraphFormatError("msgpack support is not installed")
+    try:
+        data = msgpack.unpackb(body) if use_msgpack else loads(body)
+    except Exception as e:
+        raise GraphFormatError(f"malformed graph payload: {e}") from None
+    if not isinstance(data, dict):
+        raise GraphFormatError("graph payload must be an object")
+    return data
+
+
+def dump_payload(data: Dict[str, Any], use_msgpack: bool = False) -> bytes:
+    if use_msgpack:
+        if msgpack is None:
+            raise GraphFormatError("msgpack support is not installed")
+        return msgpack.packb(data)
+    return dumps(data)
@@ -0,0 +1,654 @@
+"""Evaluate a composed function graph.
+
+Boxes run in dependency order; all boxes of one level are started together,
+so user functions in independent branches execute in parallel on the
+sandbox pool.  Built-in catalog functions are trusted and run in process.
+An input is fed by its incoming connection, or else by a value supplied
+with the request.  With a ``ResultCache``, ``run`` reuses the outputs of
+pure functions called with the same arguments before.
+
+``run_batch`` evaluates the graph over whole columns instead: each box is
+called once with one NumPy array per input.  Functions in ``VECTORIZED``
+are column operations; other built-ins (those working on ragged ``list``
+values, where a Python loop beats flattening) are applied row by row, and
+user functions are mapped over chunks of rows on the sandbox pool.
+
+``stream`` runs every box at once as a task, connected by bounded queues
+of small batches, so downstream boxes start on the first items and a full
+queue makes its producer wait.  A ``list`` port carries its elements one at
+a time, and ``STREAMING`` functions consume and produce such streams
+incrementally; other boxes run like ``run_batch`` on each batch.
+"""
+from collections import defaultdict
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Dict, List, Optional, Set, Tuple
+import asyncio
+import random
+import re
+import string
+
+import numpy as np
+
+from function_sandbox import SandboxError, SandboxPool, UserFunction
+from metrics import REGISTRY
+from graph_store import Box, FunctionSignature, GraphStore, Port
+from result_cache import ResultCache, result_key
+
+# Python types accepted for each port type
+PORT_TYPES: Dict[str, tuple] = {
+    "int": (int,),
+    "float": (int, float),
+    "str": (str,),
+    "list": (list,),
+    "bool": (bool,),
+}
+
+# Widths and precisions a format template may ask for, summed over its
+# fields; "{:>999999999}" would otherwise allocate gigabytes
+MAX_FORMAT_WIDTH = 10_000
+_SPEC_NUMBER = re.compile(r"\d+")
+
+
+class _TemplateFormatter(string.Formatter):
+    """``str.format`` for untrusted templates: one value, no attribute or
+    index lookups, bounded padding."""
+
+    def __init__(self):
+        self.budget = MAX_FORMAT_WIDTH
+
+    def get_field(self, field_name, args, kwargs):
+        if field_name != "0":
+            raise ValueError(f"template field {{{field_name}}} is not allowed; use {{}}")
+        return super().get_field(field_name, args, kwargs)
+
+    def format_field(self, value, format_spec):
+        self.budget -= sum(int(number) for number in _SPEC_NUMBER.findall(format_spec))
+        if self.budget < 0:
+            raise ValueError(f"template widths and precisions exceed {MAX_FORMAT_WIDTH}")
+        return super().format_field(value, format_spec)
+
+
+def format_template(template: str, value: Any) -> str:
+    return _TemplateFormatter().format(template, value)
+
+
+BUILTINS: Dict[str, Callable[..., Any]] = {
+    "add_numbers": lambda a, b: a + b,
+    "multiply_numbers": lambda a, b: a * b,
+    "to_string": str,
+    "get_length": len,
+    "concatenate": lambda a, b: a + b,
+    "uppercase": str.upper,
+    "generate_random": lambda: random.randint(0, 100),
+    "format_message": format_template,
+    # The composer page's catalog
+    "multiply": lambda a, b: a * b,
+    "split_string": lambda text, delimiter: text.split(delimiter),
+    "filter_positive": lambda numbers: [n for n in numbers if n > 0],
+    "format_text": format_template,
+}
+
+# Built-ins whose results must never be reused
+IMPURE_BUILTINS = {"generate_random"}
+
+NODE_SECONDS = REGISTRY.histogram("graph_node_seconds", "Time to compute one box", ("function", "mode"))
+RUN_SECONDS = REGISTRY.histogram("graph_run_seconds", "Time to run a whole graph", ("mode",))
+NODE_CACHE = REGISTRY.counter("graph_node_cache", "Result cache lookups for boxes", ("result",))
+_CACHE_HITS = NODE_CACHE.labels("hit")
+_CACHE_MISSES = NODE_CACHE.labels("miss")
+
+
+# Results at least this large may not fit in int64; a little under 2**63
+# since the check is done in float64
+_INT64_SAFE = float(np.iinfo(np.int64).max) * (1 - 2.0 ** -20)
+
+
+def _exact(operation: Callable[[np.ndarray, np.ndarray], np.ndarray]) -> Callable[..., np.ndarray]:
+    """``operation`` on two columns, redone on Python ints if int64 would wrap."""
+    def column(rows: int, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        if a.dtype.kind == "i" and b.dtype.kind == "i":
+            estimate = operation(a.astype(np.float64), b.astype(np.float64))
+            exact = bool(np.any(np.abs(estimate) >= _INT64_SAFE))
+        else:
+            exact = a.dtype == object or b.dtype == object
+        if exact:
+            return operation(a.astype(object), b.astype(object))
+        return operation(a, b)
+    return column
+
+
+# Column implementations of built-ins: called with the row count, then one
+# array per input
+VECTORIZED: Dict[str, Callable[..., Any]] = {
+    "add_numbers": _exact(np.add),
+    "multiply_numbers": _exact(np.multiply),
+    "multiply": _exact(np.multiply),
+    "to_string": lambda rows, value: value.astype(str),
+    "get_length": lambda rows, text: np.char.str_len(text),
+    "concatenate": lambda rows, a, b: np.char.add(a, b),
+    "uppercase": lambda rows, text: np.char.upper(text),
+    "generate_random": lambda rows: np.random.default_rng().integers(0, 101, rows),
+}
+
+
+async def _split_values(text: AsyncIterator[list], delimiter: AsyncIterator[list]) -> AsyncIterator[tuple]:
+    # Items of ``text`` are separate values, each split by its row's delimiter
+    texts: list = []
+    delimiters: list = []
+    while True:
+        if not texts and (texts := await anext(text, None)) is None:
+            return
+        if not delimiters and (delimiters := await anext(delimiter, None)) is None:
+            return
+        rows = min(len(texts), len(delimiters))
+        parts = [part for value, separator in zip(texts[:rows], delimiters[:rows]) for part in value.split(separator)]
+        texts, delimiters = texts[rows:], delimiters[rows:]
+        if parts:
+            yield (parts,)
+
+
+async def _split_chunks(text: AsyncIterator[list], delimiter: AsyncIterator[list]) -> AsyncIterator[tuple]:
+    # Items of ``text`` are consecutive chunks of one text
+    delimiter = (await anext(delimiter))[0]
+    rest = ""
+    async for chunks in text:
+        parts = (rest + "".join(chunks)).split(delimiter)
+        rest = parts.pop()
+        if parts:
+            yield (parts,)
+    yield ([rest],)
+
+
+async def _filter_stream(numbers: AsyncIterator[list]) -> AsyncIterator[tuple]:
+    async for batch in numbers:
+        positive = [number for number in batch if number > 0]
+        if positive:
+            yield (positive,)
+
+
+# Incremental implementations of built-ins with list ports: called with one
+# async iterator of batches (lists of items) per input, they yield a tuple
+# of output batches
+STREAMING: Dict[str, Callable[..., AsyncIterator[tuple]]] = {
+    "split_string": _split_values,
+    "filter_positive": _filter_stream,
+}
+
+# Implementations used instead when the named str input is fed straight from
+# a source, whose items are then chunks of one text rather than separate values
+CHUNKED: Dict[str, Tuple[str, Callable[..., AsyncIterator[tuple]]]] = {
+    "split_string": ("text", _split_chunks),
+}
+
+# Queues hold up to STREAM_BUFFER batches of up to STREAM_BATCH items (and,
+# from sources, STREAM_BATCH_CHARS characters of text); a source batch is
+# sent early whenever its consumer is waiting
+STREAM_BUFFER = 16
+STREAM_BATCH = 256
+STREAM_BATCH_CHARS = 64 * 1024
+_END = object()
+
+Results = Dict[str, Dict[str, Any]]
+Columns = Dict[str, Dict[str, np.ndarray]]
+
+
+class ExecutionError(Exception):
+    pass
+
+
+def _check_type(value: Any, port_type: str, what: str) -> None:
+    accepted = PORT_TYPES.get(port_type)
+    # bool is an int subclass, but a bool is not a valid int here
+    if accepted is not None and (not isinstance(value, accepted) or (isinstance(value, bool) and bool not in accepted)):
+        raise ExecutionError(f"{what} must be {port_type}, got {type(value).__name__}")
+
+
+async def _read(queue: asyncio.Queue) -> AsyncIterator[list]:
+    while (batch := await queue.get()) is not _END:
+        yield batch
+    # Leave the queue marked as ended; nothing follows _END, so there is room
+    queue.put_nowait(_END)
+
+
+async def _pump(source: AsyncIterable[Any], queue: asyncio.Queue) -> None:
+    batch, chars = [], 0
+    async for item in source:
+        batch.append(item)
+        if isinstance(item, str):
+            chars += len(item)
+        if len(batch) >= STREAM_BATCH or chars >= STREAM_BATCH_CHARS or queue.empty():
+            await queue.put(batch)
+            batch, chars = [], 0
+    if batch:
+        await queue.put(batch)
+    await queue.put(_END)
+
+
+async def _repeat(value: Any) -> AsyncIterator[list]:
+    batch = [value] * STREAM_BATCH
+    while True:
+        yield batch
+
+
+async def _elements(values: List[Any]) -> AsyncIterator[list]:
+    for start in range(0, len(values), STREAM_BATCH):
+        yield values[start:start + STREAM_BATCH]
+
+
+# dtype of an empty column of each port type numpy cannot infer it for
+_DTYPES = {"int": np.int64, "float": np.float64, "bool": np.bool_}
+
+
+def _column(values: Any, port_type: str, rows: int, what: str) -> np.ndarray:
+    """``values`` as an array of ``rows`` values of ``port_type``; a scalar is repeated.
+
+    A ``list`` port has no scalars: its values must already be a column of lists.
+    An int column whose values do not all fit in int64 holds Python ints.
+    """
+    if not isinstance(values, (list, np.ndarray)):
+        if port_type == "list":
+            raise ExecutionError(f"{what} must be a column of list, got {type(values).__name__}")
+        _check_type(values, port_type, what)
+        values = [values] * rows
+    if len(values) != rows:
+        raise ExecutionError(f"{what} has {len(values)} rows, expected {rows}")
+    if isinstance(values, np.ndarray) and values.dtype != object:
+        array = values
+    elif port_type == "str":
+        if not all(isinstance(value, str) for value in values):
+            raise ExecutionError(f"{what} must be a column of str")
+        array = np.array(values, dtype=str)
+    elif port_type == "list":
+        if not all(isinstance(value, list) for value in values):
+            raise ExecutionError(f"{what} must be a column of list")
+        array = np.empty(rows, dtype=object)
+        for i, value in enumerate(values):
+            array[i] = value
+        return array
+    elif not rows:
+        array = np.empty(0, dtype=_DTYPES.get(port_type, object))
+    else:
+        array = np.array(values)
+        if port_type == "int" and array.dtype.kind in "ufO":
+            # Ints beyond int64 are inferred as uint64, float64 or object
+            ints = values.tolist() if isinstance(values, np.ndarray) else values
+            if all(isinstance(value, int) and not isinstance(value, bool) for value in ints):
+                return np.array(ints, dtype=object)
+    kinds = {"int": "iu", "float": "iuf", "bool": "b", "str": "U", "list": "O"}.get(port_type)
+    if kinds is not None and (array.dtype.kind not in kinds or (rows and array.ndim != 1)):
+        raise ExecutionError(f"{what} must be a column of {port_type}, got {array.dtype}")
+    return array.astype(np.float64) if port_type == "float" else array
+
+
+class GraphExecutor:
+    def __init__(self, sandbox: SandboxPool, builtins: Optional[Dict[str, Callable[..., Any]]] = None,
+                 cache: Optional[ResultCache] = None):
+        self.sandbox = sandbox
+        self.builtins = BUILTINS if builtins is None else builtins
+        self.cache = cache
+        # name -> (signature, code); the box's signature must match to use it
+        self.user_functions: Dict[str, Tuple[FunctionSignature, UserFunction]] = {}
+        self._impure: Set[str] = set()
+
+    def register(self, signature: FunctionSignature, function: UserFunction, pure: bool = True) -> None:
+        """Use ``function`` for boxes with ``signature``; impure results are never cached."""
+        if signature.name in self.builtins:
+            raise ExecutionError(f"{signature.name} is a built-in function")
+        self.user_functions[signature.name] = (signature, function)
+        if pure:
+            self._impure.discard(signature.name)
+        else:
+            self._impure.add(signature.name)
+
+    def _metric_name(self, signature: FunctionSignature) -> str:
+        # Imported graphs can name anything; keep metric labels to known functions
+        if signature.name in self.builtins or signature.name in self.user_functions:
+            return signature.name
+        return "<unregistered>"
+
+    def chunked_input(self, signature: FunctionSignature) -> Optional[str]:
+        """The input a box streamed from a source reads as chunks of one text, if any."""
+        registered = self.user_functions.get(signature.name)
+        if registered is not None and registered[0] is signature:
+            return None
+        chunked = CHUNKED.get(signature.name)
+        return chunked[0] if chunked is not None else None
+
+    def _function_key(self, signature: FunctionSignature) -> Optional[str]:
+        # Identifies the code a box runs, or None if its results are not reusable
+        ports = repr((signature.inputs, signature.outputs))
+        registered = self.user_functions.get(signature.name)
+        if registered is not None and registered[0] is signature:
+            return None if signature.name in self._impure else f"user:{registered[1].digest}:{ports}"
+        if signature.name in self.builtins and signature.name not in IMPURE_BUILTINS:
+            return f"builtin:{signature.name}:{ports}"
+        return None
+
+    def _levels(self, store: GraphStore) -> List[List[Box]]:
+        indegree = dict.fromkeys(store.boxes, 0)
+        successors = defaultdict(list)
+        for edge in store.connections.values():
+            successors[edge.source_box].append(edge.target_box)
+            indegree[edge.target_box] += 1
+        level = [store.boxes[box_id] for box_id, count in indegree.items() if count == 0]
+        levels = []
+        while level:
+            levels.append(level)
+            following = []
+            for box in level:
+                for target in successors[box.id]:
+                    indegree[target] -= 1
+                    if indegree[target] == 0:
+                        following.append(store.boxes[target])
+            level = following
+        if sum(map(len, levels)) != len(store.boxes):
+            raise ExecutionError("graph contains a cycle")
+        return levels
+
+    def _arguments(self, box: Box, feeds: Dict[Tuple[str, str], Tuple[str, str]],
+                   results: Results, inputs: Dict[str, Dict[str, Any]]) -> List[Any]:
+        args = []
+        for port in box.signature.inputs:
+            feed = feeds.get((box.id, port.name))
+            if feed is not None:
+                value = results[feed[0]][feed[1]]
+            elif port.name in inputs.get(box.id, {}):
+                value = inputs[box.id][port.name]
+            else:
+                raise ExecutionError(f"{box.signature.name} ({box.id}): input {port.name} is not connected or given")
+            _check_type(value, port.type, f"{box.signature.name} ({box.id}) input {port.name}")
+            args.append(value)
+        return args
+
+    async def _call(self, box: Box, args: List[Any], hits: Optional[Set[str]] = None) -> Dict[str, Any]:
+        signature = box.signature
+        key = None
+        if self.cache is not None:
+            function_key = self._function_key(signature)
+            if function_key is not None:
+                key = result_key(function_key, args)
+            if key is not None:
+                cached = await self.cache.get_async(key)
+                if cached is not None:
+                    _CACHE_HITS.inc()
+                    if hits is not None:
+                        hits.add(box.id)
+                    return cached
+                _CACHE_MISSES.inc()
+        registered = self.user_functions.get(signature.name)
+        user = registered is not None and registered[0] is signature
+        with NODE_SECONDS.time(self._metric_name(signature), "user" if user else "builtin"):
+            try:
+                if user:
+                    result = await self.sandbox.call(registered[1], args)
+                elif signature.name in self.builtins:
+                    result = self.builtins[signature.name](*args)
+                else:
+                    raise ExecutionError(f"no implementation registered for {signature.name}")
+            except SandboxError as e:
+                raise ExecutionError(f"{box.id}: {e}") from None
+            except ExecutionError:
+                raise
+            except Exception as e:
+                raise ExecutionError(f"{signature.name} ({box.id}) raised {type(e).__name__}: {e}") from None
+
+        outputs = signature.outputs
+        if len(outputs) == 1:
+            result = (result,)
+        elif not isinstance(result, (tuple, list)) or len(result) != len(outputs):
+            raise ExecutionError(f"{signature.name} ({box.id}) must return {len(outputs)} values")
+        for port, value in zip(outputs, result):
+            _check_type(value, port.type, f"{signature.name} ({box.id}) output {port.name}")
+        result = {port.name: value for port, value in zip(outputs, result)}
+        if key is not None:
+            await self.cache.put_async(key, result)
+        return result
+
+    def _feeds(self, store: GraphStore) -> Dict[Tuple[str, str], Tuple[str, str]]:
+        feeds: Dict[Tuple[str, str], Tuple[str, str]] = {}
+        for edge in store.connections.values():
+            key = (edge.target_box, edge.target_input)
+            if key in feeds:
+                raise ExecutionError(f"input {edge.target_input} of {edge.target_box} has several connections")
+            feeds[key] = (edge.source_box, edge.source_output)
+        return feeds
+
+    async def run(self, store: GraphStore, inputs: Optional[Dict[str, Dict[str, Any]]] = None,
+                  hits: Optional[Set[str]] = None,
+                  progress: Optional[Callable[[Box, Dict[str, Any]], None]] = None) -> Results:
+        """Outputs of every box, as ``{box_id: {output_name: value}}``.
+
+        Ids of boxes answered from the result cache are added to ``hits``;
+        ``progress`` is called with each box and its outputs as it finishes.
+        """
+        inputs = inputs or {}
+        feeds = self._feeds(store)
+        results: Results = {}
+
+        async def call(box: Box, args: List[Any]) -> Dict[str, Any]:
+            outputs = await self._call(box, args, hits)
+            if progress is not None:
+                progress(box, outputs)
+            return outputs
+
+        with RUN_SECONDS.time("run"):
+            for level in self._levels(store):
+                args = [self._arguments(box, feeds, results, inputs) for box in level]
+                calls = [call(box, box_args) for box, box_args in zip(level, args)]
+                for box, outputs in zip(level, await asyncio.gather(*calls)):
+                    results[box.id] = outputs
+        return results
+
+    def _batch_arguments(self, box: Box, feeds: Dict[Tuple[str, str], Tuple[str, str]],
+                         results: Columns, inputs: Dict[str, Dict[str, Any]], rows: int) -> List[np.ndarray]:
+        columns = []
+        for port in box.signature.inputs:
+            feed = feeds.get((box.id, port.name))
+            if feed is not None:
+                columns.append(results[feed[0]][feed[1]])
+            elif port.name in inputs.get(box.id, {}):
+                what = f"{box.signature.name} ({box.id}) input {port.name}"
+                columns.append(_column(inputs[box.id][port.name], port.type, rows, what))
+            else:
+                raise ExecutionError(f"{box.signature.name} ({box.id}): input {port.name} is not connected or given")
+        return columns
+
+    async def _call_batch(self, box: Box, columns: List[np.ndarray], rows: int) -> Dict[str, np.ndarray]:
+        signature = box.signature
+        registered = self.user_functions.get(signature.name)
+        outputs = signature.outputs
+        with NODE_SECONDS.time(self._metric_name(signature), "batch"):
+            try:
+                if registered is not None and registered[0] is signature:
+                    result = await self.sandbox.map(registered[1], [column.tolist() for column in columns], rows)
+                elif signature.name in VECTORIZED:
+                    result = VECTORIZED[signature.name](rows, *columns)
+                    if len(outputs) == 1:
+                        result = (result,)
+                elif signature.name in self.builtins:
+                    function = self.builtins[signature.name]
+                    result = [function(*row) for row in zip(*(column.tolist() for column in columns))] \
+                        if columns else [function() for _ in range(rows)]
+                else:
+                    raise ExecutionError(f"no implementation registered for {signature.name}")
+            except SandboxError as e:
+                raise ExecutionError(f"{box.id}: {e}") from None
+            except ExecutionError:
+                raise
+            except Exception as e:
+                raise ExecutionError(f"{signature.name} ({box.id}) raised {type(e).__name__}: {e}") from None
+
+        if isinstance(result, list):
+            # Row results: one value per row, or a tuple per row for several outputs
+            if len(outputs) == 1:
+                result = (result,)
+            elif not all(isinstance(row, (tuple, list)) and len(row) == len(outputs) for row in result):
+                raise ExecutionError(f"{signature.name} ({box.id}) must return {len(outputs)} values")
+            else:
+                result = tuple(map(list, zip(*result))) if result else ([],) * len(outputs)
+        return {port.name: _column(values, port.type, rows, f"{signature.name} ({box.id}) output {port.name}")
+                for port, values in zip(outputs, result)}
+
+    async def run_batch(self, store: GraphStore, inputs: Optional[Dict[str, Dict[str, Any]]] = None,
+                        rows: Optional[int] = None) -> Columns:
+        """Output columns of every box, as ``{box_id: {output_name: array}}``.
+
+        Given inputs are columns (lists or arrays) of one length, or scalars
+        repeated down every row; a ``list`` input is always a column.  ``rows``
+        is needed only when no input is a column.
+        """
+        inputs = inputs or {}
+        if rows is None:
+            lengths = {len(value) for values in inputs.values() for value in values.values()
+                       if isinstance(value, (list, np.ndarray))}
+            if len(lengths) > 1:
+                raise ExecutionError(f"input columns have different lengths: {sorted(lengths)}")
+            if not lengths:
+                raise ExecutionError("no input columns; give the number of rows")
+            rows = lengths.pop()
+        feeds = self._feeds(store)
+        results: Columns = {}
+        with RUN_SECONDS.time("batch"):
+            for level in self._levels(store):
+                columns = [self._batch_arguments(box, feeds, results, inputs, rows) for box in level]
+                calls = [self._call_batch(box, box_columns, rows) for box, box_columns in zip(level, columns)]
+                for box, outputs in zip(level, await asyncio.gather(*calls)):
+                    results[box.id] = outputs
+        return results
+
+    async def _per_batch(self, box: Box, inputs: List[AsyncIterator[list]]) -> AsyncIterator[tuple]:
+        signature = box.signature
+        pending: List[list] = [[] for _ in inputs]
+        while True:
+            for i, iterator in enumerate(inputs):
+                if not pending[i]:
+                    try:
+                        pending[i] = await anext(iterator)
+                    except StopAsyncIteration:
+                        return
+            # Inputs arrive in differently sized batches; run the rows all have
+            rows = min(map(len, pending))
+            columns = [_column(values[:rows], port.type, rows, f"{signature.name} ({box.id}) input {port.name}")
+                       for port, values in zip(signature.inputs, pending)]
+            pending = [values[rows:] for values in pending]
+            outputs = await self._call_batch(box, columns, rows)
+            yield tuple(outputs[port.name].tolist() for port in signature.outputs)
+
+    def stream(self, store: GraphStore, sources: Dict[str, Dict[str, AsyncIterable[Any]]],
+               inputs: Optional[Dict[str, Dict[str, Any]]] = None,
+               buffer: int = STREAM_BUFFER) -> AsyncIterator[Tuple[str, str, Any]]:
+        """Stream ``(box_id, output_name, value)`` for every unconnected output.
+
+        ``sources[box_id][input]`` are async iterables feeding inputs item by
+        item (element by element for ``list`` inputs); a box in ``CHUNKED``
+        reads the items of its named source as chunks of one text.  ``inputs``
+        holds constants.  Every box needs at least one streamed input.  The graph
+        is checked before anything runs.
+        """
+        inputs = inputs or {}
+        self._feeds(store)
+        self._levels(store)
+        queues = {(edge.target_box, edge.target_input): asyncio.Queue(buffer) for edge in store.connections.values()}
+        targets: Dict[Tuple[str, str], List[asyncio.Queue]] = defaultdict(list)
+        for edge in store.connections.values():
+            targets[(edge.source_box, edge.source_output)].append(queues[(edge.target_box, edge.target_input)])
+
+        plans, pumps = [], []
+        for box in store.boxes.values():
+            signature = box.signature
+            iterators, streamed, sourced = [], False, set()
+            for port in signature.inputs:
+                key = (box.id, port.name)
+                if key not in queues and port.name in sources.get(box.id, {}):
+                    queues[key] = asyncio.Queue(buffer)
+                    pumps.append((box, port, sources[box.id][port.name], queues[key]))
+                    sourced.add(port.name)
+                if key in queues:
+                    iterators.append(_read(queues[key]))
+                    streamed = True
+                elif port.name in inputs.get(box.id, {}):
+                    value = inputs[box.id][port.name]
+                    if port.type == "list":
+                        if not isinstance(value, list):
+                            raise ExecutionError(f"{signature.name} ({box.id}) input {port.name} must be list")
+                        iterators.append(_elements(value))
+                        streamed = True
+                    else:
+                        _check_type(value, port.type, f"{signature.name} ({box.id}) input {port.name}")
+                        iterators.append(_repeat(value))
+                else:
+                    raise ExecutionError(f"{signature.name} ({box.id}): input {port.name} is not connected or given")
+            if not streamed:
+                raise ExecutionError(f"{signature.name} ({box.id}) has no streamed input")
+            registered = self.user_functions.get(signature.name)
+            builtin = not (registered is not None and registered[0] is signature)
+            if self.chunked_input(signature) in sourced:
+                batches = CHUNKED[signature.name][1](*iterators)
+            elif builtin and signature.name in STREAMING:
+                batches = STREAMING[signature.name](*iterators)
+            elif any(port.type == "list" for port in signature.inputs + signature.outputs):
+                raise ExecutionError(f"{signature.name} ({box.id}) cannot run in streaming mode")
+            else:
+                batches = self._per_batch(box, iterators)
+            plans.append((box, batches))
+        return self._stream_run(plans, pumps, queues, targets, buffer)
+
+    async def _stream_run(self, plans: List[Tuple[Box, AsyncIterator[tuple]]], pumps: List[tuple],
+                          queues: Dict[Tuple[str, str], asyncio.Queue],
+                          targets: Dict[Tuple[str, str], List[asyncio.Queue]],
+                          buffer: int) -> AsyncIterator[Tuple[str, str, Any]]:
+        sink: asyncio.Queue = asyncio.Queue(buffer)
+
+        async def run_box(box: Box, batches: AsyncIterator[tuple]) -> None:
+            try:
+                outputs = [(port.name, targets.get((box.id, port.name))) for port in box.signature.outputs]
+                async for columns in batches:
+                    for (name, consumers), values in zip(outputs, columns):
+                        for start in range(0, len(values), STREAM_BATCH):
+                            batch = values[start:start + STREAM_BATCH]
+                            if consumers is None:
+                                await sink.put([(box.id, name, value) for value in batch])
+                            else:
+                                for queue in consumers:
+                                    await queue.put(batch)
+                # Stopped early (another input ended): let upstream finish
+                for port in box.signature.inputs:
+                    queue = queues.get((box.id, port.name))
+                    if queue is not None:
+                        while await queue.get() is not _END:
+                            pass
+                for _, consumers in outputs:
+                    for queue in consumers or ():
+                        await queue.put(_END)
+                await sink.put(_END)
+            except asyncio.CancelledError:
+                raise
+            except ExecutionError as e:
+                await sink.put(e)
+            except Exception as e:
+                await sink.put(ExecutionError(f"{box.signature.name} ({box.id}) raised {type(e).__name__}: {e}"))
+
+        async def run_pump(box: Box, port: Port, source: AsyncIterable[Any], queue: asyncio.Queue) -> None:
+            try:
+                await _pump(source, queue)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                await sink.put(ExecutionError(
+                    f"{box.signature.name} ({box.id}) input {port.name}: {type(e).__name__}: {e}"))
+
+        tasks = [asyncio.create_task(run_box(box, batches)) for box, batches in plans]
+        running = len(tasks)
+        tasks += [asyncio.create_task(run_pump(*pump)) for pump in pumps]
+        try:
+            while running:
+                item = await sink.get()
+                if item is _END:
+                    running -= 1
+                elif isinstance(item, ExecutionError):
+                    raise item
+                else:
+                    for result in item:
+                        yield result
+        finally:
+            for task in tasks:
+                task.cancel()
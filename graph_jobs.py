@@ -0,0 +1,203 @@
+"""Background graph runs with priorities, progress events and cancellation.
+
+``submit`` snapshots the graph and queues a job; a fixed number of worker
+tasks take jobs highest priority first (first come, first served within a
+priority), so a burst of heavy runs waits in the queue instead of holding
+request handlers, and the queue itself is bounded.  Each job records an
+ordered list of events (queued, started, one per finished box, then done,
+failed or cancelled) that any number of subscribers can replay and follow
+from any position, e.g. to resume a Server-Sent Events stream.
+
+Cancelling a running job stops it between boxes; a user function already
+running in the sandbox finishes its current call.
+"""
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
+import itertools
+import time
+import uuid
+
+from graph_exec import ExecutionError, GraphExecutor, Results
+from graph_store import Box, GraphStore
+
+JOB_WORKERS = 2
+MAX_QUEUED = 100
+# Finished jobs kept for status queries and late subscribers
+MAX_FINISHED = 200
+HEARTBEAT_SECONDS = 15.0
+
+FINISHED = ("done", "failed", "cancelled")
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class Job:
+    __slots__ = ("id", "priority", "status", "store", "inputs", "created", "started", "finished",
+                 "total", "completed", "results", "cached", "error", "events", "_changed", "_task")
+
+    def __init__(self, store: GraphStore, inputs: Dict[str, Dict[str, Any]], priority: int):
+        self.id = str(uuid.uuid4())
+        self.priority = priority
+        self.status = "queued"
+        self.store = store
+        self.inputs = inputs
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.total = len(store.boxes)
+        self.completed = 0
+        self.results: Results = {}
+        self.cached: set = set()
+        self.error: Optional[str] = None
+        self.events: List[Dict[str, Any]] = []
+        self._changed = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def _emit(self, event: Dict[str, Any]) -> None:
+        self.events.append(event)
+        # Wake every waiting subscriber; later waits use a fresh event
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def _finish(self, status: str, **details: Any) -> None:
+        self.status = status
+        self.finished = time.time()
+        self.store = None  # the snapshot is no longer needed
+        self._emit({"type": status, **details})
+
+    def summary(self) -> Dict[str, Any]:
+        summary = {"id": self.id, "status": self.status, "priority": self.priority,
+                   "created": self.created, "started": self.started, "finished": self.finished,
+                   "completed": self.completed, "total": self.total}
+        if self.status == "done":
+            summary["results"] = self.results
+            summary["cached"] = sorted(self.cached)
+        elif self.error is not None:
+            summary["error"] = self.error
+        return summary
+
+
+class JobScheduler:
+    def __init__(self, executor: GraphExecutor, workers: int = JOB_WORKERS, max_queued: int = MAX_QUEUED,
+                 max_finished: int = MAX_FINISHED):
+        self.executor = executor
+        self.workers = workers
+        self.max_queued = max_queued
+        self.max_finished = max_finished
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._queued = 0
+        self._order = itertools.count()
+        self._workers: List[asyncio.Task] = []
+        self._stopping = False
+
+    def start(self) -> None:
+        """Start the worker tasks; call from within the running event loop."""
+        self._queue = asyncio.PriorityQueue()
+        self._stopping = False
+        self._workers = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def shutdown(self) -> None:
+        # A worker cancelled while awaiting a job sees the job absorb the
+        # cancellation, so it also checks this flag
+        self._stopping = True
+        for job in self.jobs.values():
+            if job.status not in FINISHED:
+                self.cancel(job.id)
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def submit(self, store: GraphStore, inputs: Optional[Dict[str, Dict[str, Any]]] = None,
+               priority: int = 0) -> Job:
+        """Queue a run of a snapshot of ``store``; higher ``priority`` runs first."""
+        if self._queued >= self.max_queued:
+            raise QueueFullError(f"{self._queued} jobs are already waiting")
+        job = Job(store.snapshot(), inputs or {}, priority)
+        self.jobs[job.id] = job
+        self._queued += 1
+        job._emit({"type": "queued", "priority": priority, "total": job.total})
+        self._queue.put_nowait((-priority, next(self._order), job))
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        job = self.jobs.get(job_id)
+        if job is None or job.status in FINISHED:
+            return job
+        if job._task is not None:
+            job._task.cancel()  # _run records the cancellation
+        else:
+            # Still queued: the worker that dequeues it skips it
+            self._queued -= 1
+            job._finish("cancelled")
+            self._forget_finished()
+        return job
+
+    async def events(self, job: Job, start: int = 0,
+                     heartbeat: float = HEARTBEAT_SECONDS) -> AsyncIterator[Optional[Tuple[int, Dict[str, Any]]]]:
+        """``(index, event)`` pairs from ``start`` on, ending after the final event.
+
+        Yields None whenever ``heartbeat`` seconds pass without an event.
+        """
+        index = start
+        while True:
+            changed = job._changed
+            while index < len(job.events):
+                yield index, job.events[index]
+                index += 1
+            if job.status in FINISHED:
+                return
+            try:
+                await asyncio.wait_for(changed.wait(), heartbeat)
+            except asyncio.TimeoutError:
+                yield None
+
+    async def _work(self) -> None:
+        while True:
+            _, _, job = await self._queue.get()
+            if job.status != "queued":
+                continue  # cancelled while waiting
+            self._queued -= 1
+            job._task = asyncio.create_task(self._run(job))
+            try:
+                await job._task
+            finally:
+                self._forget_finished()
+            if self._stopping:
+                return
+
+    async def _run(self, job: Job) -> None:
+        job.status = "running"
+        job.started = time.time()
+        job._emit({"type": "started"})
+
+        def progress(box: Box, outputs: Dict[str, Any]) -> None:
+            job.completed += 1
+            job.results[box.id] = outputs
+            job._emit({"type": "node", "box": box.id, "outputs": outputs, "cached": box.id in job.cached,
+                       "completed": job.completed, "total": job.total})
+
+        try:
+            await self.executor.run(job.store, job.inputs, job.cached, progress)
+        except asyncio.CancelledError:
+            job._finish("cancelled")
+        except ExecutionError as e:
+            job.error = str(e)
+            job._finish("failed", error=job.error)
+        except Exception as e:
+            job.error = f"{type(e).__name__}: {e}"
+            job._finish("failed", error=job.error)
+        else:
+            job._finish("done")
+
+    def _forget_finished(self) -> None:
+        finished = [job_id for job_id, job in self.jobs.items() if job.status in FINISHED]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self.jobs[job_id]
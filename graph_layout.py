@@ -0,0 +1,126 @@
+"""Layered (Sugiyama-style) layout for function graphs.
+
+Boxes flow left to right: every connection points from a box in one layer
+to a box in a later layer.  The steps are the classic ones, each kept
+linear or close to it so graphs of thousands of nodes lay out in well under
+a second:
+
+1. break cycles by reversing DFS back edges;
+2. assign layers by longest path from the sources;
+3. order each layer by the barycenter heuristic, sweeping back and forth;
+4. place layers in columns and nodes at even spacing, centred vertically.
+
+Instead of splitting long edges into per-layer dummy nodes, which costs
+the total edge span and explodes on long pipelines, a barycenter is taken
+over a node's neighbours in whatever layer they sit, using their centred
+slot positions.
+"""
+from collections import defaultdict
+from typing import Dict, Hashable, Iterable, List, Sequence, Tuple
+
+from graph_store import BOX_HEIGHT, BOX_WIDTH
+
+# Space left between neighbouring boxes, beyond the boxes' own size
+BOX_GAP = 60
+LAYER_SPACING = BOX_WIDTH + BOX_GAP
+NODE_SPACING = BOX_HEIGHT + BOX_GAP
+SWEEPS = 4
+
+
+def _acyclic_edges(nodes: Sequence[Hashable], edges: List[Tuple[Hashable, Hashable]]) -> List[Tuple[Hashable, Hashable]]:
+    successors = defaultdict(list)
+    for source, target in edges:
+        successors[source].append(target)
+    state = {}  # 1 = on the DFS stack, 2 = finished
+    back = set()
+    for root in nodes:
+        if root in state:
+            continue
+        state[root] = 1
+        stack = [(root, iter(successors[root]))]
+        while stack:
+            node, children = stack[-1]
+            for child in children:
+                if state.get(child) == 1:
+                    back.add((node, child))
+                elif child not in state:
+                    state[child] = 1
+                    stack.append((child, iter(successors[child])))
+                    break
+            else:
+                state[node] = 2
+                stack.pop()
+    return [(t, s) if (s, t) in back else (s, t) for s, t in edges if s != t]
+
+
+def _layers(nodes: Sequence[Hashable], edges: List[Tuple[Hashable, Hashable]]) -> Dict[Hashable, int]:
+    successors = defaultdict(list)
+    indegree = dict.fromkeys(nodes, 0)
+    for source, target in edges:
+        successors[source].append(target)
+        indegree[target] += 1
+    layer = dict.fromkeys(nodes, 0)
+    ready = [node for node in nodes if indegree[node] == 0]
+    while ready:
+        node = ready.pop()
+        for target in successors[node]:
+            layer[target] = max(layer[target], layer[node] + 1)
+            indegree[target] -= 1
+            if indegree[target] == 0:
+                ready.append(target)
+    return layer
+
+
+def _barycenter_order(layer_nodes: List[Hashable], neighbours: Dict[Hashable, List[Hashable]],
+                      rank: Dict[Hashable, float]) -> List[Hashable]:
+    keyed = []
+    for i, node in enumerate(layer_nodes):
+        placed = [rank[n] for n in neighbours[node]]
+        # Nodes without neighbours on that side keep their place
+        keyed.append((sum(placed) / len(placed) if placed else rank[node], i, node))
+    keyed.sort()
+    ordered = [node for _, _, node in keyed]
+    _rank_layer(ordered, rank)
+    return ordered
+
+
+def _rank_layer(layer_nodes: List[Hashable], rank: Dict[Hashable, float]) -> None:
+    # Slots are centred on zero, matching the final vertical placement
+    middle = (len(layer_nodes) - 1) / 2
+    for j, node in enumerate(layer_nodes):
+        rank[node] = j - middle
+
+
+def layered_layout(nodes: Sequence[Hashable], edges: Iterable[Tuple[Hashable, Hashable]],
+                   origin: Tuple[float, float] = (100, 100), layer_spacing: float = LAYER_SPACING,
+                   node_spacing: float = NODE_SPACING, sweeps: int = SWEEPS) -> Dict[Hashable, Tuple[float, float]]:
+    """``{node: (x, y)}`` for a left-to-right layered drawing of the graph."""
+    edges = list(dict.fromkeys(_acyclic_edges(nodes, list(edges))))
+    layer = _layers(nodes, edges)
+
+    layer_count = max(layer.values(), default=-1) + 1
+    layers: List[List[Hashable]] = [[] for _ in range(layer_count)]
+    for node in nodes:
+        layers[layer[node]].append(node)
+    up = defaultdict(list)
+    down = defaultdict(list)
+    for source, target in edges:
+        down[source].append(target)
+        up[target].append(source)
+
+    rank: Dict[Hashable, float] = {}
+    for nodes_in_layer in layers:
+        _rank_layer(nodes_in_layer, rank)
+    for sweep in range(sweeps):
+        if sweep % 2 == 0:
+            for i in range(1, layer_count):
+                layers[i] = _barycenter_order(layers[i], up, rank)
+        else:
+            for i in range(layer_count - 2, -1, -1):
+                layers[i] = _barycenter_order(layers[i], down, rank)
+
+    x0, y0 = origin
+    tallest = max((len(nodes_in_layer) for nodes_in_layer in layers), default=0)
+    middle = (tallest - 1) / 2
+    return {node: (x0 + layer[node] * layer_spacing, y0 + (middle + rank[node]) * node_spacing)
+            for node in nodes}
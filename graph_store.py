@@ -0,0 +1,239 @@
+"""Allocation-light in-memory storage for function graphs.
+
+Boxes and connections are ``__slots__`` dataclasses, and every box points to
+one shared, interned ``FunctionSignature`` instead of carrying its own copy
+of the input/output lists, so a box costs a few small objects however many
+ports its function has.  Pydantic models stay at the API boundary.
+
+The store also caches the JSON encoding of each object and of the whole
+box/connection lists; any mutation bumps ``version`` and invalidates the
+entries it touched.  A uniform grid over box positions answers viewport
+queries without scanning every box.
+"""
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+import math
+import uuid
+import weakref
+
+from json_response import dumps, json_array, json_object
+
+# Boxes are stored by their top-left corner; queries are widened by this
+# much so boxes reaching into the viewport from above or the left are found
+BOX_WIDTH = 260
+BOX_HEIGHT = 220
+GRID_CELL = 512
+
+
+@dataclass(frozen=True, slots=True, weakref_slot=True)
+class Port:
+    name: str
+    type: str
+
+
+@dataclass(frozen=True, slots=True, weakref_slot=True)
+class FunctionSignature:
+    name: str
+    description: str
+    inputs: Tuple[Port, ...]
+    outputs: Tuple[Port, ...]
+
+    def input(self, name: str) -> Optional[Port]:
+        return next((port for port in self.inputs if port.name == name), None)
+
+    def output(self, name: str) -> Optional[Port]:
+        return next((port for port in self.outputs if port.name == name), None)
+
+
+@dataclass(slots=True)
+class Box:
+    id: str
+    signature: FunctionSignature
+    x: float
+    y: float
+
+
+@dataclass(frozen=True, slots=True)
+class Edge:
+    id: str
+    source_box: str
+    source_output: str
+    target_box: str
+    target_input: str
+
+
+# Shared by every store, so identical functions share one signature object;
+# an entry goes away once no box or catalog holds its object any more
+_signatures: "weakref.WeakValueDictionary[tuple, FunctionSignature]" = weakref.WeakValueDictionary()
+_ports: "weakref.WeakValueDictionary[Tuple[str, str], Port]" = weakref.WeakValueDictionary()
+
+
+def _port(name: str, type_: str) -> Port:
+    key = (name, type_)
+    port = _ports.get(key)
+    if port is None:
+        port = _ports[key] = Port(name, type_)
+    return port
+
+
+def intern_signature(name: str, description: str,
+                     inputs: Iterable[Tuple[str, str]], outputs: Iterable[Tuple[str, str]]) -> FunctionSignature:
+    """The shared signature for a function; ports are ``(name, type)`` pairs."""
+    inputs = tuple(_port(*port) for port in inputs)
+    outputs = tuple(_port(*port) for port in outputs)
+    key = (name, description, inputs, outputs)
+    signature = _signatures.get(key)
+    if signature is None:
+        signature = _signatures[key] = FunctionSignature(name, description, inputs, outputs)
+    return signature
+
+
+def signature_from_dict(definition: dict) -> FunctionSignature:
+    """Intern a ``{"name", "description", "inputs", "outputs"}`` definition."""
+    return intern_signature(
+        definition["name"], definition.get("description", ""),
+        ((port["name"], port["type"]) for port in definition["inputs"]),
+        ((port["name"], port["type"]) for port in definition["outputs"]),
+    )
+
+
+def _cell(x: float, y: float) -> Tuple[int, int]:
+    return math.floor(x / GRID_CELL), math.floor(y / GRID_CELL)
+
+
+class GraphStore:
+    def __init__(self):
+        self.boxes: Dict[str, Box] = {}
+        self.connections: Dict[str, Edge] = {}
+        self.version = 0
+        self._fragments: Dict[str, bytes] = {}
+        self._payloads: Dict[str, Tuple[int, bytes]] = {}
+        self._grid: Dict[Tuple[int, int], Set[str]] = defaultdict(set)
+        self._edges_by_box: Dict[str, Set[str]] = defaultdict(set)
+
+    def _changed(self, *ids: str) -> None:
+        self.version += 1
+        for object_id in ids:
+            self._fragments.pop(object_id, None)
+
+    def add_box(self, signature: FunctionSignature, x: float, y: float, box_id: Optional[str] = None) -> Box:
+        box = Box(box_id or str(uuid.uuid4()), signature, float(x), float(y))
+        self.boxes[box.id] = box
+        self._grid[_cell(box.x, box.y)].add(box.id)
+        self._changed(box.id)
+        return box
+
+    def move_box(self, box: Box, x: float, y: float) -> None:
+        old_cell, new_cell = _cell(box.x, box.y), _cell(x, y)
+        if old_cell != new_cell:
+            self._grid[old_cell].discard(box.id)
+            if not self._grid[old_cell]:
+                del self._grid[old_cell]
+            self._grid[new_cell].add(box.id)
+        box.x = float(x)
+        box.y = float(y)
+        self._changed(box.id)
+
+    def add_connection(self, source_box: str, source_output: str, target_box: str, target_input: str,
+                       connection_id: Optional[str] = None) -> Edge:
+        edge = Edge(connection_id or str(uuid.uuid4()), source_box, source_output, target_box, target_input)
+        self.connections[edge.id] = edge
+        self._edges_by_box[source_box].add(edge.id)
+        self._edges_by_box[target_box].add(edge.id)
+        self._changed(edge.id)
+        return edge
+
+    def remove_connection(self, connection_id: str) -> None:
+        edge = self.connections.pop(connection_id, None)
+        if edge is not None:
+            self._edges_by_box[edge.source_box].discard(edge.id)
+            self._edges_by_box[edge.target_box].discard(edge.id)
+            self._changed(connection_id)
+
+    def clear(self) -> None:
+        self.boxes.clear()
+        self.connections.clear()
+        self._fragments.clear()
+        self._grid.clear()
+        self._edges_by_box.clear()
+        self._changed()
+
+    def snapshot(self) -> "GraphStore":
+        """An independent copy of the boxes and connections, e.g. to run while editing goes on."""
+        copy = GraphStore()
+        for box in self.boxes.values():
+            copy.add_box(box.signature, box.x, box.y, box.id)
+        for edge in self.connections.values():
+            copy.add_connection(edge.source_box, edge.source_output, edge.target_box, edge.target_input, edge.id)
+        return copy
+
+    def boxes_in(self, left: float, top: float, right: float, bottom: float) -> List[Box]:
+        """Boxes overlapping a rectangle, assuming each is at most BOX_WIDTH x BOX_HEIGHT."""
+        first_x, first_y = _cell(left - BOX_WIDTH, top - BOX_HEIGHT)
+        last_x, last_y = _cell(right, bottom)
+        found = []
+        if (last_x - first_x + 1) * (last_y - first_y + 1) > len(self._grid):
+            # Sparse graph, huge rectangle: walking occupied cells is cheaper
+            cells = (ids for (cx, cy), ids in self._grid.items()
+                     if first_x <= cx <= last_x and first_y <= cy <= last_y)
+        else:
+            cells = (self._grid[(cx, cy)] for cx in range(first_x, last_x + 1)
+                     for cy in range(first_y, last_y + 1) if (cx, cy) in self._grid)
+        for ids in cells:
+            for box_id in ids:
+                box = self.boxes[box_id]
+                if (box.x < right and box.x + BOX_WIDTH > left
+                        and box.y < bottom and box.y + BOX_HEIGHT > top):
+                    found.append(box)
+        return found
+
+    def connections_of(self, box_ids: Iterable[str]) -> List[Edge]:
+        """Connections with at least one end on the given boxes, each once."""
+        edge_ids = set()
+        for box_id in box_ids:
+            edge_ids.update(self._edges_by_box.get(box_id, ()))
+        return [self.connections[edge_id] for edge_id in edge_ids]
+
+    # JSON encoding, in the shape of the API's FunctionBox/Connection models
+
+    def box_json(self, box: Box) -> bytes:
+        data = self._fragments.get(box.id)
+        if data is None:
+            signature = box.signature
+            data = self._fragments[box.id] = dumps({
+                "id": box.id, "name": signature.name, "description": signature.description,
+                "inputs": signature.inputs, "outputs": signature.outputs, "x": box.x, "y": box.y,
+            })
+        return data
+
+    def connection_json(self, edge: Edge) -> bytes:
+        data = self._fragments.get(edge.id)
+        if data is None:
+            data = self._fragments[edge.id] = dumps(edge)
+        return data
+
+    def _cached_payload(self, key: str, build: Callable[[], bytes]) -> bytes:
+        cached = self._payloads.get(key)
+        if cached is None or cached[0] != self.version:
+            cached = self._payloads[key] = (self.version, build())
+        return cached[1]
+
+    def boxes_json(self) -> bytes:
+        return self._cached_payload("boxes", lambda: json_array(map(self.box_json, self.boxes.values())))
+
+    def connections_json(self) -> bytes:
+        return self._cached_payload(
+            "connections", lambda: json_array(map(self.connection_json, self.connections.values())))
+
+    def viewport_json(self, left: float, top: float, right: float, bottom: float) -> bytes:
+        boxes = self.boxes_in(left, top, right, bottom)
+        connections = self.connections_of(box.id for box in boxes)
+        return json_object(
+            boxes=json_array(map(self.box_json, boxes)),
+            connections=json_array(map(self.connection_json, connections)),
+        )
+
+    def export_json(self) -> bytes:
+        return self._cached_payload(
+            "export", lambda: json_object(boxes=self.boxes_json(), connections=self.connections_json()))
@@ -0,0 +1,44 @@
+"""orjson-backed JSON responses and helpers for pre-serialized payloads.
+
+Hot endpoints keep already-encoded JSON fragments (catalog entries, boxes,
+connections) and splice them into a response body, so a request does no
+model-to-dict conversion or re-encoding of data that has not changed.
+"""
+from typing import Any, Iterable
+import json
+
+from fastapi.responses import JSONResponse, Response
+import orjson
+
+
+loads = orjson.loads
+
+
+def dumps(content: Any) -> bytes:
+    try:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    except TypeError:
+        # orjson rejects ints beyond 64 bits; the stdlib encoder does not
+        return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def json_array(fragments: Iterable[bytes]) -> bytes:
+    """Join already-encoded JSON values into a JSON array."""
+    return b"[" + b",".join(fragments) + b"]"
+
+
+def json_object(**fragments: bytes) -> bytes:
+    """Build a JSON object from already-encoded member values."""
+    return b"{" + b",".join(dumps(key) + b":" + value for key, value in fragments.items()) + b"}"
+
+
+class FastJSONResponse(JSONResponse):
+    """Drop-in ``JSONResponse`` that encodes with orjson."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class RawJSONResponse(Response):
+    """Response whose content is already-encoded JSON bytes."""
+    media_type = "application/json"
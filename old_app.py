@@ -1,15 +1,51 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import Dict, List, Any, Optional
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Any, Optional
+import codecs
 import json
+import math
+import os
 import random
-import uuid
 
-app = FastAPI()
+from api_auth import check_bearer
+from function_sandbox import SandboxError, SandboxPool, prepare_function
+from graph_exec import PORT_TYPES, ExecutionError, GraphExecutor
+from graph_jobs import QueueFullError, JobScheduler
+from graph_layout import NODE_SPACING, layered_layout
+from graph_store import GraphStore, intern_signature, signature_from_dict
+from json_response import FastJSONResponse, RawJSONResponse, dumps, json_array, json_object, loads
+from metrics import MetricsMiddleware, router as metrics_router
+from result_cache import ResultCache
+from sampling_profiler import router as profiler_router
+from static_page import PrecompressedPage
 
-# Data models
+# Set to a directory to keep function results across restarts
+RESULT_CACHE_DIR: Optional[str] = None
+# Registering a user function needs this bearer token; unset disables registration
+FUNCTIONS_TOKEN: Optional[str] = os.environ.get("FUNCTIONS_TOKEN") or None
+
+# User functions run in these worker processes, started with the app
+sandbox = SandboxPool()
+executor = GraphExecutor(sandbox, cache=ResultCache(directory=RESULT_CACHE_DIR))
+jobs = JobScheduler(executor)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await sandbox.start()
+    jobs.start()
+    yield
+    await jobs.shutdown()
+    await sandbox.shutdown()
+
+app = FastAPI(default_response_class=FastJSONResponse, lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
+app.include_router(metrics_router)
+app.include_router(profiler_router)
+
+# API models; the graph itself is kept in graph_store's slotted classes
 class FunctionIO(BaseModel):
     name: str
     type: str
@@ -30,12 +66,49 @@ class Connection(BaseModel):
     target_box: str
     target_input: str
 
+class ConnectionRequest(BaseModel):
+    source_box: str
+    source_output: str
+    target_box: str
+    target_input: str
+
+class Position(BaseModel):
+    x: float
+    y: float
+
+class NewBox(BaseModel):
+    function: str
+    x: float = 100
+    y: float = 100
+
+class FunctionDefinition(BaseModel):
+    name: str
+    description: str = ""
+    inputs: List[FunctionIO]
+    outputs: List[FunctionIO]
+
+class UserFunctionDefinition(FunctionDefinition):
+    code: str
+    # False for functions whose results may differ between calls with the same inputs
+    pure: bool = True
+
+class ExecuteRequest(BaseModel):
+    inputs: Dict[str, Dict[str, Any]] = {}
+
+class JobRequest(BaseModel):
+    inputs: Dict[str, Dict[str, Any]] = {}
+    priority: int = 0
+
+class BatchExecuteRequest(BaseModel):
+    inputs: Dict[str, Dict[str, Any]] = {}
+    rows: Optional[int] = None
+
 class GraphData(BaseModel):
     boxes: List[FunctionBox]
     connections: List[Connection]
 
 # Global storage (in production, use a database)
-current_graph = GraphData(boxes=[], connections=[])
+current_graph = GraphStore()
 
 # Sample function definitions
 SAMPLE_FUNCTIONS = [
@@ -89,6 +162,16 @@ SAMPLE_FUNCTIONS = [
     }
 ]
 
+SAMPLE_SIGNATURES = {f["name"]: signature_from_dict(f) for f in SAMPLE_FUNCTIONS}
+
+# Registered user functions, by name
+USER_FUNCTIONS: Dict[str, dict] = {}
+
+def _catalog_signature(name: str):
+    if name in USER_FUNCTIONS:
+        return executor.user_functions[name][0]
+    return SAMPLE_SIGNATURES.get(name)
+
 @app.post("/chat")
 async def chat(message: dict):
     """Mock chat endpoint that generates function boxes based on user input"""
@@ -116,54 +199,257 @@ async def chat(message: dict):
     # Create function boxes
     new_boxes = []
     for func_name in matching_functions[:2]:  # Limit to 2 boxes per request
-        func_def = next(f for f in SAMPLE_FUNCTIONS if f["name"] == func_name)
-        
-        box = FunctionBox(
-            id=str(uuid.uuid4()),
-            name=func_def["name"],
-            description=func_def["description"],
-            inputs=[FunctionIO(**inp) for inp in func_def["inputs"]],
-            outputs=[FunctionIO(**out) for out in func_def["outputs"]],
+        box = current_graph.add_box(
+            SAMPLE_SIGNATURES[func_name],
             x=random.randint(100, 500),
             y=random.randint(100, 300)
         )
         new_boxes.append(box)
-        current_graph.boxes.append(box)
     
-    return {
-        "response": f"I found {len(new_boxes)} function(s) that might help: {', '.join([b.name for b in new_boxes])}",
-        "boxes": [box.dict() for box in new_boxes]
-    }
+    return RawJSONResponse(json_object(
+        response=dumps(f"I found {len(new_boxes)} function(s) that might help: {', '.join([b.signature.name for b in new_boxes])}"),
+        boxes=json_array(current_graph.box_json(box) for box in new_boxes),
+    ))
+
+@app.get("/functions", response_model=List[FunctionDefinition])
+async def list_functions():
+    """Built-in and registered functions that boxes can use"""
+    return SAMPLE_FUNCTIONS + list(USER_FUNCTIONS.values())
+
+@app.post("/functions", response_model=FunctionDefinition)
+async def register_function(definition: UserFunctionDefinition, request: Request):
+    """Register (or replace) a user function; its code runs in the sandbox pool"""
+    check_bearer(request, FUNCTIONS_TOKEN)
+    for port in definition.inputs + definition.outputs:
+        if port.type not in PORT_TYPES:
+            raise HTTPException(status_code=400, detail=f"Unknown type {port.type}; use one of {', '.join(PORT_TYPES)}")
+    try:
+        function = prepare_function(definition.name, definition.code, len(definition.inputs))
+        signature = intern_signature(
+            definition.name, definition.description,
+            ((port.name, port.type) for port in definition.inputs),
+            ((port.name, port.type) for port in definition.outputs),
+        )
+        executor.register(signature, function, definition.pure)
+    except (SandboxError, ExecutionError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    USER_FUNCTIONS[definition.name] = definition.model_dump(exclude={"code", "pure"})
+    return USER_FUNCTIONS[definition.name]
+
+@app.post("/execute")
+async def execute_graph(request: ExecuteRequest):
+    """Run the graph; unconnected inputs take values from request.inputs[box_id]
+
+    Boxes listed in "cached" reused an earlier result for the same inputs.
+    """
+    cached = set()
+    try:
+        results = await executor.run(current_graph, request.inputs, cached)
+    except ExecutionError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"results": results, "cached": sorted(cached)}
+
+@app.post("/jobs", status_code=202)
+async def submit_job(request: JobRequest):
+    """Run the current graph in the background; follow it at /jobs/{id}/events"""
+    try:
+        job = jobs.submit(current_graph, request.inputs, request.priority)
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    return {"id": job.id, "status": job.status}
+
+@app.get("/jobs")
+async def list_jobs():
+    return [{"id": job.id, "status": job.status, "priority": job.priority,
+             "completed": job.completed, "total": job.total} for job in jobs.jobs.values()]
 
-@app.get("/boxes")
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.summary()
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    job = jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"id": job.id, "status": job.status}
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str, request: Request):
+    """Server-Sent Events: queued, started, node (per finished box), then done/failed/cancelled.
+
+    Event ids are positions, so a reconnecting EventSource resumes after
+    Last-Event-ID instead of replaying everything.
+    """
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    last = request.headers.get("last-event-id", "")
+    start = int(last) + 1 if last.isdigit() else 0
+
+    async def stream():
+        async for entry in jobs.events(job, start):
+            if entry is None:
+                yield b": keep-alive\n\n"
+            else:
+                index, event = entry
+                yield b"id: %d\nevent: %s\ndata: %s\n\n" % (index, event["type"].encode(), dumps(event))
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get("/cache")
+async def cache_stats():
+    return executor.cache.stats()
+
+@app.delete("/cache")
+async def clear_cache():
+    executor.cache.clear()
+    return {"status": "cleared"}
+
+@app.post("/execute/batch")
+async def execute_graph_batch(request: BatchExecuteRequest):
+    """Run the graph once over columns: request.inputs[box_id][input] is a list of row values"""
+    try:
+        results = await executor.run_batch(current_graph, request.inputs, request.rows)
+    except ExecutionError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return RawJSONResponse(json_object(results=dumps({
+        box_id: {name: column.tolist() for name, column in outputs.items()}
+        for box_id, outputs in results.items()
+    })))
+
+class DuplexStreamingResponse(StreamingResponse):
+    """Streams while the request body is still being read.
+
+    StreamingResponse may listen for disconnects by calling receive(), which
+    would swallow body chunks; a disconnect shows up in request.stream() or
+    in a failed send instead.
+    """
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+
+async def _body_text(request: Request) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    async for chunk in request.stream():
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    text = decoder.decode(b"", final=True)
+    if text:
+        yield text
+
+async def _body_lines(request: Request) -> AsyncIterator[bytes]:
+    # Non-blank lines, without their line endings
+    rest = b""
+    async for chunk in request.stream():
+        lines = (rest + chunk).split(b"\n")
+        rest = lines.pop()
+        for line in lines:
+            if line.strip():
+                yield line.rstrip(b"\r")
+    if rest.strip():
+        yield rest.rstrip(b"\r")
+
+async def _body_strings(request: Request) -> AsyncIterator[str]:
+    # One text value per line
+    async for line in _body_lines(request):
+        yield line.decode("utf-8")
+
+async def _body_values(request: Request) -> AsyncIterator[Any]:
+    # One JSON value per line
+    async for line in _body_lines(request):
+        yield loads(line)
+
+@app.post("/execute/stream")
+async def execute_graph_stream(request: Request, box: str, input: str, inputs: str = "{}"):
+    """Stream the request body into one box input and results out as NDJSON.
+
+    An input that reads one text in chunks (split_string's text) receives
+    the body as it arrives; any other str input receives one value per line
+    and other inputs one JSON value per line.  ``inputs`` is a JSON object of constants, as for
+    /execute.  Each response line is {"box", "output", "value"} for an
+    unconnected output, or a final {"error"}.
+    """
+    target = current_graph.boxes.get(box)
+    port = target and target.signature.input(input)
+    if port is None:
+        raise HTTPException(status_code=404, detail="Box input not found")
+    try:
+        constants = loads(inputs)
+    except ValueError:
+        constants = None
+    if not isinstance(constants, dict):
+        raise HTTPException(status_code=400, detail="inputs must be a JSON object")
+    if input == executor.chunked_input(target.signature):
+        body = _body_text(request)
+    elif port.type == "str":
+        body = _body_strings(request)
+    else:
+        body = _body_values(request)
+    try:
+        results = executor.stream(current_graph, {box: {input: body}}, constants)
+    except ExecutionError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def lines():
+        try:
+            async for box_id, output, value in results:
+                yield dumps({"box": box_id, "output": output, "value": value}) + b"\n"
+        except ExecutionError as e:
+            yield dumps({"error": str(e)}) + b"\n"
+
+    return DuplexStreamingResponse(lines(), media_type="application/x-ndjson")
+
+@app.post("/boxes", response_model=FunctionBox)
+async def create_box(request: NewBox):
+    """Add a box for a built-in or registered function"""
+    signature = _catalog_signature(request.function)
+    if signature is None:
+        raise HTTPException(status_code=404, detail="Function not found")
+    box = current_graph.add_box(signature, request.x, request.y)
+    return RawJSONResponse(current_graph.box_json(box))
+
+@app.get("/boxes", response_model=List[FunctionBox])
 async def get_boxes():
     """Get all current function boxes"""
-    return [box.dict() for box in current_graph.boxes]
+    return RawJSONResponse(current_graph.boxes_json())
+
+@app.get("/viewport", response_model=GraphData)
+async def get_viewport(left: float, top: float, right: float, bottom: float):
+    """Boxes overlapping a canvas rectangle, and the connections touching them"""
+    if not all(math.isfinite(bound) for bound in (left, top, right, bottom)):
+        raise HTTPException(status_code=400, detail="Viewport bounds must be finite")
+    if right <= left or bottom <= top:
+        raise HTTPException(status_code=400, detail="Empty viewport")
+    return RawJSONResponse(current_graph.viewport_json(left, top, right, bottom))
 
 @app.post("/boxes/{box_id}/position")
-async def update_box_position(box_id: str, position: dict):
+async def update_box_position(box_id: str, position: Position):
     """Update a box's position"""
-    box = next((b for b in current_graph.boxes if b.id == box_id), None)
+    box = current_graph.boxes.get(box_id)
     if not box:
         raise HTTPException(status_code=404, detail="Box not found")
     
-    box.x = position["x"]
-    box.y = position["y"]
+    current_graph.move_box(box, position.x, position.y)
     return {"status": "updated"}
 
-@app.post("/connections")
-async def create_connection(connection: dict):
+@app.post("/connections", response_model=Connection)
+async def create_connection(connection: ConnectionRequest):
     """Create a new connection between boxes"""
     # Validate connection types
-    source_box = next((b for b in current_graph.boxes if b.id == connection["source_box"]), None)
-    target_box = next((b for b in current_graph.boxes if b.id == connection["target_box"]), None)
+    source_box = current_graph.boxes.get(connection.source_box)
+    target_box = current_graph.boxes.get(connection.target_box)
     
     if not source_box or not target_box:
         raise HTTPException(status_code=404, detail="Box not found")
     
     # Find output and input types
-    source_output = next((o for o in source_box.outputs if o.name == connection["source_output"]), None)
-    target_input = next((i for i in target_box.inputs if i.name == connection["target_input"]), None)
+    source_output = source_box.signature.output(connection.source_output)
+    target_input = target_box.signature.input(connection.target_input)
     
     if not source_output or not target_input:
         raise HTTPException(status_code=404, detail="Input/Output not found")
@@ -173,44 +459,89 @@ async def create_connection(connection: dict):
         raise HTTPException(status_code=400, detail=f"Type mismatch: {source_output.type} -> {target_input.type}")
     
     # Create connection
-    conn = Connection(
-        id=str(uuid.uuid4()),
-        **connection
-    )
-    current_graph.connections.append(conn)
+    conn = current_graph.add_connection(**connection.model_dump())
     
-    return conn.dict()
+    return RawJSONResponse(current_graph.connection_json(conn))
 
-@app.get("/connections")
+@app.get("/connections", response_model=List[Connection])
 async def get_connections():
     """Get all connections"""
-    return [conn.dict() for conn in current_graph.connections]
+    return RawJSONResponse(current_graph.connections_json())
 
 @app.delete("/connections/{connection_id}")
 async def delete_connection(connection_id: str):
     """Delete a connection"""
-    current_graph.connections = [c for c in current_graph.connections if c.id != connection_id]
+    current_graph.remove_connection(connection_id)
     return {"status": "deleted"}
 
-@app.get("/export")
+@app.post("/import")
+async def import_graph(graph: GraphData, layout: bool = True, replace: bool = False):
+    """Create a whole graph in one request, laid out left to right unless layout=false"""
+    existing_boxes = {} if replace else current_graph.boxes
+    existing_connections = {} if replace else current_graph.connections
+
+    # Validate everything before touching the stored graph
+    errors = []
+    signatures = {}
+    for box in graph.boxes:
+        if box.id in signatures or box.id in existing_boxes:
+            errors.append(f"Duplicate box id {box.id}")
+        signatures[box.id] = intern_signature(
+            box.name, box.description,
+            ((port.name, port.type) for port in box.inputs),
+            ((port.name, port.type) for port in box.outputs),
+        )
+    connection_ids = set()
+    for conn in graph.connections:
+        if conn.id in connection_ids or conn.id in existing_connections:
+            errors.append(f"Duplicate connection id {conn.id}")
+        connection_ids.add(conn.id)
+        source = signatures.get(conn.source_box)
+        target = signatures.get(conn.target_box)
+        if not source or not target:
+            errors.append(f"Connection {conn.id}: box not found")
+            continue
+        source_output = source.output(conn.source_output)
+        target_input = target.input(conn.target_input)
+        if not source_output or not target_input:
+            errors.append(f"Connection {conn.id}: input/output not found")
+        elif source_output.type != target_input.type:
+            errors.append(f"Connection {conn.id}: type mismatch: {source_output.type} -> {target_input.type}")
+    if errors:
+        raise HTTPException(status_code=400, detail=errors[:100])
+
+    if replace:
+        current_graph.clear()
+    if layout:
+        # Appended graphs go below whatever is already on the canvas, a box
+        # height and a gap under the lowest box's top
+        top = max((box.y for box in current_graph.boxes.values()), default=0) + NODE_SPACING
+        positions = layered_layout(
+            list(signatures), ((conn.source_box, conn.target_box) for conn in graph.connections),
+            origin=(100, top if current_graph.boxes else 100),
+        )
+    else:
+        positions = {box.id: (box.x, box.y) for box in graph.boxes}
+
+    for box_id, signature in signatures.items():
+        current_graph.add_box(signature, *positions[box_id], box_id=box_id)
+    for conn in graph.connections:
+        current_graph.add_connection(conn.source_box, conn.source_output, conn.target_box, conn.target_input,
+                                     connection_id=conn.id)
+    return {"status": "imported", "boxes": len(graph.boxes), "connections": len(graph.connections)}
+
+@app.get("/export", response_model=GraphData)
 async def export_graph():
     """Export the current graph as JSON"""
-    return {
-        "boxes": [box.dict() for box in current_graph.boxes],
-        "connections": [conn.dict() for conn in current_graph.connections]
-    }
+    return RawJSONResponse(current_graph.export_json())
 
 @app.delete("/clear")
 async def clear_graph():
     """Clear all boxes and connections"""
-    current_graph.boxes.clear()
-    current_graph.connections.clear()
+    current_graph.clear()
     return {"status": "cleared"}
 
-@app.get("/", response_class=HTMLResponse)
-async def get_frontend():
-    """Serve the frontend HTML"""
-    return """
+FRONTEND_HTML = """
     <!DOCTYPE html>
     <html lang="en">
     <head>
@@ -502,6 +833,7 @@ async def get_frontend():
             let connections = [];
             let draggedBox = null;
             let dragOffset = { x: 0, y: 0 };
+            let dragWorkspaceRect = null;
             let connectionStart = null;
             let tempConnection = null;
             
@@ -523,6 +855,13 @@ async def get_frontend():
                 const workspace = document.getElementById('workspace');
                 workspace.addEventListener('mousemove', handleMouseMove);
                 workspace.addEventListener('mouseup', handleMouseUp);
+                // Scrolling pans the view over the graph
+                workspace.addEventListener('wheel', function(e) {
+                    e.preventDefault();
+                    view.x += e.deltaX;
+                    view.y += e.deltaY;
+                    scheduleRender();
+                }, { passive: false });
             }
             
             async function sendMessage() {
@@ -549,7 +888,7 @@ async def get_frontend():
                     if (data.boxes) {
                         data.boxes.forEach(box => {
                             boxes.push(box);
-                            renderBox(box);
+                            addBox(box);
                         });
                     }
                 } catch (error) {
@@ -570,7 +909,7 @@ async def get_frontend():
                 try {
                     const response = await fetch('/boxes');
                     boxes = await response.json();
-                    boxes.forEach(renderBox);
+                    boxes.forEach(addBox);
                 } catch (error) {
                     console.error('Error loading boxes:', error);
                 }
@@ -580,12 +919,187 @@ async def get_frontend():
                 try {
                     const response = await fetch('/connections');
                     connections = await response.json();
-                    renderConnections();
+                    connections.forEach(addConnection);
                 } catch (error) {
                     console.error('Error loading connections:', error);
                 }
             }
             
+            // Rendering is culled to the visible part of the workspace and
+            // batched per animation frame: changes only mark boxes and
+            // connections dirty, and renderFrame applies them, measuring
+            // everything before writing anything so a frame lays out once.
+            const BOX_WIDTH = 220;     // size estimates until a box is measured
+            const BOX_HEIGHT = 180;
+            const VIEW_MARGIN = 200;   // boxes this close to the edge stay rendered
+            let view = { x: 0, y: 0 }; // graph coordinates of the workspace's top-left corner
+            const boxById = new Map();
+            const boxElements = new Map();      // kept while culled, for reuse
+            const boxSizes = new Map();
+            const connectorOffsets = new Map(); // "box/kind/name" -> centre relative to the box
+            const connectionsByBox = new Map();
+            const connectionPaths = new Map();
+            const dirtyBoxes = new Set();
+            const dirtyConnections = new Set();
+            let fullRedraw = false;
+            let frameRequested = false;
+
+            function requestFrame() {
+                if (!frameRequested) {
+                    frameRequested = true;
+                    requestAnimationFrame(renderFrame);
+                }
+            }
+
+            function scheduleRender() {
+                fullRedraw = true;
+                requestFrame();
+            }
+
+            function markBoxMoved(box) {
+                dirtyBoxes.add(box);
+                (connectionsByBox.get(box.id) || []).forEach(c => dirtyConnections.add(c));
+                requestFrame();
+            }
+
+            function addBox(box) {
+                boxById.set(box.id, box);
+                scheduleRender();
+            }
+
+            function addConnection(connection) {
+                [connection.source_box, connection.target_box].forEach(boxId => {
+                    if (!connectionsByBox.has(boxId)) connectionsByBox.set(boxId, new Set());
+                    connectionsByBox.get(boxId).add(connection);
+                });
+                dirtyConnections.add(connection);
+                requestFrame();
+            }
+
+            function viewArea() {
+                const workspace = document.getElementById('workspace');
+                return {
+                    left: view.x - VIEW_MARGIN,
+                    top: view.y - VIEW_MARGIN,
+                    right: view.x + workspace.clientWidth + VIEW_MARGIN,
+                    bottom: view.y + workspace.clientHeight + VIEW_MARGIN
+                };
+            }
+
+            function boxVisible(box, area) {
+                const size = boxSizes.get(box.id) || { width: BOX_WIDTH, height: BOX_HEIGHT };
+                return box.x < area.right && box.x + size.width > area.left &&
+                       box.y < area.bottom && box.y + size.height > area.top;
+            }
+
+            function placeBox(box) {
+                const element = boxElements.get(box.id);
+                if (element && element.isConnected) {
+                    element.style.left = (box.x - view.x) + 'px';
+                    element.style.top = (box.y - view.y) + 'px';
+                }
+            }
+
+            function renderFrame() {
+                frameRequested = false;
+                const workspace = document.getElementById('workspace');
+                const area = viewArea();
+                const appended = [];
+                if (fullRedraw) {
+                    fullRedraw = false;
+                    boxes.forEach(box => {
+                        let element = boxElements.get(box.id);
+                        if (boxVisible(box, area) || box === draggedBox) {
+                            if (!element) element = renderBox(box);
+                            if (!element.isConnected) {
+                                workspace.appendChild(element);
+                                appended.push(box);
+                            }
+                            dirtyBoxes.add(box);
+                        } else if (element && element.isConnected) {
+                            element.remove();
+                        }
+                    });
+                    connections.forEach(c => dirtyConnections.add(c));
+                }
+                dirtyBoxes.forEach(placeBox);
+                dirtyBoxes.clear();
+
+                // Reads: sizes of newly shown boxes, then connector positions
+                appended.forEach(box => {
+                    if (!boxSizes.has(box.id)) {
+                        const element = boxElements.get(box.id);
+                        boxSizes.set(box.id, { width: element.offsetWidth, height: element.offsetHeight });
+                    }
+                });
+                const drawn = [];
+                const hidden = [];
+                dirtyConnections.forEach(connection => {
+                    const source = boxById.get(connection.source_box);
+                    const target = boxById.get(connection.target_box);
+                    // Edges whose boxes are both off screen are skipped, even
+                    // if the line between them would cross the viewport
+                    if (!source || !target || !(boxVisible(source, area) || boxVisible(target, area))) {
+                        hidden.push(connection);
+                    } else {
+                        drawn.push([connection,
+                                    connectorPoint(source, 'output', connection.source_output),
+                                    connectorPoint(target, 'input', connection.target_input)]);
+                    }
+                });
+                dirtyConnections.clear();
+
+                // Writes
+                const svg = document.getElementById('connectionSvg');
+                hidden.forEach(connection => {
+                    const path = connectionPaths.get(connection.id);
+                    if (path) {
+                        path.remove();
+                        connectionPaths.delete(connection.id);
+                    }
+                });
+                drawn.forEach(([connection, start, end]) => {
+                    let path = connectionPaths.get(connection.id);
+                    if (!path) {
+                        path = document.createElementNS('http://www.w3.org/2000/svg', 'path');
+                        path.setAttribute('class', 'connection-path');
+                        svg.appendChild(path);
+                        connectionPaths.set(connection.id, path);
+                    }
+                    const midX = (start.x + end.x) / 2;
+                    path.setAttribute('d', `M ${start.x} ${start.y} C ${midX} ${start.y}, ${midX} ${end.y}, ${end.x} ${end.y}`);
+                });
+            }
+
+            function connectorPoint(box, kind, name) {
+                const key = box.id + '/' + kind + '/' + name;
+                let offset = connectorOffsets.get(key);
+                if (!offset) {
+                    const element = boxElements.get(box.id);
+                    const connector = element && element.isConnected && element.querySelector(`[data-${kind}="${name}"]`);
+                    if (!connector) {
+                        // Not rendered: approximate with the middle of the box's side
+                        return { x: box.x - view.x + (kind === 'output' ? BOX_WIDTH : 0), y: box.y - view.y + BOX_HEIGHT / 2 };
+                    }
+                    // offsetLeft/Top ignore the drag transform, unlike client rects
+                    offset = { x: element.clientLeft + connector.offsetWidth / 2, y: element.clientTop + connector.offsetHeight / 2 };
+                    for (let node = connector; node && node !== element; node = node.offsetParent) {
+                        offset.x += node.offsetLeft;
+                        offset.y += node.offsetTop;
+                    }
+                    connectorOffsets.set(key, offset);
+                }
+                return { x: box.x - view.x + offset.x, y: box.y - view.y + offset.y };
+            }
+
+            function resetCanvas() {
+                boxes = [];
+                connections = [];
+                [boxById, boxElements, boxSizes, connectorOffsets, connectionsByBox, connectionPaths,
+                 dirtyBoxes, dirtyConnections].forEach(collection => collection.clear());
+                document.getElementById('workspace').innerHTML = '<svg class="connection-svg" id="connectionSvg"></svg>';
+            }
+
             function renderBox(box) {
                 const boxElement = document.createElement('div');
                 boxElement.className = 'function-box';
@@ -641,7 +1155,8 @@ async def get_frontend():
                     
                     draggedBox = box;
                     const rect = boxElement.getBoundingClientRect();
-                    const workspaceRect = document.getElementById('workspace').getBoundingClientRect();
+                    // Measured once per drag, not on every mousemove
+                    dragWorkspaceRect = document.getElementById('workspace').getBoundingClientRect();
                     dragOffset.x = e.clientX - rect.left;
                     dragOffset.y = e.clientY - rect.top;
                     boxElement.classList.add('dragging');
@@ -701,23 +1216,17 @@ async def get_frontend():
                     });
                 });
                 
-                document.getElementById('workspace').appendChild(boxElement);
+                boxElements.set(box.id, boxElement);
+                return boxElement;
             }
             
             function handleMouseMove(e) {
                 if (draggedBox) {
-                    const workspaceRect = document.getElementById('workspace').getBoundingClientRect();
-                    const newX = e.clientX - workspaceRect.left - dragOffset.x;
-                    const newY = e.clientY - workspaceRect.top - dragOffset.y;
-                    
-                    const boxElement = document.getElementById('box-' + draggedBox.id);
-                    boxElement.style.left = newX + 'px';
-                    boxElement.style.top = newY + 'px';
-                    
-                    draggedBox.x = newX;
-                    draggedBox.y = newY;
+                    draggedBox.x = e.clientX - dragWorkspaceRect.left - dragOffset.x + view.x;
+                    draggedBox.y = e.clientY - dragWorkspaceRect.top - dragOffset.y + view.y;
                     
-                    renderConnections();
+                    // Only this box and its own connections are redrawn, at most once per frame
+                    markBoxMoved(draggedBox);
                 }
             }
             
@@ -734,6 +1243,8 @@ async def get_frontend():
                     });
                     
                     draggedBox = null;
+                    // The box may have been dropped outside the view
+                    scheduleRender();
                 }
                 
                 connectionStart = null;
@@ -760,7 +1271,7 @@ async def get_frontend():
                     if (response.ok) {
                         const connection = await response.json();
                         connections.push(connection);
-                        renderConnections();
+                        addConnection(connection);
                     } else {
                         const error = await response.json();
                         addMessage(`Connection failed: ${error.detail}`, 'assistant');
@@ -770,40 +1281,6 @@ async def get_frontend():
                 }
             }
             
-            function renderConnections() {
-                const svg = document.getElementById('connectionSvg');
-                svg.innerHTML = '';
-                
-                connections.forEach(connection => {
-                    const sourceBox = document.getElementById('box-' + connection.source_box);
-                    const targetBox = document.getElementById('box-' + connection.target_box);
-                    
-                    if (!sourceBox || !targetBox) return;
-                    
-                    const sourceConnector = sourceBox.querySelector(`[data-output="${connection.source_output}"]`);
-                    const targetConnector = targetBox.querySelector(`[data-input="${connection.target_input}"]`);
-                    
-                    if (!sourceConnector || !targetConnector) return;
-                    
-                    const sourceRect = sourceConnector.getBoundingClientRect();
-                    const targetRect = targetConnector.getBoundingClientRect();
-                    const workspaceRect = document.getElementById('workspace').getBoundingClientRect();
-                    
-                    const startX = sourceRect.left - workspaceRect.left + sourceRect.width / 2;
-                    const startY = sourceRect.top - workspaceRect.top + sourceRect.height / 2;
-                    const endX = targetRect.left - workspaceRect.left + targetRect.width / 2;
-                    const endY = targetRect.top - workspaceRect.top + targetRect.height / 2;
-                    
-                    const path = document.createElementNS('http://www.w3.org/2000/svg', 'path');
-                    const midX = (startX + endX) / 2;
-                    const d = `M ${startX} ${startY} C ${midX} ${startY}, ${midX} ${endY}, ${endX} ${endY}`;
-                    path.setAttribute('d', d);
-                    path.setAttribute('class', 'connection-path');
-                    
-                    svg.appendChild(path);
-                });
-            }
-            
             async function exportGraph() {
                 try {
                     const response = await fetch('/export');
@@ -825,9 +1302,7 @@ async def get_frontend():
                 if (confirm('Are you sure you want to clear all boxes and connections?')) {
                     try {
                         await fetch('/clear', { method: 'DELETE' });
-                        boxes = [];
-                        connections = [];
-                        document.getElementById('workspace').innerHTML = '<svg class="connection-svg" id="connectionSvg"></svg>';
+                        resetCanvas();
                         addMessage('Graph cleared', 'assistant');
                     } catch (error) {
                         addMessage('Error clearing graph', 'assistant');
@@ -836,14 +1311,20 @@ async def get_frontend():
             }
             
             // Handle window resize
-            window.addEventListener('resize', function() {
-                setTimeout(renderConnections, 100);
-            });
+            window.addEventListener('resize', scheduleRender);
         </script>
     </body>
     </html>
     """
 
+# Encoded once here; requests only pick a variant or answer 304
+FRONTEND_PAGE = PrecompressedPage(FRONTEND_HTML)
+
+@app.get("/", response_class=HTMLResponse)
+async def get_frontend(request: Request):
+    """Serve the frontend HTML"""
+    return FRONTEND_PAGE.response(request)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8005)
\ No newline at end of file
@@ -0,0 +1,207 @@
+"""Memoized function results, keyed by function and argument values.
+
+A hit returns the outputs a box produced the last time its function saw the
+same inputs, so re-running an edited graph recomputes only the boxes whose
+inputs changed, i.e. those downstream of the edit.  Results are kept
+encoded as JSON: their size is known exactly, which lets the in-memory LRU
+be bounded by bytes, and the same bytes go to the optional disk tier.
+
+The disk tier keeps results across restarts.  Each entry is one file,
+written to a temporary name and renamed into place; the least recently
+used files are pruned once the directory grows past its own byte budget.
+Caching is best-effort: values that cannot be encoded and disk errors skip
+the cache instead of failing the call.  The ``*_async`` methods do their
+disk reads and writes in a worker thread.
+"""
+from collections import OrderedDict
+from hashlib import blake2b
+from typing import Any, Dict, Optional, Sequence
+import asyncio
+import os
+import threading
+
+import orjson
+
+from json_response import loads
+
+MEMORY_BYTES = 64 * 1024 * 1024
+DISK_BYTES = 1024 * 1024 * 1024
+
+
+def _encode(value: Any) -> Optional[bytes]:
+    # Not json_response.dumps: its fallback encodes ints beyond 64 bits,
+    # which loads would then read back as floats
+    try:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+    except TypeError:
+        return None
+
+
+def result_key(function_key: str, args: Sequence[Any]) -> Optional[str]:
+    """Cache key for a call, or None if ``args`` cannot be encoded.
+
+    ``function_key`` must change whenever the code does.
+    """
+    encoded = _encode(list(args))
+    if encoded is None:
+        return None
+    digest = blake2b(function_key.encode(), digest_size=16)
+    digest.update(b"\0")
+    digest.update(encoded)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    def __init__(self, max_bytes: int = MEMORY_BYTES, directory: Optional[str] = None,
+                 max_disk_bytes: int = DISK_BYTES):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._bytes = 0
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            self._disk_bytes = sum(entry.stat().st_size for entry in self._disk_entries())
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def _disk_entries(self):
+        for shard in os.scandir(self.directory):
+            if shard.is_dir():
+                yield from (entry for entry in os.scandir(shard.path) if not entry.name.endswith(".tmp"))
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        data = self._recall(key)
+        if data is None and self.directory is not None:
+            data = self._load_disk(key)
+        return self._result(data)
+
+    async def get_async(self, key: str) -> Optional[Dict[str, Any]]:
+        data = self._recall(key)
+        if data is None and self.directory is not None:
+            data = await asyncio.to_thread(self._load_disk, key)
+        return self._result(data)
+
+    def put(self, key: str, outputs: Dict[str, Any]) -> None:
+        data = _encode(outputs)
+        if data is not None:
+            self._remember(key, data)
+            if self.directory is not None:
+                self._write_disk(key, data)
+
+    async def put_async(self, key: str, outputs: Dict[str, Any]) -> None:
+        data = _encode(outputs)
+        if data is not None:
+            self._remember(key, data)
+            if self.directory is not None:
+                await asyncio.to_thread(self._write_disk, key, data)
+
+    def _recall(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+        return data
+
+    def _load_disk(self, key: str) -> Optional[bytes]:
+        data = self._read_disk(key)
+        if data is not None:
+            self._remember(key, data)
+        return data
+
+    def _result(self, data: Optional[bytes]) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return loads(data)
+
+    def _remember(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._entries[key] = data
+            self._bytes += len(data)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def _read_disk(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)  # mtime orders entries for pruning
+        except OSError:
+            return None
+        return data
+
+    def _write_disk(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        if os.path.exists(path):
+            return
+        temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(temporary, "wb") as f:
+                f.write(data)
+            os.replace(temporary, path)
+        except OSError:
+            try:
+                os.unlink(temporary)
+            except OSError:
+                pass
+            return
+        with self._lock:
+            self._disk_bytes += len(data)
+            over = self._disk_bytes > self.max_disk_bytes
+        if over:
+            try:
+                self._prune_disk()
+            except OSError:
+                pass  # tried again on the next write
+
+    def _prune_disk(self) -> None:
+        # Down to 90% so pruning does not run again on the next write
+        entries = sorted(self._disk_entries(), key=lambda entry: entry.stat().st_mtime)
+        total = sum(entry.stat().st_size for entry in entries)
+        target = self.max_disk_bytes * 9 // 10
+        for entry in entries:
+            if total <= target:
+                break
+            try:
+                size = entry.stat().st_size
+                os.unlink(entry.path)
+            except OSError:
+                continue
+            total -= size
+        with self._lock:
+            self._disk_bytes = total
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = self.misses = 0
+        if self.directory is not None:
+            for entry in list(self._disk_entries()):
+                try:
+                    os.unlink(entry.path)
+                except OSError:
+                    pass
+            with self._lock:
+                self._disk_bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "disk_bytes": self._disk_bytes,
+                    "hits": self.hits, "misses": self.misses}
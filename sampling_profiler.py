@@ -0,0 +1,117 @@
+"""Sampling profiler for diagnosing a live process.
+
+A background thread wakes every ``interval`` seconds, reads the current
+Python stack of every other thread (the event loop, the threadpool running
+sync endpoints, job workers) and counts identical stacks.  Nothing is
+traced between samples, so the profiled code runs at full speed; a sample
+costs tens of microseconds, well under 1% at the default 100 Hz.
+
+The result is in the collapsed-stack format read by flamegraph.pl,
+speedscope and similar tools: one ``thread;outer;...;inner count`` line
+per distinct stack.  Frames are named ``function (file.py:first_line)`` so
+samples from different lines of one function merge.  Stacks of threads
+that are only waiting (the event loop in select, idle pool threads) are
+dropped unless asked for.  Sandbox worker processes are not covered.
+
+``router`` serves a profile at ``/debug/profile`` to holders of
+``PROFILER_TOKEN``.
+"""
+from collections import Counter
+from typing import Dict, Optional
+import asyncio
+import os
+import sys
+import threading
+import time
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response
+
+from api_auth import check_bearer
+
+INTERVAL = 0.01
+MAX_SECONDS = 60.0
+# The profile endpoint is disabled unless a token is configured
+PROFILER_TOKEN: Optional[str] = os.environ.get("PROFILER_TOKEN") or None
+# Leaf frames of a thread with nothing to do
+IDLE_LEAVES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+    ("connection.py", "wait"),
+    ("connection.py", "_recv"),
+    ("queues.py", "get"),
+    ("thread.py", "_worker"),
+}
+
+_running = threading.Lock()
+
+
+class ProfilerBusyError(Exception):
+    pass
+
+
+def _frame_name(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def sample_stacks(seconds: float, interval: float = INTERVAL, include_idle: bool = False) -> Dict[str, int]:
+    """Sample every other thread for ``seconds``; ``{collapsed_stack: samples}``."""
+    if not _running.acquire(blocking=False):
+        raise ProfilerBusyError("a profile is already being taken")
+    try:
+        own = threading.get_ident()
+        counts: Counter = Counter()
+        names: Dict[int, str] = {}
+        deadline = time.monotonic() + min(seconds, MAX_SECONDS)
+        while time.monotonic() < deadline:
+            started = time.monotonic()
+            frames = sys._current_frames()
+            for ident, frame in frames.items():
+                if ident == own:
+                    continue
+                code = frame.f_code
+                if not include_idle and (os.path.basename(code.co_filename), code.co_name) in IDLE_LEAVES:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_name(frame.f_code))
+                    frame = frame.f_back
+                name = names.get(ident)
+                if name is None:
+                    thread = threading._active.get(ident)
+                    name = names[ident] = (thread.name if thread is not None else f"thread-{ident}").replace(";", ":")
+                stack.append(name)
+                counts[";".join(reversed(stack))] += 1
+            del frames
+            time.sleep(max(0.0, interval - (time.monotonic() - started)))
+        return counts
+    finally:
+        _running.release()
+
+
+def collapsed(counts: Dict[str, int]) -> str:
+    """Collapsed-stack text, heaviest stacks first."""
+    return "".join(f"{stack} {count}\n" for stack, count in sorted(counts.items(), key=lambda item: -item[1]))
+
+
+def profile(seconds: float, interval: float = INTERVAL, include_idle: bool = False) -> str:
+    return collapsed(sample_stacks(seconds, interval, include_idle))
+
+
+router = APIRouter()
+
+
+@router.get("/debug/profile")
+async def debug_profile(request: Request, seconds: float = 10.0, interval: float = INTERVAL, idle: bool = False):
+    """Collapsed stacks of this process sampled for ``seconds``, for a flamegraph."""
+    check_bearer(request, PROFILER_TOKEN)
+    if not 0 < seconds <= MAX_SECONDS or not 0.001 <= interval <= 1:
+        raise HTTPException(status_code=400, detail=f"seconds must be in (0, {MAX_SECONDS:g}], interval in [0.001, 1]")
+    try:
+        # Sampled from another thread so the event loop keeps running and is profiled too
+        stacks = await asyncio.to_thread(profile, seconds, interval, idle)
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return Response(stacks, media_type="text/plain; charset=utf-8",
+                    headers={"Content-Disposition": 'attachment; filename="profile.folded"'})
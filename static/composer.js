@@ -0,0 +1,578 @@
+let nextBoxId = 1;
+let boxes = [];
+let connections = [];
+let draggedElement = null;
+let dragOffset = { x: 0, y: 0 };
+let dragCanvasRect = null;
+let isDragging = false;
+let dragPreview = null;
+
+// Type colors
+const typeColors = {
+    'int': '#61dafb',
+    'str': '#98fb98', 
+    'list': '#dda0dd',
+    'float': '#f0e68c'
+};
+
+// Initialize with some default functions
+window.onload = function() {
+    loadDefaultFunctions();
+};
+
+async function loadDefaultFunctions() {
+    try {
+        const response = await fetch('/api/chat', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ message: 'basic functions' })
+        });
+        const data = await response.json();
+        displayFunctions(data.functions);
+    } catch (error) {
+        console.error('Error loading functions:', error);
+    }
+}
+
+async function sendChat() {
+    const input = document.getElementById('chatInput');
+    const message = input.value.trim();
+    
+    if (!message) return;
+
+    try {
+        const response = await fetch('/api/chat', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ message })
+        });
+        
+        const data = await response.json();
+        displayFunctions(data.functions);
+        input.value = '';
+    } catch (error) {
+        console.error('Error sending chat:', error);
+    }
+}
+
+function displayFunctions(functions) {
+    const container = document.getElementById('functionsContainer');
+    container.innerHTML = '';
+    
+    functions.forEach(func => {
+        const div = document.createElement('div');
+        div.className = 'function-template';
+        div.innerHTML = `
+            <div class="function-name" data-function='${JSON.stringify(func)}'>${func.name}</div>
+            <div class="function-signature">
+                (${func.inputs.map(i => `${i.name}: ${i.type}`).join(', ')}) → ${func.outputs.map(o => o.type).join(', ')}
+            </div>
+            <div class="function-description">${func.description}</div>
+        `;
+        container.appendChild(div);
+    });
+
+    // Add drag handlers to function names
+    container.querySelectorAll('.function-name').forEach(nameEl => {
+        nameEl.addEventListener('mousedown', startDragFromSidebar);
+    });
+}
+
+function startDragFromSidebar(e) {
+    e.preventDefault();
+    isDragging = true;
+    
+    const funcData = JSON.parse(e.target.dataset.function);
+    const rect = e.target.getBoundingClientRect();
+    
+    dragOffset.x = e.clientX - rect.left;
+    dragOffset.y = e.clientY - rect.top;
+    
+    // Create drag preview
+    dragPreview = document.createElement('div');
+    dragPreview.className = 'drag-preview';
+    dragPreview.innerHTML = createFunctionBoxContent(funcData);
+    dragPreview.style.left = (e.clientX - dragOffset.x) + 'px';
+    dragPreview.style.top = (e.clientY - dragOffset.y) + 'px';
+    document.body.appendChild(dragPreview);
+    
+    draggedElement = { type: 'new', data: funcData };
+    
+    document.addEventListener('mousemove', handleDragMove);
+    document.addEventListener('mouseup', handleDragEnd);
+}
+
+function handleDragMove(e) {
+    if (!isDragging || !draggedElement) return;
+    
+    if (dragPreview) {
+        dragPreview.style.left = (e.clientX - dragOffset.x) + 'px';
+        dragPreview.style.top = (e.clientY - dragOffset.y) + 'px';
+    }
+    
+    if (draggedElement.type === 'existing') {
+        const box = boxById.get(draggedElement.id);
+        if (box) {
+            box.x = e.clientX - dragCanvasRect.left - dragOffset.x + view.x;
+            box.y = e.clientY - dragCanvasRect.top - dragOffset.y + view.y;
+            // Only this box and its own connections are redrawn, at most once per frame
+            markBoxMoved(box);
+        }
+    }
+}
+
+function handleDragEnd(e) {
+    if (!isDragging) return;
+    
+    isDragging = false;
+    
+    if (dragPreview) {
+        dragPreview.remove();
+        dragPreview = null;
+    }
+    
+    if (draggedElement && draggedElement.type === 'new') {
+        const canvasRect = document.getElementById('canvas').getBoundingClientRect();
+        const x = e.clientX - canvasRect.left - dragOffset.x;
+        const y = e.clientY - canvasRect.top - dragOffset.y;
+        
+        if (x >= 0 && y >= 0 && x < canvasRect.width && y < canvasRect.height) {
+            createFunctionBox(draggedElement.data, x + view.x, y + view.y);
+        }
+    }
+    
+    draggedElement = null;
+    document.removeEventListener('mousemove', handleDragMove);
+    document.removeEventListener('mouseup', handleDragEnd);
+    // The box may have been dropped outside the view
+    scheduleRender();
+}
+
+// x and y are canvas coordinates, independent of where the view is panned
+function createFunctionBox(funcData, x, y) {
+    const boxId = 'box-' + nextBoxId++;
+    const box = document.createElement('div');
+    box.className = 'function-box';
+    box.id = boxId;
+    box.innerHTML = createFunctionBoxContent(funcData);
+    
+    // Add drag handler to header only
+    const header = box.querySelector('.function-box-header');
+    header.addEventListener('mousedown', (e) => startDragBox(e, boxId));
+    
+    const record = {
+        id: boxId,
+        data: funcData,
+        x: x,
+        y: y,
+        element: box
+    };
+    boxes.push(record);
+    boxById.set(boxId, record);
+    // Attached (or culled) by the next frame
+    scheduleRender();
+    
+    // Add connector event handlers
+    addConnectorHandlers(box);
+    return boxId;
+}
+
+function createFunctionBoxContent(funcData) {
+    return `
+        <div class="function-box-header">${funcData.name}</div>
+        <div class="function-box-content">
+            <div class="inputs">
+                <h4>Inputs</h4>
+                ${funcData.inputs.map((input, i) => `
+                    <div class="connector input-connector">
+                        <div class="connector-dot" data-type="${input.type}" data-direction="input" data-index="${i}"></div>
+                        <span class="type-${input.type}">${input.name}: ${input.type}</span>
+                    </div>
+                `).join('')}
+            </div>
+            <div class="outputs">
+                <h4>Outputs</h4>
+                ${funcData.outputs.map((output, i) => `
+                    <div class="connector output-connector">
+                        <span class="type-${output.type}">${output.name}: ${output.type}</span>
+                        <div class="connector-dot" data-type="${output.type}" data-direction="output" data-index="${i}"></div>
+                    </div>
+                `).join('')}
+            </div>
+        </div>
+    `;
+}
+
+function startDragBox(e, boxId) {
+    e.preventDefault();
+    e.stopPropagation();
+    
+    isDragging = true;
+    const box = document.getElementById(boxId);
+    const rect = box.getBoundingClientRect();
+    // Measured once per drag, not on every mousemove
+    dragCanvasRect = document.getElementById('canvas').getBoundingClientRect();
+    
+    dragOffset.x = e.clientX - rect.left;
+    dragOffset.y = e.clientY - rect.top;
+    
+    draggedElement = { type: 'existing', id: boxId };
+    
+    document.addEventListener('mousemove', handleDragMove);
+    document.addEventListener('mouseup', handleDragEnd);
+}
+
+function addConnectorHandlers(box) {
+    const connectors = box.querySelectorAll('.connector-dot');
+    connectors.forEach(connector => {
+        connector.addEventListener('click', handleConnectorClick);
+    });
+}
+
+let selectedConnector = null;
+
+function handleConnectorClick(e) {
+    e.stopPropagation();
+    
+    const connector = e.target;
+    const boxId = connector.closest('.function-box').id;
+    const direction = connector.dataset.direction;
+    const type = connector.dataset.type;
+    const index = connector.dataset.index;
+    
+    if (!selectedConnector) {
+        // First connector selected
+        selectedConnector = { boxId, direction, type, index, element: connector };
+        connector.style.boxShadow = '0 0 15px currentColor';
+    } else {
+        // Second connector selected - try to create connection
+        const canConnect = 
+            selectedConnector.direction !== direction && 
+            selectedConnector.type === type &&
+            selectedConnector.boxId !== boxId;
+        
+        if (canConnect) {
+            createConnection(selectedConnector, { boxId, direction, type, index, element: connector });
+        }
+        
+        // Reset selection
+        selectedConnector.element.style.boxShadow = '';
+        selectedConnector = null;
+    }
+}
+
+
+// Connections are drawn as cubic Bezier paths in one SVG layer over the
+// canvas, from the right edge of an output dot to the left edge of an input
+// dot.  This replaces the CDN-hosted leader-line library.
+const SVG_NS = 'http://www.w3.org/2000/svg';
+let connectionLayer = null;
+
+function getConnectionLayer() {
+    if (!connectionLayer) {
+        connectionLayer = document.createElementNS(SVG_NS, 'svg');
+        connectionLayer.setAttribute('class', 'connection-svg');
+        connectionLayer.appendChild(document.createElementNS(SVG_NS, 'defs'));
+        document.getElementById('canvas').appendChild(connectionLayer);
+    }
+    return connectionLayer;
+}
+
+function arrowMarker(color) {
+    const id = 'arrow-' + color.replace(/[^a-zA-Z0-9]/g, '');
+    const layer = getConnectionLayer();
+    if (!layer.querySelector('#' + id)) {
+        const marker = document.createElementNS(SVG_NS, 'marker');
+        marker.setAttribute('id', id);
+        marker.setAttribute('viewBox', '0 0 10 10');
+        marker.setAttribute('refX', '9');
+        marker.setAttribute('refY', '5');
+        marker.setAttribute('markerWidth', '4');
+        marker.setAttribute('markerHeight', '4');
+        marker.setAttribute('orient', 'auto');
+        const tip = document.createElementNS(SVG_NS, 'path');
+        tip.setAttribute('d', 'M 0 0 L 10 5 L 0 10 z');
+        tip.setAttribute('fill', color);
+        marker.appendChild(tip);
+        layer.querySelector('defs').appendChild(marker);
+    }
+    return `url(#${id})`;
+}
+
+class ConnectorLine {
+    constructor(options) {
+        this.path = document.createElementNS(SVG_NS, 'path');
+        this.path.setAttribute('fill', 'none');
+        this.path.setAttribute('stroke', options.color);
+        this.path.setAttribute('stroke-width', options.size);
+        this.path.setAttribute('stroke-linecap', 'round');
+        this.path.setAttribute('marker-end', arrowMarker(options.color));
+    }
+
+    draw(start, end) {
+        if (!this.path.isConnected) {
+            getConnectionLayer().appendChild(this.path);
+        }
+        const bend = Math.max(40, Math.abs(end.x - start.x) / 2);
+        this.path.setAttribute('d', `M ${start.x} ${start.y} C ${start.x + bend} ${start.y}, ${end.x - bend} ${end.y}, ${end.x} ${end.y}`);
+    }
+
+    remove() {
+        this.path.remove();
+    }
+
+    toJSON() {
+        // Drawing state, not part of the exported graph
+        return undefined;
+    }
+}
+
+function createConnection(from, to) {
+    // Connections always run from an output to an input, whichever was clicked first
+    if (from.direction === 'input') {
+        [from, to] = [to, from];
+    }
+
+    const fromBox = boxById.get(from.boxId);
+    const toBox = boxById.get(to.boxId);
+    if (!fromBox || !toBox) return;
+
+    const fromConnector = fromBox.element.querySelector(`[data-direction="output"][data-index="${from.index}"]`);
+    const toConnector = toBox.element.querySelector(`[data-direction="input"][data-index="${to.index}"]`);
+
+    if (!fromConnector || !toConnector) return;
+
+    const line = new ConnectorLine({
+        color: typeColors[from.type] || '#64ffda',
+        size: 3
+    });
+
+    const connection = {
+        id: 'conn-' + Date.now(),
+        from: from,
+        to: to,
+        line: line,
+        fromConnector: fromConnector,
+        toConnector: toConnector
+    };
+
+    connections.push(connection);
+    [from.boxId, to.boxId].forEach(boxId => {
+        if (!connectionsByBox.has(boxId)) connectionsByBox.set(boxId, new Set());
+        connectionsByBox.get(boxId).add(connection);
+    });
+    dirtyConnections.add(connection);
+    requestFrame();
+}
+
+// Rendering is culled to the visible part of the canvas and batched per
+// animation frame: changes only mark boxes and connections dirty, and
+// renderFrame applies them, measuring everything before writing anything so
+// a frame lays out once.
+const VIEW_MARGIN = 200;    // boxes this close to the edge stay attached
+const BOX_WIDTH = 250;      // size estimates until a box has been measured
+const BOX_HEIGHT = 150;
+let view = { x: 0, y: 0 };  // canvas coordinates of the visible top-left corner
+const boxById = new Map();
+const connectionsByBox = new Map();
+const dirtyBoxes = new Set();
+const dirtyConnections = new Set();
+let fullRedraw = false;
+let frameRequested = false;
+
+function requestFrame() {
+    if (!frameRequested) {
+        frameRequested = true;
+        requestAnimationFrame(renderFrame);
+    }
+}
+
+function scheduleRender() {
+    fullRedraw = true;
+    requestFrame();
+}
+
+function markBoxMoved(box) {
+    dirtyBoxes.add(box);
+    (connectionsByBox.get(box.id) || []).forEach(connection => dirtyConnections.add(connection));
+    requestFrame();
+}
+
+function boxVisible(box, area) {
+    const width = box.width || BOX_WIDTH;
+    const height = box.height || BOX_HEIGHT;
+    return box.x < area.right && box.x + width > area.left &&
+           box.y < area.bottom && box.y + height > area.top;
+}
+
+function connectorPoint(box, connector, side, origin) {
+    if (!box.element.isConnected) {
+        // Culled: approximate with the middle of the box's side
+        return {
+            x: box.x - view.x + (side === 'right' ? box.width || BOX_WIDTH : 0),
+            y: box.y - view.y + (box.height || BOX_HEIGHT) / 2
+        };
+    }
+    const rect = connector.getBoundingClientRect();
+    return {
+        x: (side === 'right' ? rect.right : rect.left) - origin.left,
+        y: rect.top + rect.height / 2 - origin.top
+    };
+}
+
+function renderFrame() {
+    frameRequested = false;
+    const canvas = document.getElementById('canvas');
+    const appended = [];
+    if (fullRedraw) {
+        fullRedraw = false;
+        const area = {
+            left: view.x - VIEW_MARGIN,
+            top: view.y - VIEW_MARGIN,
+            right: view.x + canvas.clientWidth + VIEW_MARGIN,
+            bottom: view.y + canvas.clientHeight + VIEW_MARGIN
+        };
+        const dragged = draggedElement && draggedElement.type === 'existing' ? draggedElement.id : null;
+        boxes.forEach(box => {
+            const visible = box.id === dragged || boxVisible(box, area);
+            if (visible && !box.element.isConnected) {
+                canvas.appendChild(box.element);
+                appended.push(box);
+            } else if (!visible && box.element.isConnected) {
+                box.element.remove();
+            }
+            dirtyBoxes.add(box);
+        });
+        connections.forEach(connection => dirtyConnections.add(connection));
+    }
+    dirtyBoxes.forEach(box => {
+        box.element.style.left = (box.x - view.x) + 'px';
+        box.element.style.top = (box.y - view.y) + 'px';
+    });
+    dirtyBoxes.clear();
+
+    // Reads
+    appended.forEach(box => {
+        box.width = box.element.offsetWidth;
+        box.height = box.element.offsetHeight;
+    });
+    const origin = getConnectionLayer().getBoundingClientRect();
+    const drawn = [];
+    const hidden = [];
+    dirtyConnections.forEach(connection => {
+        const fromBox = boxById.get(connection.from.boxId);
+        const toBox = boxById.get(connection.to.boxId);
+        // Edges whose boxes are both culled are skipped, even if the line
+        // between them would cross the view
+        if (!fromBox.element.isConnected && !toBox.element.isConnected) {
+            hidden.push(connection);
+        } else {
+            drawn.push([connection,
+                        connectorPoint(fromBox, connection.fromConnector, 'right', origin),
+                        connectorPoint(toBox, connection.toConnector, 'left', origin)]);
+        }
+    });
+    dirtyConnections.clear();
+
+    // Writes
+    hidden.forEach(connection => connection.line.remove());
+    drawn.forEach(([connection, start, end]) => connection.line.draw(start, end));
+}
+
+// Compact wire format (see graph_codec.py): each function once, boxes as
+// [function, x, y] and connections as [fromBox, output, toBox, input].
+function compactGraph() {
+    const functions = [];
+    const functionIds = new Map();
+    const boxIndex = new Map();
+    const compactBoxes = boxes.map((box, i) => {
+        boxIndex.set(box.id, i);
+        let functionId = functionIds.get(box.data.name);
+        if (functionId === undefined) {
+            functionId = functions.length;
+            functionIds.set(box.data.name, functionId);
+            functions.push(box.data.name);
+        }
+        return [functionId, Math.round(box.x), Math.round(box.y)];
+    });
+    const compactConnections = connections.map(conn => [
+        boxIndex.get(conn.from.boxId), Number(conn.from.index),
+        boxIndex.get(conn.to.boxId), Number(conn.to.index)
+    ]);
+    return { v: 1, functions: functions, boxes: compactBoxes, connections: compactConnections };
+}
+
+function exportGraph() {
+    const graphData = compactGraph();
+    const body = JSON.stringify(graphData);
+
+    fetch('/api/export', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: body
+    }).then(response => {
+        if (!response.ok) throw new Error('export failed: ' + response.status);
+        const link = document.createElement('a');
+        link.href = URL.createObjectURL(new Blob([body], { type: 'application/json' }));
+        link.download = 'graph.json';
+        link.click();
+        URL.revokeObjectURL(link.href);
+        console.log('Exported graph:', graphData);
+    }).catch(error => {
+        console.error('Error exporting graph:', error);
+    });
+}
+
+function clearCanvas() {
+    connections.forEach(connection => connection.line.remove());
+    connections = [];
+    boxes.forEach(box => box.element.remove());
+    boxes = [];
+    [boxById, connectionsByBox, dirtyBoxes, dirtyConnections].forEach(collection => collection.clear());
+}
+
+async function importGraph(file) {
+    if (!file) return;
+    const isMsgpack = file.name.endsWith('.msgpack');
+    try {
+        const response = await fetch('/api/import', {
+            method: 'POST',
+            headers: { 'Content-Type': isMsgpack ? 'application/msgpack' : 'application/json' },
+            body: await file.arrayBuffer()
+        });
+        if (!response.ok) throw new Error((await response.json()).detail);
+        const graph = await response.json();
+
+        clearCanvas();
+        const boxIds = new Map();
+        graph.boxes.forEach(box => {
+            boxIds.set(box.id, createFunctionBox(box.function, box.position.x, box.position.y));
+        });
+        graph.connections.forEach(conn => {
+            createConnection(
+                { ...conn.from, boxId: boxIds.get(conn.from.boxId), direction: 'output' },
+                { ...conn.to, boxId: boxIds.get(conn.to.boxId), direction: 'input' }
+            );
+        });
+    } catch (error) {
+        alert('Could not import graph: ' + error.message);
+    }
+}
+
+// Handle Enter key in chat input
+document.getElementById('chatInput').addEventListener('keypress', function(e) {
+    if (e.key === 'Enter') {
+        sendChat();
+    }
+});
+
+// Update connections when window resizes
+window.addEventListener('resize', scheduleRender);
+
+// Scrolling pans the view over the canvas
+document.getElementById('canvas').addEventListener('wheel', function(e) {
+    e.preventDefault();
+    view.x += e.deltaX;
+    view.y += e.deltaY;
+    scheduleRender();
+}, { passive: false });
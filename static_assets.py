@@ -0,0 +1,52 @@
+"""Content-hashed static assets with long-lived immutable caching.
+
+``HashedStaticFiles`` serves a directory like ``StaticFiles`` but also under
+fingerprinted names (``composer.css`` -> ``composer.1a2b3c4d5e6f.css``).
+Pages link the fingerprinted URL, so browsers may cache it forever: a
+changed file gets a new name.  Plain names remain available for debugging
+and are always revalidated.
+"""
+from hashlib import sha256
+from typing import Dict
+import os
+
+from fastapi.staticfiles import StaticFiles
+from starlette.responses import Response
+from starlette.types import Scope
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "public, no-cache"
+
+
+def _fingerprint(path: str) -> str:
+    digest = sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+class HashedStaticFiles(StaticFiles):
+    def __init__(self, directory: str, prefix: str = "/static"):
+        super().__init__(directory=directory)
+        self.prefix = prefix.rstrip("/")
+        # Hashed once at startup; restart to pick up edited assets
+        self._hashed: Dict[str, str] = {}
+        self._sources: Dict[str, str] = {}
+        for dirpath, _, filenames in os.walk(directory):
+            for filename in filenames:
+                source = os.path.relpath(os.path.join(dirpath, filename), directory).replace(os.sep, "/")
+                stem, ext = os.path.splitext(source)
+                hashed = f"{stem}.{_fingerprint(os.path.join(dirpath, filename))}{ext}"
+                self._hashed[source] = hashed
+                self._sources[hashed] = source
+
+    def url(self, name: str) -> str:
+        """Fingerprinted URL of ``name`` (relative to the static directory)."""
+        return f"{self.prefix}/{self._hashed[name]}"
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        source = self._sources.get(path)
+        response = await super().get_response(source or path, scope)
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL if source else REVALIDATE_CACHE_CONTROL
+        return response
@@ -0,0 +1,90 @@
+"""Precompressed, ETag-validated delivery of the embedded HTML pages.
+
+Both apps serve a large HTML string from memory.  ``PrecompressedPage``
+encodes it once at startup (identity, gzip and, when the ``brotli`` package
+is installed, br), so a request only picks a ready-made body or answers
+``304 Not Modified``.
+"""
+from hashlib import sha256
+from typing import Dict, Optional
+import gzip
+
+from fastapi import Request
+from fastapi.responses import Response
+
+try:
+    import brotli
+except ImportError:  # optional: gzip is always available
+    brotli = None
+
+# HTML must be revalidated so new deploys show up; the ETag makes that a 304
+HTML_CACHE_CONTROL = "public, no-cache"
+
+
+def _accepted_encodings(header: str) -> Dict[str, float]:
+    """``{coding: q}`` from an ``Accept-Encoding`` header."""
+    accepted = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip().lower()] = q
+    return accepted
+
+
+class PrecompressedPage:
+    def __init__(self, content: str, media_type: str = "text/html; charset=utf-8",
+                 cache_control: str = HTML_CACHE_CONTROL):
+        self.media_type = media_type
+        self.cache_control = cache_control
+        raw = content.encode("utf-8")
+        digest = sha256(raw).hexdigest()[:32]
+        # (body, etag) per content-coding; each representation gets its own
+        # strong ETag since the bytes differ
+        self.variants = {"identity": (raw, f'"{digest}"')}
+        self.variants["gzip"] = (gzip.compress(raw, compresslevel=9, mtime=0), f'"{digest}-gz"')
+        if brotli is not None:
+            self.variants["br"] = (brotli.compress(raw, quality=11), f'"{digest}-br"')
+        self._etags = {etag for _, etag in self.variants.values()}
+
+    def _choose(self, accept_encoding: Optional[str]) -> str:
+        if not accept_encoding:
+            return "identity"
+        accepted = _accepted_encodings(accept_encoding)
+        wildcard = accepted.get("*", 0.0)
+        best, best_q = "identity", 0.0
+        # Smallest first, so ties go to the better compression
+        for coding in ("br", "gzip"):
+            q = accepted.get(coding, wildcard)
+            if coding in self.variants and q > best_q:
+                best, best_q = coding, q
+        return best
+
+    def _not_modified(self, if_none_match: Optional[str]) -> bool:
+        if not if_none_match:
+            return False
+        if if_none_match.strip() == "*":
+            return True
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return not tags.isdisjoint(self._etags)
+
+    def response(self, request: Request) -> Response:
+        coding = self._choose(request.headers.get("accept-encoding"))
+        body, etag = self.variants[coding]
+        headers = {
+            "ETag": etag,
+            "Cache-Control": self.cache_control,
+            "Vary": "Accept-Encoding",
+        }
+        if self._not_modified(request.headers.get("if-none-match")):
+            return Response(status_code=304, headers=headers)
+        if coding != "identity":
+            headers["Content-Encoding"] = coding
+        return Response(content=body, media_type=self.media_type, headers=headers)
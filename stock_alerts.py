@@ -0,0 +1,181 @@
+"""Low-stock and restock subscriptions over WhatsApp.
+
+Subscriptions are indexed by ``MaterialCode``.  When a new report is
+loaded only the materials that both changed (per ``stock_diff``) and have
+subscribers are looked at, and each of those is resolved through the
+report's material index rather than a scan of every row.
+"""
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional
+import re
+
+from stock_diff import diff_reports
+from stock_report import StockReport
+
+# "alert me when MG09ACA18TE drops below 5 in Delhi"
+# "alert me when MG09ACA18TE goes above 20"
+# "alert me when MG09ACA18TE is restocked in Mumbai"
+_SUBSCRIBE_RE = re.compile(
+    r"^\s*alert\s+me\s+(?:when|if)\s+(?P<code>\S+)\s+"
+    r"(?:(?:drops?|falls?|goes|is)\s+)?"
+    r"(?:(?P<kind>below|under|above|over)\s+(?P<threshold>\d+)|(?:is\s+)?(?P<restock>restocked|back\s+in\s+stock))"
+    r"(?:\s+(?:in|at)\s+(?P<branch>.+?))?\s*$",
+    re.IGNORECASE,
+)
+_UNSUBSCRIBE_RE = re.compile(r"^\s*stop\s+alerts?(?:\s+for\s+(?P<code>\S+))?\s*$", re.IGNORECASE)
+
+_KINDS = {"below": "below", "under": "below", "above": "above", "over": "above"}
+
+
+class Subscription(NamedTuple):
+    phone: str
+    material_code: str
+    # "below", "above" or "restock"
+    kind: str
+    threshold: int = 0
+    # None means the total across every branch
+    branch: Optional[str] = None
+
+    def describe(self) -> str:
+        where = f" in {self.branch}" if self.branch else ""
+        if self.kind == "restock":
+            return f"{self.material_code} is restocked{where}"
+        return f"{self.material_code} goes {self.kind} {self.threshold}{where}"
+
+    def triggered(self, old_stock: int, new_stock: int) -> bool:
+        """Edge-triggered: only fire when the threshold is crossed."""
+        if self.kind == "below":
+            return old_stock >= self.threshold > new_stock
+        if self.kind == "above":
+            return old_stock <= self.threshold < new_stock
+        return old_stock <= 0 < new_stock
+
+
+class Alert(NamedTuple):
+    subscription: Subscription
+    old_stock: int
+    new_stock: int
+
+    def text(self) -> str:
+        sub = self.subscription
+        where = f" in {sub.branch}" if sub.branch else ""
+        return f"{sub.material_code}{where}: stock {self.old_stock} -> {self.new_stock}"
+
+
+def parse_subscription(phone: str, message: str) -> Optional[Subscription]:
+    """Subscription described by a WhatsApp ``message``, or ``None``."""
+    match = _SUBSCRIBE_RE.match(message)
+    if not match:
+        return None
+    branch = match.group("branch")
+    if match.group("restock"):
+        kind, threshold = "restock", 0
+    else:
+        kind, threshold = _KINDS[match.group("kind").lower()], int(match.group("threshold"))
+    return Subscription(phone, match.group("code").upper(), kind, threshold, branch.strip() if branch else None)
+
+
+def branch_stock(report: StockReport, material_code: str, branch: Optional[str] = None) -> int:
+    """``TodayStock`` of ``material_code`` summed over one or all branches."""
+    rows = report.material_rows(material_code)
+    today = report.columns["TodayStock"]
+    if branch is None:
+        return sum(today[row] for row in rows)
+    branches = report.columns["Branch"]
+    wanted = branch.casefold()
+    strings = report.strings
+    return sum(today[row] for row in rows if strings[branches[row]].casefold() == wanted)
+
+
+class SubscriptionBook:
+    """All live subscriptions, indexed by material code."""
+
+    def __init__(self):
+        self._by_material: Dict[str, List[Subscription]] = defaultdict(list)
+
+    def __len__(self) -> int:
+        return sum(len(subs) for subs in self._by_material.values())
+
+    def add(self, subscription: Subscription) -> None:
+        subs = self._by_material[subscription.material_code]
+        if subscription not in subs:
+            subs.append(subscription)
+
+    def remove(self, phone: str, material_code: Optional[str] = None) -> int:
+        """Drop ``phone``'s subscriptions (for one material, or all of them)."""
+        codes = [material_code.upper()] if material_code else list(self._by_material)
+        removed = 0
+        for code in codes:
+            subs = self._by_material.get(code)
+            if not subs:
+                continue
+            kept = [s for s in subs if s.phone != phone]
+            removed += len(subs) - len(kept)
+            if kept:
+                self._by_material[code] = kept
+            else:
+                del self._by_material[code]
+        return removed
+
+    def for_phone(self, phone: str) -> List[Subscription]:
+        return [s for subs in self._by_material.values() for s in subs if s.phone == phone]
+
+    def materials(self) -> Iterable[str]:
+        return self._by_material.keys()
+
+    def evaluate(self, old: Optional[StockReport], new: StockReport) -> List[Alert]:
+        """Alerts fired by moving from report ``old`` to ``new``.
+
+        With no previous report every subscribed material is checked against
+        an implicit all-zero snapshot, so restocks fire but drops do not.
+        """
+        if old is None:
+            affected = set(self._by_material)
+        else:
+            affected = diff_reports(old, new).material_codes().intersection(self._by_material)
+
+        alerts = []
+        for code in affected:
+            # Totals are shared by every subscriber on the same branch filter
+            totals: Dict[Optional[str], tuple] = {}
+            for sub in self._by_material[code]:
+                key = sub.branch.casefold() if sub.branch else None
+                if key not in totals:
+                    before = branch_stock(old, code, sub.branch) if old is not None else 0
+                    totals[key] = (before, branch_stock(new, code, sub.branch))
+                before, after = totals[key]
+                if sub.triggered(before, after):
+                    alerts.append(Alert(sub, before, after))
+        return alerts
+
+
+def handle_alert_command(book: SubscriptionBook, phone: str, message: str) -> Optional[str]:
+    """Reply for a subscribe/unsubscribe message, or ``None`` if it is neither."""
+    sub = parse_subscription(phone, message)
+    if sub is not None:
+        book.add(sub)
+        return f"OK, I'll message you when {sub.describe()}."
+    match = _UNSUBSCRIBE_RE.match(message)
+    if match:
+        removed = book.remove(phone, match.group("code"))
+        return f"Stopped {removed} alert(s)."
+    return None
+
+
+def outbound_messages(alerts: Iterable[Alert]) -> List[tuple]:
+    """Group alerts into one ``(phone, body)`` message per recipient."""
+    grouped: Dict[str, List[str]] = defaultdict(list)
+    for alert in alerts:
+        grouped[alert.subscription.phone].append(alert.text())
+    return [(phone, "Stock alert:\n" + "\n".join(lines)) for phone, lines in grouped.items()]
+
+
+def dispatch_alerts(
+    alerts: Iterable[Alert],
+    send_bulk: Callable[[List[tuple]], None],
+) -> int:
+    """Hand every pending alert to ``send_bulk`` in one call."""
+    messages = outbound_messages(alerts)
+    if messages:
+        send_bulk(messages)
+    return len(messages)
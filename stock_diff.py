@@ -0,0 +1,224 @@
+"""Diff two enterprise stock report snapshots.
+
+Rows are matched on ``(MaterialCode, Branch, StorageLocation)`` with a
+sorted-key merge: each report's key columns are packed into one integer per
+row, reduced to sorted unique keys (summing rows that share a key, e.g.
+different valuation types) and the two key arrays are merged with NumPy.
+Keys are packed from each string's rank in sorted order, so sorting keys
+sorts by material code, then branch and storage location.
+
+The result stays in NumPy arrays; a ``StockDelta`` is only built for the
+entries that are looked at.
+"""
+from typing import Dict, Iterator, List, NamedTuple, Set, Tuple, Union
+
+import numpy as np
+
+from stock_report import StockReport
+
+KEY_COLUMNS = ("MaterialCode", "Branch", "StorageLocation")
+STOCK_COLUMNS = ("TodayStock", "BlockedStk")
+# Index of each status in StockDiff.status
+STATUSES = ("added", "removed", "changed", "unchanged")
+_ADDED, _REMOVED, _CHANGED, _UNCHANGED = range(len(STATUSES))
+
+
+class StockDelta(NamedTuple):
+    material_code: str
+    branch: str
+    storage_location: str
+    old_stock: int
+    new_stock: int
+    old_blocked: int
+    new_blocked: int
+    # "added", "removed", "changed" or "unchanged"
+    status: str
+
+    @property
+    def stock_change(self) -> int:
+        return self.new_stock - self.old_stock
+
+    @property
+    def blocked_change(self) -> int:
+        return self.new_blocked - self.old_blocked
+
+
+def _key_ids(report: StockReport) -> List[np.ndarray]:
+    return [np.frombuffer(report.columns[name], dtype=np.intc) for name in KEY_COLUMNS]
+
+
+def _used(count: int, columns: List[np.ndarray]) -> np.ndarray:
+    """Sorted string ids below ``count`` that appear in ``columns``."""
+    used = np.zeros(count, dtype=bool)
+    for column in columns:
+        used[column] = True
+    return np.flatnonzero(used)
+
+
+def _translate_ids(old: StockReport, new: StockReport, ids: np.ndarray) -> Tuple[np.ndarray, List[str]]:
+    """Map the string ids ``ids`` of ``old`` onto ``new``'s string table.
+
+    Strings absent from ``new`` get fresh ids past the end of its table, so
+    keys from both reports share one id space without touching ``new``.
+    Returns the mapping, indexed by ``old`` id, and the combined table.
+    """
+    texts = list(map(old.strings.__getitem__, ids.tolist()))
+    translated = list(map(new.string_id, texts))
+    strings = list(new.strings)
+    if None in translated:
+        extra: Dict[str, int] = {}
+        for i, sid in enumerate(translated):
+            if sid is None:
+                sid = extra.get(texts[i])
+                if sid is None:
+                    sid = extra[texts[i]] = len(strings)
+                    strings.append(texts[i])
+                translated[i] = sid
+    mapping = np.zeros(len(old.strings), dtype=np.int64)
+    mapping[ids] = translated
+    return mapping, strings
+
+
+def _ranks(strings: List[str], columns: List[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """Sort rank of every string id used in ``columns``, and the string id of every rank.
+
+    Only key strings are ranked; descriptions and the like are left out.
+    """
+    ids = _used(len(strings), columns)
+    ranked = ids[np.argsort(np.array([strings[i] for i in ids.tolist()], dtype=str), kind="stable")]
+    ranks = np.zeros(len(strings), dtype=np.int64)
+    ranks[ranked] = np.arange(len(ranked))
+    return ranks, ranked
+
+
+def _totals(report: StockReport, columns: List[np.ndarray], width: int):
+    """Sorted unique packed keys of ``report`` with summed stock per key.
+
+    ``columns`` are the report's key columns as sort ranks below ``width``.
+    Returns ``(keys, today, blocked)`` as aligned NumPy arrays.
+    """
+    materials, branches, locations = columns
+    if width ** 3 >= 2 ** 63:
+        # Packed keys would overflow int64; fall back to Python ints
+        materials = materials.astype(object)
+    keys = (materials * width + branches) * width + locations
+    unique, inverse = np.unique(keys, return_inverse=True)
+    # Rows sharing a key (one per valuation type) are summed here
+    today, blocked = (
+        np.bincount(inverse, weights=report.columns[name], minlength=len(unique)).astype(np.int64)
+        for name in STOCK_COLUMNS
+    )
+    return unique, today, blocked
+
+
+class StockDiff:
+    """Per-key changes between two reports, as aligned arrays sorted by key.
+
+    Indexing and iterating give ``StockDelta`` tuples, built on demand.
+    """
+
+    def __init__(self, keys: np.ndarray, status: np.ndarray, old_today: np.ndarray, new_today: np.ndarray,
+                 old_blocked: np.ndarray, new_blocked: np.ndarray, width: int, strings: List[str],
+                 ranked: np.ndarray):
+        self.keys = keys
+        self.status = status
+        self.old_today = old_today
+        self.new_today = new_today
+        self.old_blocked = old_blocked
+        self.new_blocked = new_blocked
+        self._width = width
+        # Keys are packed from sort ranks; ``ranked`` maps them back to string ids
+        self._strings = strings
+        self._ranked = ranked
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __getitem__(self, i: Union[int, slice]) -> Union[StockDelta, List[StockDelta]]:
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        rest, location = divmod(int(self.keys[i]), self._width)
+        material, branch = divmod(rest, self._width)
+        return StockDelta(
+            self._string(material), self._string(branch), self._string(location),
+            int(self.old_today[i]), int(self.new_today[i]), int(self.old_blocked[i]), int(self.new_blocked[i]),
+            STATUSES[self.status[i]],
+        )
+
+    def __iter__(self) -> Iterator[StockDelta]:
+        return (self[i] for i in range(len(self)))
+
+    def _string(self, rank: int) -> str:
+        return self._strings[self._ranked[rank]]
+
+    def take(self, indices: np.ndarray) -> "StockDiff":
+        """The entries at ``indices`` (or where a boolean mask is set), still sorted."""
+        return StockDiff(self.keys[indices], self.status[indices], self.old_today[indices],
+                         self.new_today[indices], self.old_blocked[indices], self.new_blocked[indices],
+                         self._width, self._strings, self._ranked)
+
+    def material_codes(self) -> Set[str]:
+        """Material codes with at least one entry."""
+        materials = np.unique(self.keys // (self._width * self._width))
+        return {self._string(int(material)) for material in materials}
+
+
+def diff_reports(old: StockReport, new: StockReport, include_unchanged: bool = False) -> StockDiff:
+    """Per-key changes in ``TodayStock``/``BlockedStk`` from ``old`` to ``new``.
+
+    Both sides are reduced to sorted unique keys and merged with
+    ``searchsorted``.  Keys present in both reports with equal stock are
+    left out unless ``include_unchanged``, which reports them as "unchanged".
+    Results are ordered by material code, then branch and storage location.
+    """
+    old_ids = _key_ids(old)
+    mapping, strings = _translate_ids(old, new, _used(len(old.strings), old_ids))
+    old_ids = [mapping[column] for column in old_ids]
+    new_ids = _key_ids(new)
+    ranks, ranked = _ranks(strings, old_ids + new_ids)
+    width = max(len(ranked), 1)
+    old_keys, old_today, old_blocked = _totals(old, [ranks[column] for column in old_ids], width)
+    new_keys, new_today, new_blocked = _totals(new, [ranks[column] for column in new_ids], width)
+
+    # Position of each new key in the old key array, and whether it is there
+    pos = np.searchsorted(old_keys, new_keys)
+    inside = pos < len(old_keys)
+    found = np.zeros(len(new_keys), dtype=bool)
+    found[inside] = old_keys[pos[inside]] == new_keys[inside]
+    matched = pos[found]
+    prev_today = np.zeros_like(new_today)
+    prev_today[found] = old_today[matched]
+    prev_blocked = np.zeros_like(new_blocked)
+    prev_blocked[found] = old_blocked[matched]
+
+    changed = found & ((prev_today != new_today) | (prev_blocked != new_blocked))
+    status = np.where(found, np.where(changed, _CHANGED, _UNCHANGED), _ADDED).astype(np.int8)
+    kept = ~found | (found if include_unchanged else changed)
+    removed = np.ones(len(old_keys), dtype=bool)
+    removed[matched] = False
+
+    keys = np.concatenate([new_keys[kept], old_keys[removed]])
+    # Both parts are sorted and share no key; merge them
+    order = np.argsort(keys, kind="stable")
+    gone = np.count_nonzero(removed)
+    zeros = np.zeros(gone, dtype=np.int64)
+    return StockDiff(
+        keys[order],
+        np.concatenate([status[kept], np.full(gone, _REMOVED, dtype=np.int8)])[order],
+        np.concatenate([prev_today[kept], old_today[removed]])[order],
+        np.concatenate([new_today[kept], zeros])[order],
+        np.concatenate([prev_blocked[kept], old_blocked[removed]])[order],
+        np.concatenate([new_blocked[kept], zeros])[order],
+        width, strings, ranked,
+    )
+
+
+def summarize(diff: StockDiff) -> Dict[str, int]:
+    """Counts of keys per status, for "what changed" replies."""
+    counts = np.bincount(diff.status, minlength=len(STATUSES))
+    return dict(zip(STATUSES, counts.tolist()))
+
+
+def restocked(diff: StockDiff) -> StockDiff:
+    """Keys that went from zero to positive ``TodayStock``."""
+    return diff.take((diff.old_today <= 0) & (diff.new_today > 0))
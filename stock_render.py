@@ -0,0 +1,96 @@
+"""Compact WhatsApp replies for stock search results.
+
+WhatsApp only keeps columns aligned inside a ```monospace``` block and
+wraps anything wider than a phone screen, so each result is rendered as an
+aligned code/stock line plus a truncated branch and description line, ten
+results per message.  Column widths are computed once per report version,
+and the matching row ids are kept server-side (see ``stock_session``) so
+"MORE" just slices the next page instead of re-running the search.
+"""
+from array import array
+from collections import OrderedDict
+from typing import Dict
+
+from stock_report import StockReport
+
+PAGE_SIZE = 10
+
+# Characters that fit on one line of a phone screen in monospace
+LINE_WIDTH = 32
+
+# Upper bounds on the padded width of each aligned column
+MAX_WIDTHS = {
+    "MaterialCode": 20,
+    "Branch": 10,
+}
+
+# How many report versions keep their precomputed widths around
+_WIDTH_CACHE_SIZE = 4
+_widths: "OrderedDict[int, Dict[str, int]]" = OrderedDict()
+
+
+def column_widths(report: StockReport) -> Dict[str, int]:
+    """Display widths for ``report``, computed on first use per version."""
+    widths = _widths.get(report.version)
+    if widths is not None:
+        _widths.move_to_end(report.version)
+        return widths
+    widths = {}
+    for name, cap in MAX_WIDTHS.items():
+        # Only distinct string ids need measuring, not every row
+        used = set(report.columns[name])
+        widths[name] = min(cap, max((len(report.strings[sid]) for sid in used), default=0))
+    widths["TodayStock"] = max((len(str(v)) for v in report.columns["TodayStock"]), default=1)
+    _widths[report.version] = widths
+    if len(_widths) > _WIDTH_CACHE_SIZE:
+        _widths.popitem(last=False)
+    return widths
+
+
+def _fit(text: str, width: int) -> str:
+    if len(text) > width:
+        return text[: width - 1] + "…"
+    return text.ljust(width)
+
+
+def render_rows(report: StockReport, rows, start: int = 0) -> str:
+    """Monospace block for ``rows`` (row ids), numbered from ``start + 1``."""
+    widths = column_widths(report)
+    code_w, branch_w, stock_w = widths["MaterialCode"], widths["Branch"], widths["TodayStock"]
+    codes = report.columns["MaterialCode"]
+    branches = report.columns["Branch"]
+    today = report.columns["TodayStock"]
+    descriptions = report.columns.get("MaterialDiscription")
+    strings = report.strings
+    number_w = len(str(start + len(rows)))
+
+    indent = " " * (number_w + 1)
+    lines = []
+    for n, row in enumerate(rows, start + 1):
+        # Codes are never truncated: users copy them into alert requests
+        lines.append(
+            f"{str(n).rjust(number_w)} {strings[codes[row]].ljust(code_w)} "
+            f"{str(today[row]).rjust(stock_w)}"
+        )
+        detail = _fit(strings[branches[row]], branch_w)
+        if descriptions is not None:
+            detail += " " + strings[descriptions[row]]
+        lines.append(indent + _fit(detail, LINE_WIDTH - len(indent)).rstrip())
+    return "```\n" + "\n".join(lines) + "\n```"
+
+
+def render_page(report: StockReport, title: str, rows: array, offset: int = 0) -> str:
+    """The page of result ``rows`` starting at ``offset`` as a WhatsApp message."""
+    total = len(rows)
+    if not total:
+        return f"No stock found for '{title}'."
+    page = rows[offset:offset + PAGE_SIZE]
+    end = offset + len(page)
+    parts = [
+        f"*{title}* — {total} result(s), showing {offset + 1}-{end}",
+        render_rows(report, page, offset),
+    ]
+    remaining = total - end
+    if remaining > 0:
+        parts.append(f"Reply MORE for next {min(PAGE_SIZE, remaining)}")
+    return "\n".join(parts)
@@ -0,0 +1,358 @@
+"""Streaming loader for the enterprise stock report (.xlsx).
+
+The sheet XML is streamed straight out of the zip container through an
+expat parser, so only one chunk of XML and the rows it completes are alive
+at a time; cell values go into typed column buffers instead of building a
+workbook DOM.
+"""
+from array import array
+import itertools
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+from xml.etree.ElementTree import iterparse
+from xml.parsers import expat
+import zipfile
+
+from metrics import REGISTRY
+
+SHEET_PATH = "xl/worksheets/sheet1.xml"
+SHARED_STRINGS_PATH = "xl/sharedStrings.xml"
+
+_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_TEXT = _NS + "t"
+_SI = _NS + "si"
+
+# Numeric columns and the array typecode used to buffer them; every other
+# column is stored as indices into the report's string table.
+NUMERIC_COLUMNS = {
+    "TodayStock": "q",
+    "BlockedStk": "q",
+    "ARP": "d",
+}
+
+# Rows between progress callbacks
+PROGRESS_EVERY = 10000
+
+LOAD_SECONDS = REGISTRY.histogram(
+    "stock_report_load_seconds", "Time per stage of loading the stock report", ("stage",),
+    (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120))
+
+# Bytes of sheet XML fed to the parser at a time
+CHUNK_SIZE = 1 << 16
+
+ProgressCallback = Callable[[int, float], None]
+
+# Columns matched by free-text searches
+SEARCH_COLUMNS = ("MaterialCode", "VenderPartNo.", "MaterialDiscription")
+
+_versions = itertools.count(1)
+
+
+class StockReport:
+    """Column-oriented view of one stock report.
+
+    String columns hold ``array('i')`` indices into ``strings`` (index 0 is
+    the empty string), numeric columns hold ``array('q')``/``array('d')``.
+    ``version`` identifies the snapshot so derived data (render widths,
+    cached result sets) can tell which report it came from.  Reports loaded
+    from a workbook use the zip CRCs of the sheet and string table, which
+    stay the same across processes; others get a process-unique counter.
+    """
+
+    def __init__(self, headers: List[str]):
+        self.headers = headers
+        self.version = next(_versions)
+        self.strings: List[str] = [""]
+        self._string_ids: Dict[str, int] = {"": 0}
+        self.columns: Dict[str, array] = {
+            name: array(NUMERIC_COLUMNS.get(name, "i")) for name in headers if name
+        }
+        self.row_count = 0
+        self._material_index: Optional[Dict[int, array]] = None
+        self._folded: Optional[List[str]] = None
+
+    def __len__(self) -> int:
+        return self.row_count
+
+    def intern(self, text: str) -> int:
+        """Return the string-table index for ``text``, adding it if new."""
+        sid = self._string_ids.get(text)
+        if sid is None:
+            sid = len(self.strings)
+            self.strings.append(text)
+            self._string_ids[text] = sid
+        return sid
+
+    def string_id(self, text: str) -> Optional[int]:
+        """String-table index of ``text``, or None if it is not in the report."""
+        return self._string_ids.get(text)
+
+    def is_numeric(self, column: str) -> bool:
+        return column in NUMERIC_COLUMNS
+
+    def value(self, column: str, row: int):
+        """Decoded value of ``column`` at ``row``."""
+        raw = self.columns[column][row]
+        if column in NUMERIC_COLUMNS:
+            return raw
+        return self.strings[raw]
+
+    def column(self, column: str) -> List:
+        """Whole column decoded to Python values."""
+        raw = self.columns[column]
+        if column in NUMERIC_COLUMNS:
+            return raw.tolist()
+        strings = self.strings
+        return [strings[sid] for sid in raw]
+
+    def row(self, row: int) -> Dict:
+        """One row as a ``{header: value}`` dict."""
+        return {name: self.value(name, row) for name in self.columns}
+
+    def iter_rows(self) -> Iterator[Dict]:
+        for i in range(self.row_count):
+            yield self.row(i)
+
+    @property
+    def material_index(self) -> Dict[int, array]:
+        """Row ids per ``MaterialCode`` string id, built on first use."""
+        if self._material_index is None:
+            index: Dict[int, array] = {}
+            for row, sid in enumerate(self.columns.get("MaterialCode", ())):
+                rows = index.get(sid)
+                if rows is None:
+                    rows = index[sid] = array("i")
+                rows.append(row)
+            self._material_index = index
+        return self._material_index
+
+    def search(self, query: str, rows: Optional[Iterable[int]] = None) -> array:
+        """Row ids where every word of ``query`` appears in a search column.
+
+        Matching runs over the string table once per word, so the row scan
+        is only integer set lookups.  ``rows`` restricts the scan to a subset.
+        """
+        words = query.casefold().split()
+        columns = [self.columns[name] for name in SEARCH_COLUMNS if name in self.columns]
+        if not words or not columns:
+            return array("i")
+        if self._folded is None or len(self._folded) != len(self.strings):
+            self._folded = [text.casefold() for text in self.strings]
+        word_ids = [
+            {sid for sid, text in enumerate(self._folded) if word in text}
+            for word in words
+        ]
+        if rows is None:
+            rows = range(self.row_count)
+        return array("i", (
+            row for row in rows
+            if all(any(col[row] in ids for col in columns) for ids in word_ids)
+        ))
+
+    def rows_where(self, column: str, text: str, rows: Optional[Iterable[int]] = None) -> array:
+        """Row ids whose string ``column`` equals ``text``, ignoring case."""
+        wanted = text.casefold()
+        ids = {sid for sid, value in enumerate(self.strings) if value.casefold() == wanted}
+        values = self.columns[column]
+        if rows is None:
+            rows = range(self.row_count)
+        return array("i", (row for row in rows if values[row] in ids))
+
+    def material_rows(self, material_code: str) -> array:
+        """Row ids whose ``MaterialCode`` is exactly ``material_code``."""
+        sid = self.string_id(material_code)
+        if sid is None:
+            return array("i")
+        return self.material_index.get(sid, array("i"))
+
+
+class _CountingReader:
+    """File wrapper that tracks how many bytes the parser has consumed."""
+
+    def __init__(self, raw):
+        self._raw = raw
+        self.consumed = 0
+
+    def read(self, size=-1):
+        data = self._raw.read(size)
+        self.consumed += len(data)
+        return data
+
+
+_column_cache: Dict[str, int] = {}
+
+
+def _column_index(ref: str) -> int:
+    """Zero-based column index of a cell reference such as ``"AB12"``."""
+    letters = ref.rstrip("0123456789")
+    index = _column_cache.get(letters)
+    if index is None:
+        index = 0
+        for ch in letters.upper():
+            index = index * 26 + (ord(ch) - 64)
+        index -= 1
+        _column_cache[letters] = index
+    return index
+
+
+def _read_shared_strings(archive: zipfile.ZipFile) -> List[str]:
+    if SHARED_STRINGS_PATH not in archive.namelist():
+        return []
+    strings = []
+    with archive.open(SHARED_STRINGS_PATH) as raw:
+        for _, elem in iterparse(raw, events=("end",)):
+            if elem.tag == _SI:
+                # Rich text splits one string across several <r><t> runs
+                strings.append("".join(t.text or "" for t in elem.iter(_TEXT)))
+                elem.clear()
+    return strings
+
+
+def _as_text(value) -> str:
+    if isinstance(value, float):
+        return str(int(value)) if value.is_integer() else repr(value)
+    return value.strip()
+
+
+def _as_number(value, typecode: str):
+    if isinstance(value, str):
+        try:
+            value = float(value.replace(",", ""))
+        except ValueError:
+            return 0
+    return int(round(value)) if typecode == "q" else value
+
+
+class _SheetRowParser:
+    """Expat handlers that turn ``<row>`` elements into lists of values.
+
+    No element tree is built at all: each finished row is appended to
+    ``ready`` and drained by the caller after every fed chunk, so memory
+    stays bounded by the chunk size rather than by the sheet.
+    """
+
+    def __init__(self, shared: List[str]):
+        self.shared = shared
+        self.ready: List[List] = []
+        self._row: Optional[List] = None
+        self._col = 0
+        self._kind: Optional[str] = None
+        self._text: List[str] = []
+        self._capture = False
+        self.parser = expat.ParserCreate()
+        self.parser.buffer_text = True
+        self.parser.StartElementHandler = self._start
+        self.parser.EndElementHandler = self._end
+        self.parser.CharacterDataHandler = self._chars
+
+    def _start(self, tag, attrs):
+        if ":" in tag:
+            tag = tag.rpartition(":")[2]
+        if tag == "c":
+            ref = attrs.get("r")
+            self._col = _column_index(ref) if ref else len(self._row)
+            self._kind = attrs.get("t")
+            self._text = []
+        elif tag == "v" or (tag == "t" and self._kind == "inlineStr"):
+            self._capture = True
+        elif tag == "row":
+            self._row = []
+
+    def _chars(self, data):
+        if self._capture:
+            self._text.append(data)
+
+    def _end(self, tag):
+        if ":" in tag:
+            tag = tag.rpartition(":")[2]
+        if tag == "v" or tag == "t":
+            self._capture = False
+        elif tag == "c":
+            row = self._row
+            if len(row) <= self._col:
+                row.extend([None] * (self._col + 1 - len(row)))
+            row[self._col] = self._value()
+        elif tag == "row":
+            self.ready.append(self._row)
+            self._row = None
+
+    def _value(self):
+        """Python value of the finished cell: ``str``, ``float`` or ``None``."""
+        if not self._text:
+            return None
+        text = "".join(self._text)
+        kind = self._kind
+        if kind == "s":
+            return self.shared[int(text)]
+        if kind in ("inlineStr", "str", "e"):
+            return text
+        if kind == "b":
+            return float(text == "1")
+        try:
+            return float(text)
+        except ValueError:
+            return text
+
+
+def _iter_sheet_rows(raw, shared: List[str]) -> Iterator[List]:
+    """Yield each sheet row as a list of cell values."""
+    handler = _SheetRowParser(shared)
+    while True:
+        chunk = raw.read(CHUNK_SIZE)
+        handler.parser.Parse(chunk, not chunk)
+        if handler.ready:
+            yield from handler.ready
+            handler.ready = []
+        if not chunk:
+            return
+
+
+def load_stock_report(
+    path: str,
+    progress: Optional[ProgressCallback] = None,
+    sheet: str = SHEET_PATH,
+) -> StockReport:
+    """Stream ``sheet`` of the workbook at ``path`` into a ``StockReport``.
+
+    ``progress(rows_loaded, fraction_of_sheet_parsed)`` is called every
+    ``PROGRESS_EVERY`` rows and once more when loading finishes.
+    """
+    with zipfile.ZipFile(path) as archive:
+        with LOAD_SECONDS.time("shared_strings"):
+            shared = _read_shared_strings(archive)
+        total = archive.getinfo(sheet).file_size or 1
+        with LOAD_SECONDS.time("rows"), archive.open(sheet) as raw:
+            reader = _CountingReader(raw)
+            rows = _iter_sheet_rows(reader, shared)
+
+            header_values = next(rows, [])
+            headers = [_as_text(v) if v is not None else "" for v in header_values]
+            while headers and not headers[-1]:
+                headers.pop()
+            report = StockReport(headers)
+            strings_crc = archive.getinfo(SHARED_STRINGS_PATH).CRC if shared else 0
+            report.version = (archive.getinfo(sheet).CRC << 32) | strings_crc
+            # (buffer, typecode or None for string columns) per sheet column
+            sinks = [
+                (report.columns[name], NUMERIC_COLUMNS.get(name)) if name else None
+                for name in headers
+            ]
+
+            for values in rows:
+                if not any(v is not None and v != "" for v in values):
+                    continue  # formatted but empty trailing rows
+                for col, sink in enumerate(sinks):
+                    if sink is None:
+                        continue
+                    buffer, typecode = sink
+                    value = values[col] if col < len(values) else None
+                    if typecode is None:
+                        buffer.append(report.intern(_as_text(value)) if value is not None else 0)
+                    else:
+                        buffer.append(_as_number(value, typecode) if value is not None else 0)
+                report.row_count += 1
+                if progress and report.row_count % PROGRESS_EVERY == 0:
+                    progress(report.row_count, min(reader.consumed / total, 1.0))
+
+    if progress:
+        progress(report.row_count, 1.0)
+    return report
@@ -0,0 +1,196 @@
+"""Per-phone conversation state for multi-turn stock queries.
+
+A session keeps the last result set as an ``array('i')`` of row ids, so
+follow-ups ("only Delhi", "only sata", "next page") filter or page the
+cached subset instead of searching the whole report again.  Sessions live in
+process with TTL eviction; ``SQLiteSessionStore`` keeps them in a database
+file instead so they survive restarts and are shared between workers.
+"""
+from array import array
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+import re
+import sqlite3
+import threading
+import time
+
+from metrics import REGISTRY
+from stock_render import PAGE_SIZE, render_page
+from stock_report import StockReport
+
+# Seconds of inactivity before a conversation is forgotten
+SESSION_TTL = 30 * 60
+
+MAX_SESSIONS = 10000
+
+_MORE_RE = re.compile(r"^\s*(?:more|next(?:\s+page)?)\s*$", re.IGNORECASE)
+_RESET_RE = re.compile(r"^\s*(?:reset|clear|new\s+search)\s*$", re.IGNORECASE)
+_REFINE_RE = re.compile(r"^\s*(?:only|just|in|at)\s+(?P<term>.+?)\s*$", re.IGNORECASE)
+
+QUERY_SECONDS = REGISTRY.histogram("stock_query_seconds", "Time to answer a stock query", ("kind",))
+QUERY_STAGE_SECONDS = REGISTRY.histogram(
+    "stock_query_stage_seconds", "Time per stage of answering a stock query", ("stage",))
+_SESSION_TIME = QUERY_STAGE_SECONDS.labels("session")
+_SEARCH_TIME = QUERY_STAGE_SECONDS.labels("search")
+_REFINE_TIME = QUERY_STAGE_SECONDS.labels("refine")
+_RENDER_TIME = QUERY_STAGE_SECONDS.labels("render")
+
+
+class Session(NamedTuple):
+    """Cached result set of one conversation and the page it is on."""
+    report_version: int
+    title: str
+    rows: array
+    offset: int = 0
+    updated_at: float = 0.0
+
+
+class SessionStore:
+    """In-process sessions keyed by phone number, oldest-first for eviction."""
+
+    def __init__(self, ttl: float = SESSION_TTL, max_sessions: int = MAX_SESSIONS):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict(self, now: float) -> None:
+        # Entries are ordered by last update, so expired ones sit at the front
+        while self._sessions:
+            phone, session = next(iter(self._sessions.items()))
+            if now - session.updated_at < self.ttl and len(self._sessions) <= self.max_sessions:
+                break
+            del self._sessions[phone]
+
+    def get(self, phone: str) -> Optional[Session]:
+        now = time.time()
+        with self._lock:
+            self._evict(now)
+            return self._sessions.get(phone)
+
+    def put(self, phone: str, session: Session) -> Session:
+        session = session._replace(updated_at=time.time())
+        with self._lock:
+            self._sessions.pop(phone, None)
+            self._sessions[phone] = session
+            self._evict(session.updated_at)
+        return session
+
+    def delete(self, phone: str) -> None:
+        with self._lock:
+            self._sessions.pop(phone, None)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+
+class SQLiteSessionStore(SessionStore):
+    """Sessions persisted in SQLite, row ids stored as a packed blob."""
+
+    def __init__(self, path: str, ttl: float = SESSION_TTL, max_sessions: int = MAX_SESSIONS):
+        super().__init__(ttl, max_sessions)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " phone TEXT PRIMARY KEY, report_version TEXT, title TEXT,"
+            " rows BLOB, row_offset INTEGER, updated_at REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS sessions_updated ON sessions(updated_at)")
+        self._db.commit()
+
+    def _evict(self, now: float) -> None:
+        self._db.execute("DELETE FROM sessions WHERE updated_at < ?", (now - self.ttl,))
+
+    def get(self, phone: str) -> Optional[Session]:
+        now = time.time()
+        with self._lock:
+            self._evict(now)
+            found = self._db.execute(
+                "SELECT report_version, title, rows, row_offset, updated_at FROM sessions WHERE phone = ?",
+                (phone,),
+            ).fetchone()
+            self._db.commit()
+        if found is None:
+            return None
+        version, title, blob, offset, updated_at = found
+        rows = array("i")
+        rows.frombytes(blob)
+        return Session(int(version), title, rows, offset, updated_at)
+
+    def put(self, phone: str, session: Session) -> Session:
+        session = session._replace(updated_at=time.time())
+        with self._lock:
+            # Versions are 64-bit unsigned, past SQLite's INTEGER range
+            self._db.execute(
+                "INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?, ?, ?)",
+                (phone, str(session.report_version), session.title,
+                 session.rows.tobytes(), session.offset, session.updated_at),
+            )
+            # Past the cap, drop the least recently updated
+            self._db.execute(
+                "DELETE FROM sessions WHERE phone IN"
+                " (SELECT phone FROM sessions ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_sessions,),
+            )
+            self._db.commit()
+        return session
+
+    def delete(self, phone: str) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM sessions WHERE phone = ?", (phone,))
+            self._db.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+
+def _refine(report: StockReport, session: Session, term: str) -> Session:
+    """Narrow ``session`` to a branch, or else to rows matching more words."""
+    with _REFINE_TIME.time():
+        rows = report.rows_where("Branch", term, session.rows)
+        if not rows:
+            rows = report.search(term, session.rows)
+    return session._replace(title=f"{session.title} / {term}", rows=rows, offset=0)
+
+
+def _render(report: StockReport, session: Session) -> str:
+    with _RENDER_TIME.time():
+        return render_page(report, session.title, session.rows, session.offset)
+
+
+def handle_query(store: SessionStore, report: StockReport, phone: str, message: str) -> str:
+    """Reply to a stock query, paging or refining ``phone``'s last results."""
+    text = message.strip()
+    if _RESET_RE.match(text):
+        store.delete(phone)
+        return "Cleared. Send a part number or description to search."
+
+    with _SESSION_TIME.time():
+        session = store.get(phone)
+    if session is not None and session.report_version != report.version:
+        # Row ids point into an older report
+        store.delete(phone)
+        session = None
+
+    if _MORE_RE.match(text):
+        if session is None:
+            return "Nothing to continue — send a search first."
+        offset = session.offset + PAGE_SIZE
+        if offset >= len(session.rows):
+            return "No more results."
+        with QUERY_SECONDS.time("page"):
+            return _render(report, store.put(phone, session._replace(offset=offset)))
+
+    refine = _REFINE_RE.match(text)
+    if refine:
+        if session is not None:
+            with QUERY_SECONDS.time("refine"):
+                return _render(report, store.put(phone, _refine(report, session, refine.group("term"))))
+        text = refine.group("term")
+
+    with QUERY_SECONDS.time("search"):
+        with _SEARCH_TIME.time():
+            rows = report.search(text)
+        return _render(report, store.put(phone, Session(report.version, text, rows)))
@@ -0,0 +1,28 @@
+"""Small stock reports for the tests, as workbooks or built in memory."""
+from typing import List, Sequence
+
+from stock_report import NUMERIC_COLUMNS, StockReport
+
+HEADERS = ["Branch", "StorageLocation", "MaterialCode", "VenderPartNo.", "MaterialDiscription",
+           "TodayStock", "BlockedStk", "ARP"]
+
+
+def write_workbook(path: str, rows: Sequence[Sequence], headers: List[str] = HEADERS) -> str:
+    from openpyxl import Workbook
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(headers)
+    for row in rows:
+        sheet.append(list(row))
+    workbook.save(path)
+    return path
+
+
+def make_report(rows: Sequence[Sequence], headers: List[str] = HEADERS) -> StockReport:
+    """A report holding ``rows`` as ``load_stock_report`` would load them."""
+    report = StockReport(list(headers))
+    for row in rows:
+        for name, value in zip(headers, row):
+            report.columns[name].append(value if name in NUMERIC_COLUMNS else report.intern(value))
+        report.row_count += 1
+    return report
@@ -0,0 +1,51 @@
+import pytest
+
+from benchmarks import harness
+from benchmarks.harness import Recorder, case, case_key, compare, percentile
+
+
+def _result(key, p50, peak):
+    return {"key": key, "seconds": {"p50": p50}, "peak_rss_bytes": peak}
+
+
+def test_case_keys_and_registration(monkeypatch):
+    monkeypatch.setattr(harness, "CASES", {})
+    assert case_key("graph.run", {}) == "graph.run"
+    assert case_key("graph.run", {"boxes": 100, "mode": "batch"}) == "graph.run[boxes=100,mode=batch]"
+
+    @case("demo", n=1)
+    @case("demo", slow=True, n=2)
+    def demo(recorder, n):
+        recorder.items_per_op = n
+        for _ in range(3):
+            recorder.time(lambda: None)
+
+    assert list(harness.CASES) == ["demo[n=2]", "demo[n=1]"]
+    assert harness.CASES["demo[n=2]"].slow
+    with pytest.raises(ValueError):
+        case("demo", n=1)(demo)
+    result = harness.run_case("demo[n=2]")
+    assert (result["key"], result["ops"], result["items_per_op"]) == ("demo[n=2]", 3, 2)
+    assert result["seconds"]["min"] <= result["seconds"]["p50"] <= result["seconds"]["max"]
+    assert result["peak_rss_bytes"] >= result["setup_peak_rss_bytes"] > 0
+
+
+def test_percentile_is_nearest_rank():
+    ordered = [float(i) for i in range(1, 101)]
+    assert percentile(ordered, 0.5) == 50.0
+    assert percentile(ordered, 0.99) == 99.0
+    assert percentile([], 0.5) == 0.0
+
+
+def test_empty_recorder():
+    result = Recorder("idle", {}).result()
+    assert result["ops"] == 0 and result["throughput"] == 0.0
+
+
+def test_compare_flags_latency_and_memory_growth():
+    baseline = [_result("a", 0.010, 100), _result("b", 0.010, 100), _result("gone", 1, 1)]
+    current = [_result("a", 0.013, 100), _result("b", 0.011, 200), _result("new", 5, 5)]
+    regressions = compare(baseline, current, threshold=0.25)
+    assert len(regressions) == 2
+    assert regressions[0].startswith("a: p50 10.000 ms -> 13.000 ms")
+    assert regressions[1].startswith("b: peak RSS")
@@ -0,0 +1,150 @@
+import threading
+import time
+
+import pytest
+
+from folder_queue import FolderQueue, main
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "shared_queue.txt")
+
+
+def test_claim_hands_out_lines_in_order_once(path):
+    queue = FolderQueue(path)
+    queue.put_many(["a", " ", "b", "c"])
+    first = queue.claim(2)
+    assert [entry.folder for entry in first] == ["a", "b"]
+    assert [entry.folder for entry in queue.claim(5)] == ["c"]
+    assert queue.claim() == []
+
+
+def test_consumers_never_share_an_entry(path):
+    queue = FolderQueue(path)
+    queue.put_many(str(i) for i in range(20))
+    consumers = [FolderQueue(path, consumer=name) for name in ("one", "two")]
+    claimed = consumers[0].claim(7) + consumers[1].claim(7) + consumers[0].claim(7)
+    assert sorted(entry.folder for entry in claimed) == sorted(str(i) for i in range(20))
+
+
+def test_ack_and_nack(path):
+    queue = FolderQueue(path)
+    queue.put_many(["a", "b"])
+    a, b = queue.claim(2)
+    assert queue.ack(a)
+    assert not queue.ack(a)
+    assert queue.nack(b)
+    assert queue.in_flight() == []
+    [again] = queue.claim()
+    assert again.folder == "b"
+    assert again.offset != b.offset
+
+
+def test_expired_lease_is_redelivered_to_another_consumer(path):
+    crashed = FolderQueue(path, consumer="crashed", lease_seconds=0.05)
+    crashed.put("a")
+    [lost] = crashed.claim()
+    other = FolderQueue(path, consumer="other")
+    assert other.claim() == []
+    time.sleep(0.1)
+    [entry] = other.claim()
+    assert (entry.offset, entry.folder, entry.consumer) == (lost.offset, "a", "other")
+    # The first holder can no longer finish or renew it
+    assert not crashed.ack(lost)
+    assert crashed.renew([lost]) == []
+    assert other.ack(entry)
+
+
+def test_renew_extends_only_held_leases(path):
+    queue = FolderQueue(path, lease_seconds=60)
+    queue.put("a")
+    [entry] = queue.claim()
+    [renewed] = queue.renew([entry])
+    assert renewed.lease_until >= entry.lease_until
+    queue.ack(entry)
+    assert queue.renew([entry]) == []
+
+
+def test_partial_line_is_not_claimed_or_pending(path):
+    queue = FolderQueue(path)
+    with open(path, "a") as f:
+        f.write("done\nhalf")
+    assert queue.pending() == len("done\n")
+    assert [entry.folder for entry in queue.claim(5)] == ["done"]
+    assert queue.pending() == 0
+    with open(path, "a") as f:
+        f.write("-written\n")
+    assert [entry.folder for entry in queue.claim()] == ["half-written"]
+
+
+def test_wait_blocks_until_the_queue_is_written(path):
+    queue = FolderQueue(path)
+    started = time.monotonic()
+    assert not queue.wait(0.2)
+    assert time.monotonic() - started >= 0.2
+
+    def producer():
+        time.sleep(0.1)
+        FolderQueue(path).put("a")
+
+    threading.Thread(target=producer).start()
+    assert queue.wait(5)
+    assert [entry.folder for entry in queue.claim()] == ["a"]
+
+
+def test_wait_blocks_until_a_line_is_complete(path):
+    queue = FolderQueue(path)
+    with open(path, "a") as f:
+        f.write("partial")
+    started = time.monotonic()
+    assert not queue.wait(0.2)
+    assert time.monotonic() - started >= 0.2
+
+    def finish_line():
+        time.sleep(0.1)
+        with open(path, "a") as f:
+            f.write("\n")
+
+    threading.Thread(target=finish_line).start()
+    assert queue.wait(5)
+    assert [entry.folder for entry in queue.claim()] == ["partial"]
+
+
+def test_writes_without_a_complete_line_do_not_wake_wait(path):
+    queue = FolderQueue(path)
+    assert not queue.wait(0)
+
+    def touch():
+        time.sleep(0.05)
+        # Opening the queue creates it with an empty append
+        FolderQueue(path)
+        with open(path, "a") as f:
+            f.write("partial")
+
+    threading.Thread(target=touch).start()
+    started = time.monotonic()
+    assert not queue.wait(0.3)
+    assert time.monotonic() - started >= 0.3
+
+
+def test_compaction_keeps_entry_ids_and_unclaimed_lines(path):
+    queue = FolderQueue(path, compact_threshold=1)
+    queue.put_many(["a", "b", "c"])
+    # Compacts once more than half the file is claimed
+    a, b = queue.claim(2)
+    with open(path) as f:
+        assert f.read() == "c\n"
+    queue.put("d")
+    c, d = queue.claim(2)
+    assert [entry.offset for entry in (a, b, c, d)] == [0, 2, 4, 6]
+    assert [entry.folder for entry in (c, d)] == ["c", "d"]
+    assert queue.pending() == 0
+    assert all(queue.ack(entry) for entry in (a, b, c, d))
+
+
+def test_main(path, capsys):
+    assert main(["folder_queue.py", path, "put", "x", "y"]) == 0
+    assert main(["folder_queue.py", path, "status"]) == 0
+    assert capsys.readouterr().out == "4 bytes pending\n"
+    assert main(["folder_queue.py", path]) == 2
@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from function_sandbox import SandboxError, SandboxPool, prepare_function
+
+# Reaches the real open() through the object graph, past the builtin allow-list
+ESCAPE = '''
+def escape(path):
+    classes = [().__class__.__base__]
+    while classes:
+        cls = classes.pop()
+        if cls.__name__ == "FileIO":
+            return cls(path).read().decode()
+        classes.extend(cls.__class__.__subclasses__(cls))
+'''
+
+
+def _with_pool(*calls, **options):
+    """Results (or SandboxErrors) of ``(function, args)`` calls, in order, on one fresh pool."""
+    async def scenario():
+        pool = SandboxPool(**dict({"workers": 1, "timeout": 2}, **options))
+        await pool.start()
+        results = []
+        try:
+            for function, args in calls:
+                try:
+                    results.append(await pool.call(function, args))
+                except SandboxError as e:
+                    results.append(e)
+        finally:
+            await pool.shutdown()
+        return results
+    return asyncio.run(scenario())
+
+
+def test_prepare_function_checks_the_definition():
+    function = prepare_function("double", "def double(x):\n    return x * 2\n", 1)
+    assert prepare_function("double", function.source, 1).digest == function.digest
+    with pytest.raises(SandboxError, match="syntax error"):
+        prepare_function("f", "def f(:\n", 0)
+    with pytest.raises(SandboxError, match="named 'f'"):
+        prepare_function("f", "def g():\n    pass\n", 0)
+    with pytest.raises(SandboxError, match="2 argument"):
+        prepare_function("f", "def f(a):\n    pass\n", 2)
+    prepare_function("f", "def f(*args):\n    return args\n", 3)
+
+
+def test_call_runs_in_a_worker():
+    function = prepare_function("double", "def double(x):\n    return [x * 2, len(str(x))]\n", 1)
+    assert _with_pool((function, [21]), (function, [5])) == [[42, 2], [10, 1]]
+
+
+def test_map_spreads_chunks_over_workers():
+    add = prepare_function("add", "def add(a, b):\n    return a + b\n", 2)
+    seven = prepare_function("seven", "def seven():\n    return 7\n", 0)
+
+    async def scenario():
+        pool = SandboxPool(workers=2, timeout=2)
+        try:
+            return (await pool.map(add, [[1, 2, 3], [10, 20, 30]], 3, chunk_rows=2),
+                    await pool.map(seven, [], 3))
+        finally:
+            await pool.shutdown()
+
+    assert asyncio.run(scenario()) == ([11, 22, 33], [7, 7, 7])
+
+
+def test_restricted_builtins_and_no_file_access():
+    read = prepare_function("read", "def read(path):\n    return open(path).read()\n", 1)
+    escape = prepare_function("escape", ESCAPE, 1)
+    denied, escaped = _with_pool((read, ["/etc/passwd"]), (escape, ["/etc/passwd"]))
+    assert isinstance(denied, SandboxError) and "NameError" in str(denied)
+    # The real open() is found, but the syscall is refused
+    assert isinstance(escaped, SandboxError) and "PermissionError" in str(escaped)
+
+
+def test_timeout_fails_alone_and_worker_is_replaced():
+    spin = prepare_function("spin", "def spin():\n    while True:\n        pass\n", 0)
+    echo = prepare_function("echo", "def echo(x):\n    return x\n", 1)
+    timed_out, echoed = _with_pool((spin, []), (echo, ["ok"]), timeout=0.5)
+    assert "timed out" in str(timed_out)
+    assert echoed == "ok"
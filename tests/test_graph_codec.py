@@ -0,0 +1,136 @@
+from fastapi.testclient import TestClient
+import pytest
+
+import app
+from graph_codec import GraphFormatError, decode_graph, dump_payload, encode_graph, load_payload
+
+ADD = {
+    "name": "add_numbers",
+    "description": "Adds two integers together",
+    "inputs": [{"name": "a", "type": "int"}, {"name": "b", "type": "int"}],
+    "outputs": [{"name": "result", "type": "int"}],
+}
+CUSTOM = {
+    "name": "custom",
+    "description": "Not in the catalog",
+    "inputs": [{"name": "value", "type": "int"}],
+    "outputs": [{"name": "text", "type": "str"}],
+}
+CATALOG = {"add_numbers": ADD}
+
+
+def _box(box_id, function, x, y):
+    return {"id": box_id, "function": function, "position": {"x": x, "y": y}}
+
+
+def _verbose():
+    return {
+        "boxes": [_box("box-1", ADD, 10, 20.25), _box("box-2", ADD, 300, 20), _box("box-3", CUSTOM, 0, 0)],
+        "connections": [
+            {"from": {"boxId": "box-1", "index": 0, "direction": "output"},
+             "to": {"boxId": "box-2", "index": 1, "direction": "input"}},
+            # Drawn backwards, from the input to the output
+            {"from": {"boxId": "box-3", "index": 0, "direction": "input"},
+             "to": {"boxId": "box-2", "index": 0, "direction": "output"}},
+        ],
+    }
+
+
+def _compact(**overrides):
+    compact = {"v": 1, "functions": ["add_numbers"], "boxes": [[0, 0, 0], [0, 100, 0]],
+               "connections": [[0, 0, 1, 0]]}
+    compact.update(overrides)
+    return compact
+
+
+def test_encode_refers_to_catalog_functions_by_name():
+    compact = encode_graph(_verbose(), CATALOG)
+    assert compact == {
+        "v": 1,
+        "functions": ["add_numbers", CUSTOM],
+        "boxes": [[0, 10, 20.2], [0, 300, 20], [1, 0, 0]],
+        "connections": [[0, 0, 1, 1], [1, 0, 2, 0]],
+    }
+
+
+def _connection(source, target):
+    return {"boxes": [_box("a", ADD, 0, 0), _box("b", ADD, 0, 0)], "connections": [{"from": source, "to": target}]}
+
+
+@pytest.mark.parametrize("verbose", [
+    [],
+    {"boxes": {}},
+    {"boxes": ["a"]},
+    {"boxes": [{"function": ADD}]},
+    {"boxes": [{"id": "a", "function": "add_numbers"}]},
+    {"boxes": [{"id": "a", "function": ADD, "position": [1, 2]}]},
+    {"boxes": [{"id": "a", "function": ADD, "position": {"x": "left"}}]},
+    _connection("a", "b"),
+    _connection({"boxId": "a", "index": "0"}, {"boxId": "b", "index": 0}),
+    _connection({"boxId": "a", "index": 0}, {"boxId": "c", "index": 0}),
+], ids=["not an object", "boxes not a list", "box not an object", "no id", "function name", "list position",
+        "bad coordinate", "string endpoints", "string index", "unknown box"])
+def test_encode_rejects(verbose):
+    with pytest.raises(GraphFormatError):
+        encode_graph(verbose, CATALOG)
+
+
+def test_decode_round_trip():
+    graph = decode_graph(encode_graph(_verbose(), CATALOG), CATALOG)
+    assert [box["function"] for box in graph["boxes"]] == [ADD, ADD, CUSTOM]
+    assert graph["connections"][1] == {
+        "from": {"boxId": "box-2", "index": 0, "type": "int"},
+        "to": {"boxId": "box-3", "index": 0, "type": "int"},
+    }
+
+
+def test_payload_json_round_trip():
+    compact = encode_graph(_verbose(), CATALOG)
+    assert load_payload(dump_payload(compact), "application/json") == compact
+
+
+@pytest.mark.parametrize("compact", [
+    _compact(v=2),
+    _compact(functions=["nope"]),
+    _compact(functions=[5]),
+    _compact(functions=[{"inputs": [], "outputs": []}]),
+    _compact(functions=[{"name": "f", "inputs": [], "outputs": "x"}]),
+    _compact(functions=[{"name": "f", "inputs": [{"name": "a"}], "outputs": []}]),
+    _compact(boxes=[[1, 0, 0]]),
+    _compact(boxes=[[0, "left", 0]]),
+    _compact(boxes=[[0, 0]]),
+    _compact(connections=[[0, 0, 5, 0]]),
+    _compact(connections=[[0, 3, 1, 0]]),
+    _compact(connections=[["0", 0, 1, 0]]),
+    _compact(connections=[[0, 0, 0, 1]]),
+    _compact(functions=["add_numbers", CUSTOM], boxes=[[1, 0, 0], [0, 0, 0]], connections=[[0, 0, 1, 0]]),
+], ids=["version", "unknown name", "not a definition", "no name", "outputs not a list", "port without type",
+        "missing function", "bad coordinate", "short box", "missing box", "missing connector", "string index",
+        "self-loop", "type mismatch"])
+def test_decode_rejects(compact):
+    with pytest.raises(GraphFormatError):
+        decode_graph(compact, CATALOG)
+
+
+def test_malformed_payload():
+    with pytest.raises(GraphFormatError):
+        load_payload(b"{", "application/json")
+    with pytest.raises(GraphFormatError):
+        load_payload(b"[]", "application/json")
+
+
+def test_api_export_and_import():
+    client = TestClient(app.app)
+    template = app.FUNCTION_TEMPLATES[0]
+    verbose = {"boxes": [_box("a", template, 5, 6)], "connections": []}
+    exported = client.post("/api/export", json=verbose)
+    assert exported.json() == {"status": "exported", "graph": {
+        "v": 1, "functions": [template["name"]], "boxes": [[0, 5, 6]], "connections": []}}
+    imported = client.post("/api/import", json=exported.json()["graph"]).json()
+    assert imported["boxes"] == [_box("box-1", template, 5, 6)]
+    assert client.post("/api/import", json=_compact(v=9)).status_code == 400
+    bare = {"boxes": [{"id": "a", "function": "add_numbers"}]}
+    assert client.post("/api/export", json=bare).status_code == 400
+    assert client.post("/api/import", json=bare).status_code == 400
+    assert client.post("/api/import", json=["v"]).status_code == 400
+    assert client.post("/api/import", content=b"{", headers={"content-type": "application/json"}).status_code == 400
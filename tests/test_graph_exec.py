@@ -0,0 +1,199 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from graph_exec import MAX_FORMAT_WIDTH, ExecutionError, GraphExecutor, format_template
+from graph_store import GraphStore, intern_signature
+from result_cache import ResultCache
+
+ADD = intern_signature("add_numbers", "", [("a", "int"), ("b", "int")], [("result", "int")])
+MULTIPLY = intern_signature("multiply_numbers", "", [("a", "int"), ("b", "int")], [("result", "int")])
+TO_STRING = intern_signature("to_string", "", [("value", "int")], [("text", "str")])
+UPPERCASE = intern_signature("uppercase", "", [("text", "str")], [("upper_text", "str")])
+FORMAT = intern_signature("format_message", "", [("template", "str"), ("value", "int")], [("message", "str")])
+SPLIT = intern_signature("split_string", "", [("text", "str"), ("delimiter", "str")], [("parts", "list")])
+FILTER = intern_signature("filter_positive", "", [("numbers", "list")], [("positive", "list")])
+
+
+def _chain(*signatures):
+    """Boxes b0, b1, ... each feeding its first output into the next box's first input."""
+    store = GraphStore()
+    for i, signature in enumerate(signatures):
+        store.add_box(signature, 0, 0, f"b{i}")
+        if i:
+            previous = signatures[i - 1]
+            store.add_connection(f"b{i - 1}", previous.outputs[0].name, f"b{i}", signature.inputs[0].name)
+    return store
+
+
+async def _items(values):
+    for value in values:
+        yield value
+
+
+async def _collect(results):
+    return [item async for item in results]
+
+
+def _stream(store, sources, inputs=None):
+    executor = GraphExecutor(None)
+    return asyncio.run(_collect(executor.stream(store, sources, inputs)))
+
+
+def test_run_follows_connections():
+    store = _chain(ADD, TO_STRING, UPPERCASE)
+    results = asyncio.run(GraphExecutor(None).run(store, {"b0": {"a": 2, "b": 40}}))
+    assert results == {"b0": {"result": 42}, "b1": {"text": "42"}, "b2": {"upper_text": "42"}}
+
+
+def test_run_checks_inputs():
+    store = _chain(ADD)
+    with pytest.raises(ExecutionError, match="not connected or given"):
+        asyncio.run(GraphExecutor(None).run(store, {"b0": {"a": 1}}))
+    with pytest.raises(ExecutionError, match="must be int"):
+        asyncio.run(GraphExecutor(None).run(store, {"b0": {"a": 1, "b": True}}))
+
+
+def test_run_rejects_cycles():
+    store = _chain(ADD, ADD)
+    store.add_connection("b1", "result", "b0", "b")
+    with pytest.raises(ExecutionError, match="cycle"):
+        asyncio.run(GraphExecutor(None).run(store))
+
+
+def test_run_reuses_cached_results():
+    store = _chain(ADD, TO_STRING)
+    executor = GraphExecutor(None, cache=ResultCache())
+    inputs = {"b0": {"a": 1, "b": 2}}
+    first, second = set(), set()
+    asyncio.run(executor.run(store, inputs, first))
+    results = asyncio.run(executor.run(store, inputs, second))
+    assert (first, second) == (set(), {"b0", "b1"})
+    assert results["b1"] == {"text": "3"}
+
+
+def test_values_the_cache_cannot_encode_skip_it(tmp_path):
+    store = _chain(ADD, TO_STRING)
+    executor = GraphExecutor(None, cache=ResultCache(directory=str(tmp_path)))
+    inputs = {"b0": {"a": 2 ** 64, "b": 1}}
+    hits = set()
+    asyncio.run(executor.run(store, inputs))
+    results = asyncio.run(executor.run(store, inputs, hits))
+    assert hits == set()
+    assert results["b1"] == {"text": str(2 ** 64 + 1)}
+
+
+def test_impure_functions_are_not_cached():
+    random = intern_signature("generate_random", "", [], [("value", "int")])
+    executor = GraphExecutor(None, cache=ResultCache())
+    hits = set()
+    asyncio.run(executor.run(_chain(random)))
+    asyncio.run(executor.run(_chain(random), hits=hits))
+    assert hits == set()
+
+
+def test_user_functions_need_a_matching_signature():
+    executor = GraphExecutor(None)
+    with pytest.raises(ExecutionError, match="built-in"):
+        executor.register(ADD, None)
+    negate = intern_signature("negate", "", [("a", "int")], [("result", "int")])
+    with pytest.raises(ExecutionError, match="no implementation"):
+        asyncio.run(executor.run(_chain(negate), {"b0": {"a": 1}}))
+
+
+def test_run_batch_columns_and_scalars():
+    store = _chain(ADD, TO_STRING)
+    store.add_box(FORMAT, 0, 0, "fmt")
+    store.add_connection("b0", "result", "fmt", "value")
+    inputs = {"b0": {"a": [1, 2, 3], "b": 10}, "fmt": {"template": "n={}"}}
+    results = asyncio.run(GraphExecutor(None).run_batch(store, inputs))
+    assert results["b0"]["result"].tolist() == [11, 12, 13]
+    assert results["b1"]["text"].tolist() == ["11", "12", "13"]
+    assert results["fmt"]["message"].tolist() == ["n=11", "n=12", "n=13"]
+
+
+def test_run_batch_zero_rows():
+    results = asyncio.run(GraphExecutor(None).run_batch(_chain(ADD, TO_STRING), {"b0": {"a": [], "b": []}}))
+    assert results["b0"]["result"].dtype == np.int64
+    assert results["b1"]["text"].tolist() == []
+
+
+@pytest.mark.parametrize("signature", [ADD, MULTIPLY])
+def test_run_batch_ints_beyond_int64_are_exact(signature):
+    big = 2 ** 62
+    inputs = {"b0": {"a": [big, 3, 10 ** 20, 2 ** 63], "b": [big, 4, 1, 1]}}
+    results = asyncio.run(GraphExecutor(None).run_batch(_chain(signature, TO_STRING), inputs))
+    operation = (lambda a, b: a + b) if signature is ADD else (lambda a, b: a * b)
+    expected = [operation(a, b) for a, b in zip(inputs["b0"]["a"], inputs["b0"]["b"])]
+    assert results["b0"]["result"].tolist() == expected
+    assert results["b1"]["text"].tolist() == [str(value) for value in expected]
+
+
+def test_run_batch_rejects_bad_columns():
+    executor = GraphExecutor(None)
+    with pytest.raises(ExecutionError, match="different lengths"):
+        asyncio.run(executor.run_batch(_chain(ADD), {"b0": {"a": [1, 2], "b": [1, 2, 3]}}))
+    with pytest.raises(ExecutionError, match="no input columns"):
+        asyncio.run(executor.run_batch(_chain(ADD), {"b0": {"a": 1, "b": 2}}))
+    with pytest.raises(ExecutionError, match="must be a column of int"):
+        asyncio.run(executor.run_batch(_chain(ADD), {"b0": {"a": [1, 2], "b": ["x", "y"]}}))
+    with pytest.raises(ExecutionError, match="must be a column of list"):
+        asyncio.run(executor.run_batch(_chain(FILTER), {"b0": {"numbers": 5}}, rows=2))
+
+
+def test_run_batch_list_column():
+    results = asyncio.run(GraphExecutor(None).run_batch(_chain(FILTER), {"b0": {"numbers": [[1, -1], [-2]]}}))
+    assert results["b0"]["positive"].tolist() == [[1], []]
+
+
+def test_stream_chunked_source_is_one_text():
+    # Body chunks do not line up with the delimiters
+    parts = _stream(_chain(SPLIT), {"b0": {"text": _items(["a,b", "c,", "d"])}}, {"b0": {"delimiter": ","}})
+    assert [value for _, _, value in parts] == ["a", "bc", "d"]
+
+
+def test_stream_splits_upstream_values_separately():
+    store = _chain(UPPERCASE, SPLIT)
+    parts = _stream(store, {"b0": {"text": _items(["x,y", "zz", "p,q"])}}, {"b1": {"delimiter": ","}})
+    assert [value for _, _, value in parts] == ["X", "Y", "ZZ", "P", "Q"]
+
+
+def test_stream_filters_list_elements():
+    store = _chain(FILTER)
+    values = _stream(store, {"b0": {"numbers": _items([3, -1, 0, 7])}})
+    assert values == [("b0", "positive", 3), ("b0", "positive", 7)]
+
+
+def test_stream_needs_a_streamed_input():
+    with pytest.raises(ExecutionError, match="no streamed input"):
+        GraphExecutor(None).stream(_chain(ADD), {}, {"b0": {"a": 1, "b": 2}})
+
+
+def test_format_template():
+    assert format_template("{:>5}|{{}}", "ab") == "   ab|{}"
+    assert format_template("{0}, {0!r}", "ab") == "ab, 'ab'"
+    assert format_template("{0:.2f}", 3.14159) == "3.14"
+
+
+@pytest.mark.parametrize("template", [
+    "{:>999999999}",
+    "{0:.999999999f}",
+    "{0:>%d}{0:>%d}" % (MAX_FORMAT_WIDTH, MAX_FORMAT_WIDTH),
+    "{0:{0}}",
+    "{0.__class__}",
+    "{0[0]}",
+    "{name}",
+])
+def test_format_template_rejects(template):
+    with pytest.raises(ValueError):
+        format_template(template, 99999999)
+
+
+def test_format_errors_are_execution_errors():
+    store = _chain(FORMAT)
+    with pytest.raises(ExecutionError, match="ValueError"):
+        asyncio.run(GraphExecutor(None).run(store, {"b0": {"template": "{:>999999999}", "value": 1}}))
+    with pytest.raises(ExecutionError, match="ValueError"):
+        asyncio.run(GraphExecutor(None).run_batch(
+            store, {"b0": {"template": "{:>999999999}", "value": np.arange(3).tolist()}}))
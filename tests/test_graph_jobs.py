@@ -0,0 +1,151 @@
+import asyncio
+
+import pytest
+
+from graph_exec import GraphExecutor
+from graph_jobs import JobScheduler, QueueFullError
+from graph_store import GraphStore, intern_signature
+
+ADD = intern_signature("add_numbers", "", [("a", "int"), ("b", "int")], [("result", "int")])
+TO_STRING = intern_signature("to_string", "", [("value", "int")], [("text", "str")])
+
+
+def _graph():
+    store = GraphStore()
+    store.add_box(ADD, 0, 0, "add")
+    store.add_box(TO_STRING, 0, 0, "text")
+    store.add_connection("add", "result", "text", "value")
+    return store
+
+
+class BlockingExecutor:
+    """Runs until released, recording the order jobs start in."""
+
+    def __init__(self):
+        self.started = []
+        self.release = asyncio.Event()
+
+    async def run(self, store, inputs, hits, progress):
+        self.started.append(inputs["tag"])
+        await self.release.wait()
+        return {}
+
+
+async def _all_events(scheduler, job, start=0):
+    return [entry async for entry in scheduler.events(job, start)]
+
+
+def test_job_reports_progress_and_results():
+    async def scenario():
+        scheduler = JobScheduler(GraphExecutor(None))
+        scheduler.start()
+        store = _graph()
+        job = scheduler.submit(store, {"add": {"a": 1, "b": 2}})
+        # Editing after submit does not affect the run
+        store.clear()
+        events = [event for _, event in await _all_events(scheduler, job)]
+        await scheduler.shutdown()
+        return job, events
+
+    job, events = asyncio.run(scenario())
+    assert [event["type"] for event in events] == ["queued", "started", "node", "node", "done"]
+    assert events[3]["outputs"] == {"text": "3"}
+    summary = job.summary()
+    assert (summary["status"], summary["completed"], summary["total"]) == ("done", 2, 2)
+    assert summary["results"]["text"] == {"text": "3"}
+
+
+def test_failed_job_records_the_error():
+    async def scenario():
+        scheduler = JobScheduler(GraphExecutor(None))
+        scheduler.start()
+        job = scheduler.submit(_graph())
+        await _all_events(scheduler, job)
+        await scheduler.shutdown()
+        return job
+
+    job = asyncio.run(scenario())
+    assert job.status == "failed"
+    assert "not connected or given" in job.summary()["error"]
+
+
+def test_higher_priority_runs_first():
+    async def scenario():
+        executor = BlockingExecutor()
+        scheduler = JobScheduler(executor, workers=1)
+        scheduler.start()
+        submitted = [scheduler.submit(GraphStore(), {"tag": tag}, priority)
+                     for tag, priority in (("low", 0), ("high", 5), ("mid", 1), ("low2", 0))]
+        executor.release.set()
+        for job in submitted:
+            await _all_events(scheduler, job)
+        await scheduler.shutdown()
+        return executor.started
+
+    assert asyncio.run(scenario()) == ["high", "mid", "low", "low2"]
+
+
+def test_cancel_queued_and_running_jobs():
+    async def scenario():
+        executor = BlockingExecutor()
+        scheduler = JobScheduler(executor, workers=1)
+        scheduler.start()
+        running = scheduler.submit(GraphStore(), {"tag": "running"})
+        queued = scheduler.submit(GraphStore(), {"tag": "queued"})
+        await asyncio.sleep(0.01)
+        assert running.status == "running"
+        scheduler.cancel(queued.id)
+        scheduler.cancel(running.id)
+        await _all_events(scheduler, running)
+        executor.release.set()
+        await asyncio.sleep(0.01)
+        await scheduler.shutdown()
+        return executor.started, running, queued
+
+    started, running, queued = asyncio.run(scenario())
+    # The cancelled queued job is skipped, not run
+    assert started == ["running"]
+    assert (running.status, queued.status) == ("cancelled", "cancelled")
+    assert running.events[-1] == {"type": "cancelled"}
+
+
+def test_queue_is_bounded_and_events_resume():
+    async def scenario():
+        executor = BlockingExecutor()
+        scheduler = JobScheduler(executor, workers=1, max_queued=1)
+        scheduler.start()
+        job = scheduler.submit(GraphStore(), {"tag": "a"})
+        with pytest.raises(QueueFullError):
+            scheduler.submit(GraphStore(), {"tag": "b"})
+        heartbeat = [entry async for entry in _first(scheduler.events(job, 1, heartbeat=0.01), 2)]
+        executor.release.set()
+        resumed = await _all_events(scheduler, job, start=1)
+        await scheduler.shutdown()
+        return heartbeat, resumed
+
+    heartbeat, resumed = asyncio.run(scenario())
+    assert heartbeat[0][1]["type"] == "started"
+    assert heartbeat[1] is None
+    assert [(index, event["type"]) for index, event in resumed] == [(1, "started"), (2, "done")]
+
+
+async def _first(iterator, count):
+    async for item in iterator:
+        yield item
+        count -= 1
+        if not count:
+            return
+
+
+def test_finished_jobs_are_forgotten():
+    async def scenario():
+        scheduler = JobScheduler(GraphExecutor(None), max_finished=2)
+        scheduler.start()
+        jobs = [scheduler.submit(GraphStore()) for _ in range(4)]
+        for job in jobs:
+            await _all_events(scheduler, job)
+        await scheduler.shutdown()
+        return scheduler, jobs
+
+    scheduler, jobs = asyncio.run(scenario())
+    assert list(scheduler.jobs) == [job.id for job in jobs[2:]]
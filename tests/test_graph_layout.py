@@ -0,0 +1,41 @@
+from graph_layout import LAYER_SPACING, NODE_SPACING, layered_layout
+from graph_store import BOX_HEIGHT, BOX_WIDTH
+
+
+def test_chain_flows_left_to_right():
+    positions = layered_layout(["a", "b", "c"], [("a", "b"), ("b", "c")], origin=(0, 0))
+    assert positions == {"a": (0, 0), "b": (LAYER_SPACING, 0), "c": (2 * LAYER_SPACING, 0)}
+
+
+def test_long_edges_span_layers():
+    # a -> c directly and through b: c goes after b, not next to a
+    positions = layered_layout(["a", "b", "c"], [("a", "c"), ("a", "b"), ("b", "c")], origin=(0, 0))
+    assert [positions[n][0] for n in "abc"] == [0, LAYER_SPACING, 2 * LAYER_SPACING]
+
+
+def test_cycles_and_self_loops_are_laid_out():
+    positions = layered_layout(["a", "b", "c"], [("a", "b"), ("b", "c"), ("c", "a"), ("b", "b")])
+    assert len({x for x, _ in positions.values()}) == 3
+
+
+def test_barycenter_removes_crossings():
+    # Layer 1 is listed in the order that crosses every edge from layer 0
+    nodes = ["a", "b", "y", "x"]
+    positions = layered_layout(nodes, [("a", "x"), ("b", "y")], origin=(0, 0))
+    assert positions["a"][1] < positions["b"][1]
+    assert positions["x"][1] < positions["y"][1]
+    assert {positions[n][1] for n in nodes} == {0, NODE_SPACING}
+
+
+def test_smaller_layers_are_centred():
+    positions = layered_layout(["a", "b", "c", "d"], [("a", "d"), ("b", "d"), ("c", "d")], origin=(0, 0))
+    assert positions["d"] == (LAYER_SPACING, NODE_SPACING)
+    assert layered_layout([], []) == {}
+
+
+def test_boxes_do_not_overlap():
+    nodes = [f"n{i}" for i in range(6)]
+    positions = layered_layout(nodes, [("n0", n) for n in nodes[1:]], origin=(0, 0))
+    ys = sorted(y for x, y in positions.values() if x == LAYER_SPACING)
+    assert all(lower - upper >= BOX_HEIGHT for upper, lower in zip(ys, ys[1:]))
+    assert LAYER_SPACING > BOX_WIDTH
@@ -0,0 +1,89 @@
+import gc
+import json
+
+import graph_store
+from graph_store import GraphStore, Port, intern_signature, signature_from_dict
+
+ADD = {
+    "name": "add_numbers", "description": "Adds",
+    "inputs": [{"name": "a", "type": "int"}, {"name": "b", "type": "int"}],
+    "outputs": [{"name": "result", "type": "int"}],
+}
+
+
+def test_signatures_and_ports_are_shared():
+    first = signature_from_dict(ADD)
+    assert signature_from_dict(dict(ADD)) is first
+    assert first.input("b") == Port("b", "int")
+    assert first.output("missing") is None
+    other = intern_signature("negate", "", [("a", "int")], [("result", "int")])
+    assert other.inputs[0] is first.inputs[0]
+    assert other.outputs[0] is first.outputs[0]
+
+
+def test_unused_signatures_are_dropped():
+    store = GraphStore()
+    store.add_box(intern_signature("one_off", "", [("one_off_port", "int")], []), 0, 0, box_id="b1")
+    assert ("one_off_port", "int") in graph_store._ports
+    store.clear()
+    gc.collect()
+    assert not any(key[0] == "one_off" for key in graph_store._signatures.keys())
+    assert ("one_off_port", "int") not in graph_store._ports
+
+
+def test_box_json_matches_api_shape():
+    store = GraphStore()
+    box = store.add_box(signature_from_dict(ADD), 1, 2, box_id="b1")
+    assert json.loads(store.box_json(box)) == {
+        "id": "b1", "name": "add_numbers", "description": "Adds",
+        "inputs": ADD["inputs"], "outputs": ADD["outputs"], "x": 1.0, "y": 2.0,
+    }
+
+
+def test_payloads_are_cached_until_a_change():
+    store = GraphStore()
+    box = store.add_box(signature_from_dict(ADD), 0, 0)
+    exported = store.export_json()
+    assert store.export_json() is exported
+    store.move_box(box, 5, 6)
+    assert json.loads(store.boxes_json())[0]["x"] == 5.0
+    edge = store.add_connection(box.id, "result", box.id, "a")
+    assert json.loads(store.connections_json()) == [{
+        "id": edge.id, "source_box": box.id, "source_output": "result",
+        "target_box": box.id, "target_input": "a",
+    }]
+    store.remove_connection(edge.id)
+    store.remove_connection(edge.id)
+    assert json.loads(store.export_json()) == {"boxes": json.loads(store.boxes_json()), "connections": []}
+    version = store.version
+    store.clear()
+    assert store.version > version
+    assert json.loads(store.export_json()) == {"boxes": [], "connections": []}
+
+
+def test_boxes_in_viewport():
+    store = GraphStore()
+    signature = signature_from_dict(ADD)
+    near = store.add_box(signature, 100, 100)
+    # Top-left corner outside, but the box reaches into the rectangle
+    reaching = store.add_box(signature, -200, -100)
+    far = store.add_box(signature, 5000, 5000)
+    assert {box.id for box in store.boxes_in(0, 0, 800, 600)} == {near.id, reaching.id}
+    store.move_box(far, 700, 500)
+    store.move_box(reaching, -2000, 0)
+    assert {box.id for box in store.boxes_in(0, 0, 800, 600)} == {near.id, far.id}
+    # Huge rectangles walk the occupied cells instead
+    assert len(store.boxes_in(-1e9, -1e9, 1e9, 1e9)) == 3
+
+
+def test_connections_of_boxes():
+    store = GraphStore()
+    signature = signature_from_dict(ADD)
+    a, b, c = (store.add_box(signature, 0, 0) for _ in range(3))
+    ab = store.add_connection(a.id, "result", b.id, "a")
+    bc = store.add_connection(b.id, "result", c.id, "a")
+    assert {edge.id for edge in store.connections_of([a.id, b.id])} == {ab.id, bc.id}
+    store.remove_connection(ab.id)
+    assert store.connections_of([a.id]) == []
+    store.clear()
+    assert store.boxes_in(-1e6, -1e6, 1e6, 1e6) == []
@@ -0,0 +1,38 @@
+import json
+
+from fastapi.testclient import TestClient
+
+import app
+import old_app
+from json_response import FastJSONResponse, dumps, json_array, json_object
+
+
+def test_fragment_helpers():
+    body = json_object(items=json_array([dumps(1), dumps({"a": None})]), name=dumps("x"))
+    assert json.loads(body) == {"items": [1, {"a": None}], "name": "x"}
+    assert json_array([]) == b"[]"
+    assert dumps({1: "a"}) == b'{"1":"a"}'
+    assert FastJSONResponse({"a": [1.5]}).body == b'{"a":[1.5]}'
+    # Beyond orjson's 64-bit ints
+    assert dumps({1: [2 ** 64, "é"]}) == '{"1":[18446744073709551616,"é"]}'.encode()
+
+
+def test_app_samples_encoded_templates():
+    client = TestClient(app.app)
+    functions = client.post("/api/chat", json={"message": "hi"}).json()["functions"]
+    assert 2 <= len(functions) <= 3
+    assert all(function in app.FUNCTION_TEMPLATES for function in functions)
+
+
+def test_old_app_payloads_follow_mutations():
+    client = TestClient(old_app.app)
+    client.delete("/clear")
+    boxes = client.post("/chat", json={"message": "add"}).json()["boxes"]
+    assert client.get("/boxes").json() == boxes
+    client.post(f"/boxes/{boxes[0]['id']}/position", json={"x": 7, "y": 9})
+    moved = client.get("/boxes").json()
+    assert (moved[0]["x"], moved[0]["y"]) == (7, 9)
+    assert moved[1:] == boxes[1:]
+    assert client.get("/export").json() == {"boxes": moved, "connections": []}
+    client.delete("/clear")
+    assert client.get("/export").json() == {"boxes": [], "connections": []}
@@ -0,0 +1,74 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import pytest
+
+import app
+from metrics import SIZE_BUCKETS, MetricsMiddleware, Registry
+
+
+def test_counter_and_histogram_render():
+    registry = Registry()
+    hits = registry.counter("hits", "Lookups", ("result",))
+    hits.labels("hit").inc()
+    hits.labels("hit").inc(2)
+    latency = registry.histogram("latency", "Time", buckets=(0.1, 1))
+    latency.labels().observe(0.05)
+    latency.labels().observe(5)
+    assert registry.render().decode().splitlines() == [
+        "# HELP hits Lookups",
+        "# TYPE hits counter",
+        'hits_total{result="hit"} 3',
+        "# HELP latency Time",
+        "# TYPE latency histogram",
+        'latency_bucket{le="0.1"} 1',
+        'latency_bucket{le="1"} 1',
+        'latency_bucket{le="+Inf"} 2',
+        "latency_sum 5.05",
+        "latency_count 2",
+    ]
+
+
+def test_labels_are_escaped_and_checked():
+    registry = Registry()
+    counter = registry.counter("c", "C", ("name",))
+    counter.labels('a"b\\c').inc()
+    assert 'c_total{name="a\\"b\\\\c"} 1' in registry.render().decode()
+    with pytest.raises(ValueError):
+        counter.labels("x", "y")
+
+
+def test_same_metric_is_shared():
+    registry = Registry()
+    assert registry.counter("c", "C") is registry.counter("c", "again")
+    with pytest.raises(ValueError):
+        registry.histogram("c", "C")
+
+
+def test_timer_observes_elapsed_time():
+    registry = Registry()
+    histogram = registry.histogram("t", "T")
+    with histogram.time():
+        pass
+    assert "t_count 1" in registry.render().decode()
+
+
+def test_middleware_labels_by_route_template():
+    demo = FastAPI()
+    demo.add_middleware(MetricsMiddleware)
+
+    @demo.post("/items/{item_id}")
+    async def item(item_id: str):
+        return {"id": item_id}
+
+    client = TestClient(demo)
+    client.post("/items/1", content=b"x" * 100)
+    client.post("/items/2")
+    client.get("/missing")
+    text = TestClient(app.app).get("/metrics").text
+    assert 'http_request_duration_seconds_count{method="POST",route="/items/{item_id}",status="200"} 2' in text
+    assert 'route="<unmatched>"' in text
+    app_client = TestClient(app.app)
+    app_client.get(app.STATIC.url("composer.css"))
+    text = app_client.get("/metrics").text
+    assert 'http_request_duration_seconds_count{method="GET",route="/static",status="200"}' in text
+    assert 'http_request_size_bytes_bucket{method="POST",route="/items/{item_id}",le="%d"} 2' % SIZE_BUCKETS[1] in text
@@ -0,0 +1,226 @@
+from fastapi.testclient import TestClient
+import pytest
+
+from graph_store import BOX_HEIGHT
+import old_app
+
+UPPERCASE = {
+    "id": "up", "name": "uppercase", "description": "", "x": 0, "y": 0,
+    "inputs": [{"name": "text", "type": "str"}], "outputs": [{"name": "upper_text", "type": "str"}],
+}
+
+
+@pytest.fixture(scope="module")
+def app_client():
+    with TestClient(old_app.app) as client:
+        yield client
+
+
+@pytest.fixture
+def client(app_client):
+    app_client.delete("/clear")
+    app_client.delete("/cache")
+    return app_client
+
+
+def _box(client, function, x=100, y=100):
+    response = client.post("/boxes", json={"function": function, "x": x, "y": y})
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def _connect(client, source, output, target, input_):
+    return client.post("/connections", json={
+        "source_box": source, "source_output": output, "target_box": target, "target_input": input_})
+
+
+def test_functions_lists_the_catalog(client):
+    names = [function["name"] for function in client.get("/functions").json()]
+    assert "add_numbers" in names and "format_message" in names
+
+
+def test_build_and_execute_a_graph(client):
+    add = _box(client, "add_numbers")
+    text = _box(client, "to_string")
+    assert _connect(client, add, "result", text, "value").status_code == 200
+    assert _connect(client, add, "result", text, "nope").status_code == 404
+    length = _box(client, "get_length")
+    assert _connect(client, add, "result", length, "text").status_code == 400
+
+    body = {"inputs": {add: {"a": 2, "b": 3}, length: {"text": "abc"}}}
+    response = client.post("/execute", json=body)
+    assert response.status_code == 200, response.text
+    assert response.json()["results"][text] == {"text": "5"}
+    assert response.json()["results"][length] == {"length": 3}
+    assert response.json()["cached"] == []
+    assert set(client.post("/execute", json=body).json()["cached"]) == {add, text, length}
+    assert client.get("/cache").json()["hits"] == 3
+
+
+def test_execute_reports_missing_inputs(client):
+    _box(client, "add_numbers")
+    response = client.post("/execute", json={"inputs": {}})
+    assert response.status_code == 400
+    assert "not connected or given" in response.json()["detail"]
+
+
+def test_execute_ints_beyond_64_bits(client):
+    multiply = _box(client, "multiply_numbers")
+    body = {"inputs": {multiply: {"a": 10 ** 10, "b": 10 ** 10}}}
+    response = client.post("/execute", json=body)
+    assert response.status_code == 200, response.text
+    assert response.json()["results"][multiply] == {"result": 10 ** 20}
+    job_id = client.post("/jobs", json=body).json()["id"]
+    assert str(10 ** 20) in client.get(f"/jobs/{job_id}/events").text
+    assert client.get(f"/jobs/{job_id}").json()["results"][multiply] == {"result": 10 ** 20}
+
+
+def test_unknown_box_function(client):
+    assert client.post("/boxes", json={"function": "nope"}).status_code == 404
+
+
+def test_register_function_requires_token(client, monkeypatch):
+    definition = {
+        "name": "double", "code": "def double(x):\n    return x * 2\n",
+        "inputs": [{"name": "x", "type": "int"}], "outputs": [{"name": "y", "type": "int"}],
+    }
+    monkeypatch.setattr(old_app, "FUNCTIONS_TOKEN", None)
+    assert client.post("/functions", json=definition).status_code == 404
+    monkeypatch.setattr(old_app, "FUNCTIONS_TOKEN", "secret")
+    assert client.post("/functions", json=definition).status_code == 401
+    assert client.post("/functions", json=definition,
+                       headers={"Authorization": "Bearer wrong"}).status_code == 401
+    response = client.post("/functions", json=definition, headers={"Authorization": "Bearer secret"})
+    assert response.status_code == 200, response.text
+
+    box = _box(client, "double")
+    response = client.post("/execute", json={"inputs": {box: {"x": 21}}})
+    assert response.status_code == 200, response.text
+    assert response.json()["results"][box] == {"y": 42}
+
+
+def test_execute_batch(client):
+    add = _box(client, "add_numbers")
+    response = client.post("/execute/batch", json={"inputs": {add: {"a": [1, 2, 3], "b": 1}}})
+    assert response.status_code == 200, response.text
+    assert response.json()["results"][add]["result"] == [2, 3, 4]
+    response = client.post("/execute/batch", json={"inputs": {add: {"a": [1, 2], "b": [1]}}})
+    assert response.status_code == 400
+    response = client.post("/execute/batch", json={"inputs": {add: {"a": [], "b": 1}}})
+    assert response.json()["results"][add]["result"] == []
+    response = client.post("/execute/batch", json={"inputs": {add: {"a": [2 ** 63 - 1, 1], "b": 1}}})
+    assert response.json()["results"][add]["result"] == [2 ** 63, 2]
+
+
+def test_execute_batch_rejects_scalar_for_list_port(client):
+    client.post("/import?layout=false", json={"boxes": [{
+        "id": "f", "name": "filter_positive", "description": "",
+        "inputs": [{"name": "numbers", "type": "list"}], "outputs": [{"name": "positive", "type": "list"}],
+    }], "connections": []})
+    response = client.post("/execute/batch", json={"inputs": {"f": {"numbers": 5}}, "rows": 2})
+    assert response.status_code == 400
+    assert "must be a column of list" in response.json()["detail"]
+
+
+def test_execute_stream(client):
+    client.post("/import?layout=false", json={"boxes": [UPPERCASE], "connections": []})
+    response = client.post("/execute/stream?box=up&input=text", content=b"hello")
+    assert response.status_code == 200
+    lines = [line for line in response.text.splitlines() if line]
+    assert "".join(old_app.loads(line)["value"] for line in lines) == "HELLO"
+
+
+def _stream_values(client, query, chunks):
+    response = client.post(f"/execute/stream?{query}", content=iter(chunks))
+    assert response.status_code == 200
+    return [old_app.loads(line)["value"] for line in response.text.splitlines() if line]
+
+
+def test_execute_stream_str_input_is_one_value_per_line(client):
+    length = _box(client, "get_length")
+    # Chunk boundaries are not value boundaries
+    assert _stream_values(client, f"box={length}&input=text", [b"hello ", b"wor", b"ld"]) == [11]
+    assert _stream_values(client, f"box={length}&input=text", [b"ab\r\nc", b"de\n\nf"]) == [2, 3, 1]
+
+
+def test_execute_stream_chunked_text(client):
+    client.post("/import?layout=false", json={"boxes": [{
+        "id": "s", "name": "split_string", "description": "",
+        "inputs": [{"name": "text", "type": "str"}, {"name": "delimiter", "type": "str"}],
+        "outputs": [{"name": "parts", "type": "list"}],
+    }], "connections": []})
+    query = 'box=s&input=text&inputs={"s": {"delimiter": ","}}'
+    assert _stream_values(client, query, [b"a,b", b"c,", b"d"]) == ["a", "bc", "d"]
+
+
+def test_jobs(client):
+    add = _box(client, "add_numbers")
+    response = client.post("/jobs", json={"inputs": {add: {"a": 1, "b": 2}}, "priority": 3})
+    assert response.status_code == 202
+    job_id = response.json()["id"]
+    events = client.get(f"/jobs/{job_id}/events").text
+    assert "event: done" in events
+    assert client.get(f"/jobs/{job_id}").json()["results"][add] == {"result": 3}
+    resumed = client.get(f"/jobs/{job_id}/events", headers={"Last-Event-ID": "2"}).text
+    assert resumed.startswith("id: 3\nevent: done")
+    assert client.get("/jobs/nope").status_code == 404
+    assert client.delete(f"/jobs/{job_id}").json()["status"] == "done"
+
+
+def test_viewport(client):
+    inside = dict(UPPERCASE, x=100, y=100)
+    outside = dict(UPPERCASE, id="far", x=5000, y=5000)
+    connection = {"id": "c1", "source_box": "up", "source_output": "upper_text", "target_box": "far",
+                  "target_input": "text"}
+    client.post("/import?layout=false", json={"boxes": [inside, outside], "connections": [connection]})
+    response = client.get("/viewport?left=0&top=0&right=800&bottom=600")
+    assert response.status_code == 200
+    assert [box["id"] for box in response.json()["boxes"]] == ["up"]
+    assert [conn["id"] for conn in response.json()["connections"]] == ["c1"]
+
+
+@pytest.mark.parametrize("query", [
+    "left=-inf&top=0&right=10&bottom=10",
+    "left=0&top=nan&right=10&bottom=10",
+    "left=0&top=0&right=inf&bottom=10",
+    "left=10&top=0&right=10&bottom=10",
+])
+def test_viewport_rejects_bad_bounds(client, query):
+    assert client.get(f"/viewport?{query}").status_code == 400
+
+
+def test_import_and_export(client):
+    lower = dict(UPPERCASE, id="up2")
+    graph = {
+        "boxes": [UPPERCASE, lower],
+        "connections": [{"id": "c1", "source_box": "up", "source_output": "upper_text",
+                         "target_box": "up2", "target_input": "text"}],
+    }
+    response = client.post("/import?layout=false", json=graph)
+    assert response.json() == {"status": "imported", "boxes": 2, "connections": 1}
+    exported = client.get("/export").json()
+    assert sorted(box["id"] for box in exported["boxes"]) == ["up", "up2"]
+    assert exported["connections"][0]["id"] == "c1"
+    # Importing the same ids again without replace conflicts
+    response = client.post("/import", json=graph)
+    assert response.status_code == 400
+    assert "Duplicate box id up" in response.json()["detail"]
+
+
+def test_import_lays_out_and_appends_below(client):
+    client.post("/import", json={"boxes": [UPPERCASE], "connections": []})
+    second = dict(UPPERCASE, id="up2", x=999, y=999)
+    client.post("/import", json={"boxes": [second], "connections": []})
+    boxes = {box["id"]: box for box in client.get("/boxes").json()}
+    assert (boxes["up"]["x"], boxes["up"]["y"]) == (100, 100)
+    assert boxes["up2"]["x"] == 100
+    assert boxes["up2"]["y"] >= boxes["up"]["y"] + BOX_HEIGHT
+    client.post("/import?replace=true", json={"boxes": [second], "connections": []})
+    assert [box["id"] for box in client.get("/boxes").json()] == ["up2"]
+
+
+def test_metrics(client):
+    client.get("/functions")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert 'route="/functions"' in response.text
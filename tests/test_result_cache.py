@@ -0,0 +1,88 @@
+import asyncio
+import os
+
+from result_cache import ResultCache, result_key
+
+
+def test_result_key_depends_on_function_and_args():
+    key = result_key("builtin:add", [1, 2])
+    assert key == result_key("builtin:add", (1, 2))
+    assert key != result_key("builtin:add", [2, 1])
+    assert key != result_key("builtin:mul", [1, 2])
+    # Beyond what orjson encodes
+    assert result_key("builtin:add", [2 ** 64, 1]) is None
+
+
+def test_memory_lru_is_bounded_by_bytes():
+    cache = ResultCache(max_bytes=30)
+    cache.put("a", {"v": "x" * 5})
+    cache.put("b", {"v": "y" * 5})
+    assert cache.get("a") == {"v": "xxxxx"}
+    # "b" is now the least recently used and makes room
+    cache.put("c", {"v": "z" * 5})
+    assert cache.get("b") is None
+    assert cache.get("c") == {"v": "zzzzz"}
+    # Larger than the whole budget: not kept at all
+    cache.put("huge", {"v": "h" * 100})
+    assert cache.get("huge") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (2, 2, 2)
+    assert stats["bytes"] <= 30
+
+
+def test_disk_tier_survives_restarts(tmp_path):
+    directory = str(tmp_path / "results")
+    ResultCache(directory=directory).put("ab12", {"result": [1, 2]})
+    reopened = ResultCache(directory=directory)
+    assert reopened.stats()["disk_bytes"] == len(b'{"result":[1,2]}')
+    assert reopened.get("ab12") == {"result": [1, 2]}
+    # Read back into memory
+    assert reopened.stats()["entries"] == 1
+    assert not [name for _, _, names in os.walk(directory) for name in names if name.endswith(".tmp")]
+
+
+def test_disk_tier_prunes_least_recently_used(tmp_path):
+    directory = str(tmp_path / "results")
+    cache = ResultCache(max_bytes=0, directory=directory, max_disk_bytes=50)
+    for i, key in enumerate(["aa1", "bb2", "cc3"]):
+        cache.put(key, {"v": "x" * 10})
+        path = cache._path(key)
+        os.utime(path, (i, i))
+    cache.put("dd4", {"v": "x" * 10})
+    assert cache.get("aa1") is None
+    assert cache.get("dd4") == {"v": "x" * 10}
+    assert cache.stats()["disk_bytes"] <= 45
+
+
+def test_clear(tmp_path):
+    cache = ResultCache(directory=str(tmp_path))
+    cache.put("ab", {"v": 1})
+    cache.get("ab")
+    cache.clear()
+    assert cache.stats() == {"entries": 0, "bytes": 0, "disk_bytes": 0, "hits": 0, "misses": 0}
+    assert cache.get("ab") is None
+
+
+def test_values_that_cannot_be_encoded_are_not_kept():
+    cache = ResultCache()
+    cache.put("big", {"result": 2 ** 64})
+    assert cache.get("big") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_async_access_to_the_disk_tier(tmp_path):
+    directory = str(tmp_path / "results")
+    asyncio.run(ResultCache(directory=directory).put_async("ab12", {"result": 3}))
+    reopened = ResultCache(directory=directory)
+    assert asyncio.run(reopened.get_async("ab12")) == {"result": 3}
+    assert asyncio.run(reopened.get_async("cd34")) is None
+    assert (reopened.stats()["hits"], reopened.stats()["misses"]) == (1, 1)
+
+
+def test_disk_errors_skip_the_disk_tier(tmp_path):
+    cache = ResultCache(directory=str(tmp_path))
+    # The shard directory cannot be created
+    (tmp_path / "ab").write_bytes(b"")
+    cache.put("ab12", {"result": 3})
+    assert cache.get("ab12") == {"result": 3}
+    assert cache.stats()["disk_bytes"] == 0
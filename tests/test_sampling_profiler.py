@@ -0,0 +1,75 @@
+import threading
+import time
+
+from fastapi.testclient import TestClient
+import pytest
+
+import app
+import sampling_profiler
+from sampling_profiler import ProfilerBusyError, collapsed, sample_stacks
+
+
+def _spin_until(event):
+    while not event.is_set():
+        sum(range(1000))
+
+
+@pytest.fixture
+def busy_thread():
+    stop = threading.Event()
+    thread = threading.Thread(target=_spin_until, args=(stop,), name="spinner")
+    thread.start()
+    yield thread
+    stop.set()
+    thread.join()
+
+
+def test_samples_other_threads(busy_thread):
+    counts = sample_stacks(0.2, interval=0.005)
+    spinner = {stack: count for stack, count in counts.items() if stack.startswith("spinner;")}
+    assert spinner
+    assert any("_spin_until (test_sampling_profiler.py:" in stack for stack in spinner)
+    # The sampling thread itself is never included
+    assert not any("sample_stacks" in stack.rsplit(";", 1)[-1] for stack in counts)
+
+
+def test_idle_threads_are_dropped_unless_asked_for():
+    stop = threading.Event()
+    waiter = threading.Thread(target=stop.wait, name="waiter")
+    waiter.start()
+    try:
+        assert not any(stack.startswith("waiter;") for stack in sample_stacks(0.05, 0.005))
+        assert any(stack.startswith("waiter;") for stack in sample_stacks(0.05, 0.005, include_idle=True))
+    finally:
+        stop.set()
+        waiter.join()
+
+
+def test_collapsed_heaviest_first():
+    assert collapsed({"t;a": 1, "t;a;b": 5}) == "t;a;b 5\nt;a 1\n"
+
+
+def test_one_profile_at_a_time():
+    sampling_profiler._running.acquire()
+    try:
+        with pytest.raises(ProfilerBusyError):
+            sample_stacks(0.01)
+    finally:
+        sampling_profiler._running.release()
+
+
+def test_profile_endpoint(monkeypatch):
+    client = TestClient(app.app)
+    monkeypatch.setattr(sampling_profiler, "PROFILER_TOKEN", None)
+    assert client.get("/debug/profile").status_code == 404
+    monkeypatch.setattr(sampling_profiler, "PROFILER_TOKEN", "secret")
+    assert client.get("/debug/profile").status_code == 401
+    headers = {"Authorization": "Bearer secret"}
+    assert client.get("/debug/profile?seconds=0", headers=headers).status_code == 400
+    assert client.get("/debug/profile?seconds=1&interval=5", headers=headers).status_code == 400
+    started = time.monotonic()
+    response = client.get("/debug/profile?seconds=0.1&interval=0.01&idle=true", headers=headers)
+    assert response.status_code == 200
+    assert time.monotonic() - started >= 0.1
+    assert response.headers["content-disposition"] == 'attachment; filename="profile.folded"'
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in response.text.splitlines())
@@ -0,0 +1,52 @@
+import re
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import pytest
+
+import app
+from static_assets import IMMUTABLE_CACHE_CONTROL, REVALIDATE_CACHE_CONTROL, HashedStaticFiles
+
+
+@pytest.fixture
+def assets(tmp_path):
+    (tmp_path / "css").mkdir()
+    (tmp_path / "css" / "site.css").write_text("body { color: red }")
+    return HashedStaticFiles(str(tmp_path))
+
+
+def _client(assets):
+    demo = FastAPI()
+    demo.mount("/static", assets, name="static")
+    return TestClient(demo)
+
+
+def test_url_is_fingerprinted(assets, tmp_path):
+    url = assets.url("css/site.css")
+    assert re.fullmatch(r"/static/css/site\.[0-9a-f]{12}\.css", url)
+    # Editing the file gives it a new name
+    (tmp_path / "css" / "site.css").write_text("body { color: blue }")
+    assert HashedStaticFiles(str(tmp_path)).url("css/site.css") != url
+
+
+def test_hashed_name_is_immutable(assets):
+    response = _client(assets).get(assets.url("css/site.css"))
+    assert response.status_code == 200
+    assert response.text == "body { color: red }"
+    assert response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+
+
+def test_plain_name_is_revalidated(assets):
+    client = _client(assets)
+    response = client.get("/static/css/site.css")
+    assert response.headers["cache-control"] == REVALIDATE_CACHE_CONTROL
+    assert client.get("/static/css/missing.css").status_code == 404
+
+
+def test_page_links_hashed_assets():
+    client = TestClient(app.app)
+    page = client.get("/").text
+    for name in ("composer.css", "composer.js"):
+        url = app.STATIC.url(name)
+        assert url in page
+        assert client.get(url).headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
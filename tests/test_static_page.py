@@ -0,0 +1,72 @@
+import gzip
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+import pytest
+
+import app
+import old_app
+import static_page
+from static_page import PrecompressedPage, _accepted_encodings
+
+HTML = "<html>" + "stock " * 500 + "</html>"
+
+
+@pytest.fixture
+def client():
+    page = PrecompressedPage(HTML)
+    demo = FastAPI()
+
+    @demo.get("/")
+    async def index(request: Request):
+        return page.response(request)
+
+    return TestClient(demo)
+
+
+def test_accepted_encodings():
+    assert _accepted_encodings("gzip, br;q=0.5, deflate;q=x, ") == {"gzip": 1.0, "br": 0.5, "deflate": 0.0}
+
+
+def test_gzip_variant_and_headers(client):
+    response = client.get("/", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["cache-control"] == static_page.HTML_CACHE_CONTROL
+    assert response.headers["etag"].endswith('-gz"')
+    # The client decodes the body transparently
+    assert response.text == HTML
+
+
+def test_identity_when_compression_refused(client):
+    response = client.get("/", headers={"Accept-Encoding": "gzip;q=0, identity"})
+    assert "content-encoding" not in response.headers
+    assert response.text == HTML
+
+
+def test_brotli_only_when_installed(monkeypatch):
+    monkeypatch.setattr(static_page, "brotli", None)
+    page = PrecompressedPage(HTML)
+    assert set(page.variants) == {"identity", "gzip"}
+    assert page._choose("br, gzip;q=0.5") == "gzip"
+    assert page._choose("*") == "gzip"
+    assert gzip.decompress(page.variants["gzip"][0]).decode() == HTML
+
+
+def test_conditional_request_is_304(client):
+    etag = client.get("/", headers={"Accept-Encoding": "gzip"}).headers["etag"]
+    response = client.get("/", headers={"Accept-Encoding": "gzip", "If-None-Match": f'W/{etag}, "other"'})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+    assert client.get("/", headers={"If-None-Match": '"stale"'}).status_code == 200
+    assert client.get("/", headers={"If-None-Match": "*"}).status_code == 304
+
+
+def test_apps_serve_their_pages():
+    for module, page in ((app, app.INDEX_PAGE), (old_app, old_app.FRONTEND_PAGE)):
+        response = TestClient(module.app).get("/", headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        assert response.headers["etag"] == page.variants["gzip"][1]
+        assert "<html" in response.text
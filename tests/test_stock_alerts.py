@@ -0,0 +1,77 @@
+from stock_alerts import (
+    Subscription, SubscriptionBook, branch_stock, dispatch_alerts, handle_alert_command, parse_subscription,
+)
+from tests.stock_data import make_report
+
+
+def _report(*stock):
+    """Material A in DEL and BOM, then B in DEL, with the given stocks."""
+    rows = [("DEL", "0001", "A", "", "", stock[0], 0, 0.0),
+            ("BOM", "0001", "A", "", "", stock[1], 0, 0.0),
+            ("DEL", "0001", "B", "", "", stock[2], 0, 0.0)]
+    return make_report(rows)
+
+
+def test_parse_subscription():
+    assert parse_subscription("p", "alert me when mg09 drops below 5 in Delhi") == \
+        Subscription("p", "MG09", "below", 5, "Delhi")
+    assert parse_subscription("p", "Alert me if X1 goes above 20") == Subscription("p", "X1", "above", 20, None)
+    assert parse_subscription("p", "alert me when X1 is restocked") == Subscription("p", "X1", "restock", 0, None)
+    assert parse_subscription("p", "alert me when X1 is back in stock at BOM").branch == "BOM"
+    assert parse_subscription("p", "what is the stock of X1") is None
+
+
+def test_triggers_only_on_crossing():
+    below = Subscription("p", "A", "below", 5)
+    assert below.triggered(5, 4)
+    assert not below.triggered(4, 3)
+    above = Subscription("p", "A", "above", 5)
+    assert above.triggered(5, 6) and not above.triggered(6, 7)
+    restock = Subscription("p", "A", "restock")
+    assert restock.triggered(0, 1) and not restock.triggered(1, 2)
+
+
+def test_branch_stock():
+    report = _report(3, 4, 10)
+    assert branch_stock(report, "A") == 7
+    assert branch_stock(report, "A", "bom") == 4
+    assert branch_stock(report, "missing") == 0
+
+
+def test_evaluate_only_changed_subscribed_materials():
+    book = SubscriptionBook()
+    book.add(Subscription("1", "A", "below", 5))
+    book.add(Subscription("2", "A", "below", 5, "DEL"))
+    book.add(Subscription("3", "B", "restock"))
+    old, new = _report(3, 4, 0), _report(1, 2, 0)
+    alerts = book.evaluate(old, new)
+    # The all-branch total went 7 -> 3; Delhi alone stayed below 5
+    assert [(a.subscription.phone, a.old_stock, a.new_stock) for a in alerts] == [("1", 7, 3)]
+    assert book.evaluate(new, new) == []
+
+
+def test_first_report_fires_restocks_only():
+    book = SubscriptionBook()
+    book.add(Subscription("1", "B", "restock"))
+    book.add(Subscription("2", "B", "below", 100))
+    alerts = book.evaluate(None, _report(0, 0, 5))
+    assert [a.subscription.phone for a in alerts] == ["1"]
+
+
+def test_commands_and_dispatch():
+    book = SubscriptionBook()
+    assert handle_alert_command(book, "1", "alert me when A drops below 5") == \
+        "OK, I'll message you when A goes below 5."
+    handle_alert_command(book, "1", "alert me when B is restocked")
+    handle_alert_command(book, "2", "alert me when B is restocked")
+    assert len(book) == 3
+    assert handle_alert_command(book, "1", "stop alerts for b") == "Stopped 1 alert(s)."
+    assert [s.material_code for s in book.for_phone("1")] == ["A"]
+    assert handle_alert_command(book, "1", "hello") is None
+
+    sent = []
+    alerts = book.evaluate(_report(9, 0, 0), _report(1, 0, 3))
+    assert dispatch_alerts(alerts, sent.append) == 2
+    assert sorted(sent[0]) == [("1", "Stock alert:\nA: stock 9 -> 1"), ("2", "Stock alert:\nB: stock 0 -> 3")]
+    assert dispatch_alerts([], sent.append) == 0
+    assert len(sent) == 1
@@ -0,0 +1,87 @@
+import numpy as np
+
+from stock_diff import STATUSES, diff_reports, restocked, summarize
+from tests.stock_data import make_report
+
+
+def _row(code, stock, blocked=0, branch="DEL", location="0001"):
+    return (branch, location, code, "", "", stock, blocked, 0.0)
+
+
+def _keys(deltas):
+    return [(d.material_code, d.branch, d.storage_location, d.status) for d in deltas]
+
+
+def test_added_removed_changed():
+    old = make_report([_row("A", 5), _row("B", 1), _row("C", 2), _row("E", 0, blocked=1)])
+    new = make_report([_row("A", 5), _row("B", 3), _row("D", 2), _row("E", 0, blocked=4)])
+    deltas = diff_reports(old, new)
+    assert _keys(deltas) == [
+        ("B", "DEL", "0001", "changed"),
+        ("C", "DEL", "0001", "removed"),
+        ("D", "DEL", "0001", "added"),
+        ("E", "DEL", "0001", "changed"),
+    ]
+    b, c, d, e = deltas
+    assert (b.old_stock, b.new_stock, b.stock_change) == (1, 3, 2)
+    assert (c.old_stock, c.new_stock) == (2, 0)
+    assert (d.old_stock, d.new_stock) == (0, 2)
+    assert e.blocked_change == 3
+    assert summarize(deltas) == {"added": 1, "removed": 1, "changed": 2, "unchanged": 0}
+
+
+def test_include_unchanged():
+    old = make_report([_row("A", 5), _row("B", 1)])
+    new = make_report([_row("A", 5), _row("B", 2)])
+    deltas = diff_reports(old, new, include_unchanged=True)
+    assert _keys(deltas) == [("A", "DEL", "0001", "unchanged"), ("B", "DEL", "0001", "changed")]
+    assert summarize(deltas) == {"added": 0, "removed": 0, "changed": 1, "unchanged": 1}
+
+
+def test_key_is_material_branch_and_location():
+    old = make_report([_row("A", 1, branch="DEL"), _row("A", 1, location="0002")])
+    new = make_report([_row("A", 1, branch="BOM"), _row("A", 1, location="0002")])
+    assert _keys(diff_reports(old, new)) == [
+        ("A", "BOM", "0001", "added"),
+        ("A", "DEL", "0001", "removed"),
+    ]
+
+
+def test_rows_sharing_a_key_are_summed():
+    # One row per valuation type
+    old = make_report([_row("A", 2), _row("A", 3)])
+    new = make_report([_row("A", 5)])
+    assert len(diff_reports(old, new)) == 0
+    [delta] = diff_reports(old, make_report([_row("A", 4), _row("A", 4)]))
+    assert (delta.old_stock, delta.new_stock) == (5, 8)
+
+
+def test_reports_with_different_string_tables():
+    # Strings are interned in a different order in each report
+    old = make_report([_row("Z", 1, branch="X"), _row("A", 1)])
+    new = make_report([_row("A", 2), _row("Q", 1, branch="Y")])
+    assert _keys(diff_reports(old, new)) == [
+        ("A", "DEL", "0001", "changed"),
+        ("Q", "Y", "0001", "added"),
+        ("Z", "X", "0001", "removed"),
+    ]
+
+
+def test_restocked():
+    old = make_report([_row("A", 0), _row("B", 2), _row("C", -1)])
+    new = make_report([_row("A", 4), _row("B", 5), _row("C", 1)])
+    assert [d.material_code for d in restocked(diff_reports(old, new))] == ["A", "C"]
+
+
+def test_diff_is_lazy_and_sorted_by_key():
+    old = make_report([_row("C", 1), _row("A", 1), _row("B", 1, branch="BOM")])
+    new = make_report([_row("B", 2, branch="BOM"), _row("A", 3), _row("D", 1)])
+    diff = diff_reports(old, new)
+    assert len(diff) == 4
+    assert np.all(np.diff(diff.keys) > 0)
+    assert [STATUSES[status] for status in diff.status] == ["changed", "changed", "removed", "added"]
+    assert diff[1] == ("B", "BOM", "0001", 1, 2, 0, 0, "changed")
+    assert diff[-1].status == "added"
+    assert [d.material_code for d in diff[1:3]] == ["B", "C"]
+    assert diff.material_codes() == {"A", "B", "C", "D"}
+    assert diff_reports(make_report([]), make_report([])).material_codes() == set()
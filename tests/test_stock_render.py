@@ -0,0 +1,50 @@
+from array import array
+
+from stock_render import column_widths, render_page, render_rows
+from tests.stock_data import make_report
+
+
+def _report(count, code="P"):
+    return make_report([("DELHI-NORTH-WAREHOUSE", "0001", f"{code}-{i}", "", f"Brake pad number {i}", i * 10, 0, 0.0)
+                        for i in range(count)])
+
+
+def test_column_widths_are_capped():
+    report = make_report([
+        ("DEL", "0001", "X" * 30, "", "", 12345, 0, 0.0),
+        ("DELHI-NORTH-WAREHOUSE", "", "A", "", "", 1, 0, 0.0),
+    ])
+    assert column_widths(report) == {"MaterialCode": 20, "Branch": 10, "TodayStock": 5}
+    assert column_widths(report) is column_widths(report)
+
+
+def test_render_rows_aligns_and_truncates():
+    report = _report(12)
+    block = render_rows(report, array("i", [9, 10]), start=9)
+    assert block.startswith("```\n") and block.endswith("\n```")
+    lines = block.splitlines()[1:-1]
+    assert lines == [
+        "10 P-9   90",
+        "   DELHI-NOR… Brake pad number 9",
+        "11 P-10 100",
+        "   DELHI-NOR… Brake pad number …",
+    ]
+    assert all(len(line) <= 32 for line in lines)
+
+
+def test_codes_are_never_truncated():
+    code = "VERY-LONG-MATERIAL-CODE-123"
+    block = render_rows(make_report([("DEL", "", code, "", "", 1, 0, 0.0)]), [0])
+    assert code in block
+
+
+def test_render_page():
+    report = _report(15)
+    rows = report.search("brake")
+    first = render_page(report, "brake", rows)
+    assert first.startswith("*brake* — 15 result(s), showing 1-10")
+    assert first.endswith("Reply MORE for next 5")
+    second = render_page(report, "brake", rows, offset=10)
+    assert second.startswith("*brake* — 15 result(s), showing 11-15")
+    assert "Reply MORE" not in second
+    assert render_page(report, "clutch", array("i")) == "No stock found for 'clutch'."
@@ -0,0 +1,114 @@
+import zipfile
+
+import stock_report
+from stock_report import load_stock_report
+from tests.stock_data import HEADERS, make_report, write_workbook
+
+ROWS = [
+    ("DEL", "0001", "P-100", "V1", "Brake pad front", 12, 0, 99.5),
+    ("BOM", "0002", 4711, None, "Clutch plate", "1,234", 2, 10),
+    (None, None, None, None, None, None, None, None),
+    ("DEL", "0001", "P-200", "V2", "Brake disc", 3.6, None, None),
+]
+
+
+def test_load_columns(tmp_path):
+    report = load_stock_report(write_workbook(str(tmp_path / "stock.xlsx"), ROWS))
+    assert report.headers == HEADERS
+    # The empty row is skipped
+    assert len(report) == 3
+    assert report.column("Branch") == ["DEL", "BOM", "DEL"]
+    # Numeric material codes come back as the text shown in Excel
+    assert report.column("MaterialCode") == ["P-100", "4711", "P-200"]
+    assert report.column("VenderPartNo.") == ["V1", "", "V2"]
+    assert report.column("TodayStock") == [12, 1234, 4]
+    assert report.column("BlockedStk") == [0, 2, 0]
+    assert report.column("ARP") == [99.5, 10.0, 0.0]
+    assert report.columns["Branch"].typecode == "i"
+    assert report.columns["TodayStock"].typecode == "q"
+
+
+def test_strings_are_interned(tmp_path):
+    report = load_stock_report(write_workbook(str(tmp_path / "stock.xlsx"), ROWS))
+    branches = report.columns["Branch"]
+    assert branches[0] == branches[2]
+    assert report.strings[0] == ""
+    assert report.strings.count("DEL") == 1
+    assert report.string_id("DEL") == branches[0]
+    assert report.string_id("nowhere") is None
+
+
+def test_rows(tmp_path):
+    report = load_stock_report(write_workbook(str(tmp_path / "stock.xlsx"), ROWS))
+    assert report.row(1)["MaterialDiscription"] == "Clutch plate"
+    assert [row["MaterialCode"] for row in report.iter_rows()] == ["P-100", "4711", "P-200"]
+    assert report.value("TodayStock", 2) == 4
+
+
+def test_progress(tmp_path, monkeypatch):
+    monkeypatch.setattr(stock_report, "PROGRESS_EVERY", 2)
+    rows = [("DEL", "0001", f"P-{i}", "", "", i, 0, 0) for i in range(5)]
+    calls = []
+    load_stock_report(write_workbook(str(tmp_path / "stock.xlsx"), rows), lambda *args: calls.append(args))
+    assert [count for count, _ in calls] == [2, 4, 5]
+    assert calls[-1][1] == 1.0
+    assert all(0 <= fraction <= 1 for _, fraction in calls)
+
+
+def test_inline_strings_and_sparse_cells(tmp_path):
+    # Written by other tools: inline strings, a namespace prefix and skipped cells
+    sheet = (
+        '<x:worksheet xmlns:x="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><x:sheetData>'
+        '<x:row r="1"><x:c r="A1" t="inlineStr"><x:is><x:t>MaterialCode</x:t></x:is></x:c>'
+        '<x:c r="C1" t="inlineStr"><x:is><x:t>TodayStock</x:t></x:is></x:c></x:row>'
+        '<x:row r="2"><x:c r="A2" t="inlineStr"><x:is><x:t> P-1 </x:t></x:is></x:c>'
+        '<x:c r="C2"><x:v>7</x:v></x:c></x:row>'
+        '</x:sheetData></x:worksheet>'
+    )
+    path = str(tmp_path / "inline.xlsx")
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr(stock_report.SHEET_PATH, sheet)
+    report = load_stock_report(path)
+    assert report.headers == ["MaterialCode", "", "TodayStock"]
+    assert report.row(0) == {"MaterialCode": "P-1", "TodayStock": 7}
+
+
+def test_make_report_matches_loaded(tmp_path):
+    rows = [("DEL", "0001", "P-100", "V1", "Brake pad", 12, 0, 1.5)]
+    loaded = load_stock_report(write_workbook(str(tmp_path / "stock.xlsx"), rows))
+    assert list(make_report(rows).iter_rows()) == list(loaded.iter_rows())
+
+
+def test_search():
+    report = make_report([
+        ("DEL", "0001", "P-100", "V1", "Brake pad front", 1, 0, 0.0),
+        ("DEL", "0001", "P-200", "XB-9", "Brake disc", 1, 0, 0.0),
+        ("BOM", "0001", "Q-300", "V3", "Clutch plate", 1, 0, 0.0),
+    ])
+    assert list(report.search("brake")) == [0, 1]
+    # Every word must match, in any search column
+    assert list(report.search("BRAKE xb")) == [1]
+    assert list(report.search("p-")) == [0, 1]
+    assert list(report.search("brake", rows=[1, 2])) == [1]
+    assert list(report.search("   ")) == []
+    # Branch is not a search column
+    assert list(report.search("bom")) == []
+
+
+def test_versions_differ():
+    assert make_report([]).version != make_report([]).version
+
+
+def test_loaded_versions_follow_content(tmp_path):
+    first = load_stock_report(write_workbook(str(tmp_path / "a.xlsx"), ROWS))
+    again = load_stock_report(write_workbook(str(tmp_path / "b.xlsx"), ROWS))
+    other = load_stock_report(write_workbook(str(tmp_path / "c.xlsx"), ROWS[:2]))
+    assert first.version == again.version != other.version
+
+
+def test_rows_where():
+    report = make_report([("DEL", "", "A", "", "", 1, 0, 0.0), ("BOM", "", "B", "", "", 1, 0, 0.0),
+                          ("Del", "", "C", "", "", 1, 0, 0.0)])
+    assert list(report.rows_where("Branch", "del")) == [0, 2]
+    assert list(report.rows_where("Branch", "DEL", [1, 2])) == [2]
+    assert list(report.rows_where("Branch", "xyz")) == []
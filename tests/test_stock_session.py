@@ -0,0 +1,75 @@
+import time
+from array import array
+
+from stock_session import Session, SessionStore, SQLiteSessionStore, handle_query
+from tests.stock_data import make_report
+
+
+def _report(count=15):
+    branches = ["DEL", "BOM", "DEL"]
+    return make_report([(branches[i % 3], "0001", f"P-{i}", "", f"Brake pad {'sata' if i % 2 else 'cera'}",
+                         i, 0, 0.0) for i in range(count)])
+
+
+def test_search_more_and_reset():
+    store, report = SessionStore(), _report()
+    assert handle_query(store, report, "1", "brake").startswith("*brake* — 15 result(s), showing 1-10")
+    assert handle_query(store, report, "1", "next page").startswith("*brake* — 15 result(s), showing 11-15")
+    assert handle_query(store, report, "1", "more") == "No more results."
+    assert handle_query(store, report, "1", "reset").startswith("Cleared.")
+    assert handle_query(store, report, "1", "more") == "Nothing to continue — send a search first."
+
+
+def test_refine_by_branch_then_words():
+    store, report = SessionStore(), _report()
+    handle_query(store, report, "1", "brake")
+    reply = handle_query(store, report, "1", "only del")
+    assert reply.startswith("*brake / del* — 10 result(s)")
+    assert list(store.get("1").rows) == [i for i in range(15) if i % 3 != 1]
+    # Not a branch: narrows by the words instead
+    handle_query(store, report, "1", "only sata")
+    assert all(i % 2 for i in store.get("1").rows)
+    # Without a session the term is a plain search
+    assert handle_query(store, report, "2", "only sata").startswith("*sata* — 7 result(s)")
+
+
+def test_newer_report_drops_session():
+    store = SessionStore()
+    handle_query(store, _report(), "1", "brake")
+    assert handle_query(store, _report(), "1", "more") == "Nothing to continue — send a search first."
+    assert store.get("1") is None
+
+
+def test_ttl_and_size_eviction(monkeypatch):
+    store = SessionStore(ttl=60, max_sessions=2)
+    for phone in "abc":
+        store.put(phone, Session(1, phone, array("i")))
+    assert len(store) == 2 and store.get("a") is None
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+    assert store.get("c") is None
+    assert len(store) == 0
+
+
+def test_sqlite_store_survives_reopen(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    # Versions of loaded reports use the full 64 bits
+    session = Session(2**63 + 5, "brake", array("i", [3, 1, 4]), offset=10)
+    SQLiteSessionStore(path).put("1", session)
+    store = SQLiteSessionStore(path)
+    loaded = store.get("1")
+    assert loaded[:4] == session[:4]
+    assert len(store) == 1
+    store.delete("1")
+    assert store.get("1") is None
+
+
+def test_sqlite_store_caps_sessions(tmp_path, monkeypatch):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.db"), max_sessions=2)
+    clock = iter(range(1000, 2000))
+    monkeypatch.setattr(time, "time", lambda: next(clock))
+    for phone in "abc":
+        store.put(phone, Session(1, phone, array("i")))
+    assert len(store) == 2
+    assert store.get("a") is None
+    assert store.get("c").title == "c"
@@ -0,0 +1,127 @@
+from collections import Counter
+import os
+import threading
+import time
+
+import pytest
+
+from folder_queue import Entry, FolderQueue
+from upload_worker import LocalUploadTarget, UploadPool, upload_folder
+
+
+def _write(path, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def _read(path) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_upload_folder_copies_every_file_in_chunks(tmp_path):
+    folder = tmp_path / "photos"
+    _write(str(folder / "a.bin"), bytes(range(256)) * 10)
+    _write(str(folder / "nested" / "b.txt"), b"hello")
+    _write(str(folder / "empty"), b"")
+    target = tmp_path / "remote"
+    sent = upload_folder(str(folder), LocalUploadTarget(str(target)), chunk_size=100)
+    assert sent == 2560 + 5
+    assert _read(target / "photos" / "a.bin") == bytes(range(256)) * 10
+    assert _read(target / "photos" / "nested" / "b.txt") == b"hello"
+    assert _read(target / "photos" / "empty") == b""
+
+
+def test_upload_folder_missing(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        upload_folder(str(tmp_path / "gone"), LocalUploadTarget(str(tmp_path / "remote")))
+
+
+def test_pool_uploads_queue_and_acks(tmp_path):
+    folders = []
+    for i in range(5):
+        folder = tmp_path / f"folder{i}"
+        _write(str(folder / "data"), b"x" * i)
+        folders.append(str(folder))
+    queue = FolderQueue(str(tmp_path / "shared_queue.txt"))
+    queue.put_many(folders + [str(tmp_path / "missing")])
+    target = tmp_path / "remote"
+    UploadPool(queue, LocalUploadTarget(str(target)), concurrency=2).run(stop_when_empty=True)
+    for i in range(5):
+        assert _read(target / f"folder{i}" / "data") == b"x" * i
+    # The missing folder is dropped rather than retried forever
+    assert queue.in_flight() == []
+    assert queue.claim() == []
+
+
+def test_failed_upload_is_requeued(tmp_path):
+    queue = FolderQueue(str(tmp_path / "shared_queue.txt"))
+    queue.put("flaky")
+    attempts = Counter()
+
+    class FlakyPool(UploadPool):
+        def _upload(self, entry):
+            attempts[entry.folder] += 1
+            if attempts[entry.folder] == 1:
+                raise OSError("connection reset")
+            return 0
+
+    FlakyPool(queue, target=None, concurrency=1).run(stop_when_empty=True)
+    assert attempts["flaky"] == 2
+    assert queue.in_flight() == []
+
+
+def test_file_missing_inside_an_existing_folder_is_retried(tmp_path):
+    folder = tmp_path / "photos"
+    folder.mkdir()
+    queue = FolderQueue(str(tmp_path / "shared_queue.txt"))
+    queue.put(str(folder))
+    attempts = Counter()
+
+    class VanishingFilePool(UploadPool):
+        def _upload(self, entry):
+            attempts[entry.folder] += 1
+            if attempts[entry.folder] == 1:
+                raise FileNotFoundError("photos/a.bin")
+            return 0
+
+    VanishingFilePool(queue, target=None, concurrency=1).run(stop_when_empty=True)
+    assert attempts[str(folder)] == 2
+    assert queue.in_flight() == []
+
+
+class _RecordingPool(UploadPool):
+    """Uploads nothing; the "slow" folder outlasts several lease periods."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.uploads = Counter()
+        self._lock = threading.Lock()
+
+    def _upload(self, entry):
+        with self._lock:
+            self.uploads[entry.folder] += 1
+        time.sleep(1.0 if entry.folder == "slow" else 0.01)
+        return 0
+
+
+def test_busy_pool_keeps_renewing_a_long_upload(tmp_path):
+    # Finished fast uploads wake the pool constantly; the slow upload's lease
+    # must still be renewed so it is never handed out again
+    queue = FolderQueue(str(tmp_path / "shared_queue.txt"), lease_seconds=0.3)
+    queue.put_many(["slow"] + [f"fast{i}" for i in range(60)])
+    pool = _RecordingPool(queue, target=None, concurrency=2)
+    pool.run(stop_when_empty=True)
+    assert pool.uploads["slow"] == 1
+    assert set(pool.uploads.values()) == {1}
+    assert queue.in_flight() == []
+
+
+def test_reclaimed_entry_is_not_run_twice():
+    # A lapsed lease can come back to the pool that is still running it
+    running = {"future": Entry(10, "slow", "me", 1.0)}
+    again = Entry(10, "slow", "me", 2.0)
+    assert UploadPool._adopt(running, again)
+    assert running == {"future": again}
+    assert not UploadPool._adopt(running, Entry(20, "other", "me", 2.0))
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""Upload queued folders with a pool of worker threads.
+
+Each free worker slot leases one entry from the folder queue, uploads the
+folder file by file in fixed-size chunks, and acks the entry on success
+(or nacks it so it is retried later).  Leases of running uploads are
+renewed periodically; if this process dies they expire and another worker
+redelivers them.  Throughput follows the number of
+workers instead of a fixed sleep between batches, and an idle pool sleeps
+on queue-file notifications rather than polling.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import os
+import threading
+import time
+
+from folder_queue import LEASE_SECONDS, Entry, FolderQueue
+
+CHUNK_SIZE = 4 * 1024 * 1024
+
+
+class LocalUploadTarget:
+    """Stand-in upload destination that writes chunks under a local directory."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def upload_chunk(self, remote_path: str, offset: int, data: bytes) -> None:
+        path = os.path.join(self.root, remote_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "r+b" if offset else "wb") as f:
+            f.seek(offset)
+            f.write(data)
+
+    def finish(self, remote_path: str) -> None:
+        path = os.path.join(self.root, remote_path)
+        if not os.path.exists(path):
+            # Empty source file: no chunk was ever written
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            open(path, "wb").close()
+
+
+def upload_folder(folder: str, target, chunk_size: int = CHUNK_SIZE) -> int:
+    """Upload every file under ``folder``; returns the number of bytes sent."""
+    if not os.path.isdir(folder):
+        raise FileNotFoundError(folder)
+    name = os.path.basename(os.path.normpath(folder))
+    sent = 0
+    for dirpath, _, filenames in os.walk(folder):
+        for filename in sorted(filenames):
+            source = os.path.join(dirpath, filename)
+            remote = os.path.join(name, os.path.relpath(source, folder))
+            with open(source, "rb") as f:
+                offset = 0
+                while True:
+                    data = f.read(chunk_size)
+                    if not data:
+                        break
+                    target.upload_chunk(remote, offset, data)
+                    offset += len(data)
+            target.finish(remote)
+            sent += offset
+    return sent
+
+
+class UploadPool:
+    def __init__(self, queue: FolderQueue, target, concurrency: int = 4, chunk_size: int = CHUNK_SIZE):
+        self.queue = queue
+        self.target = target
+        self.concurrency = concurrency
+        self.chunk_size = chunk_size
+        # Set by the main loop after each claim round, see _watch_queue
+        self._claimed = threading.Event()
+
+    def _upload(self, entry: Entry) -> int:
+        return upload_folder(entry.folder, self.target, self.chunk_size)
+
+    def _watch_queue(self, wakeup: threading.Event) -> None:
+        while True:
+            if self.queue.wait():
+                wakeup.set()
+                # Let the main loop claim before checking the queue again
+                self._claimed.wait()
+                self._claimed.clear()
+
+    def run(self, stop_when_empty: bool = False) -> None:
+        running = {}
+        wakeup = threading.Event()
+        threading.Thread(target=self._watch_queue, args=(wakeup,), daemon=True).start()
+        renew_every = self.queue.lease_seconds / 3
+        next_renew = time.monotonic() + renew_every
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            while True:
+                # Clearing first means any event after this point re-arms it
+                wakeup.clear()
+
+                for future in [f for f in running if f.done()]:
+                    self._finish(running.pop(future), future)
+
+                free = self.concurrency - len(running)
+                if free:
+                    for entry in self.queue.claim(free):
+                        if not self._adopt(running, entry):
+                            print(f"[WORKER] Uploading {entry.folder}")
+                            future = executor.submit(self._upload, entry)
+                            running[future] = entry
+                            future.add_done_callback(lambda _: wakeup.set())
+                    self._claimed.set()
+
+                if not running and stop_when_empty:
+                    return
+                # Woken by a finished upload or a queue write, or when leases
+                # are due for renewal.  Renewal goes by the clock rather than
+                # by how the wait ended, since a busy pool is woken constantly;
+                # waking up also picks up entries whose lease expired in a
+                # crashed consumer.
+                wakeup.wait(max(0.0, next_renew - time.monotonic()))
+                if time.monotonic() >= next_renew:
+                    self._renew(running)
+                    next_renew = time.monotonic() + renew_every
+
+    @staticmethod
+    def _adopt(running, entry: Entry) -> bool:
+        """Keep uploading ``entry`` under its new lease if it is already running here.
+
+        Returns whether it was; a lapsed lease can come back to the same pool.
+        """
+        for future, held in running.items():
+            if held.offset == entry.offset:
+                running[future] = entry
+                return True
+        return False
+
+    def _renew(self, running) -> None:
+        if not running:
+            return
+        renewed = {entry.offset: entry for entry in self.queue.renew(running.values())}
+        for future, entry in running.items():
+            if entry.offset in renewed:
+                running[future] = renewed[entry.offset]
+            else:
+                print(f"[WORKER] Lost lease on {entry.folder}; another worker may redo it")
+
+    def _finish(self, entry: Entry, future) -> None:
+        try:
+            sent = future.result()
+        except FileNotFoundError as e:
+            if os.path.isdir(entry.folder):
+                # A file inside went missing, or the target's did; worth a retry
+                print(f"[WORKER] Upload of {entry.folder} failed: {e}")
+                self.queue.nack(entry)
+            else:
+                # Folder is gone; retrying cannot succeed
+                print(f"[WORKER] Skipping missing folder {entry.folder}")
+                self.queue.ack(entry)
+        except Exception as e:
+            print(f"[WORKER] Upload of {entry.folder} failed: {e}")
+            self.queue.nack(entry)
+        else:
+            if self.queue.ack(entry):
+                print(f"[WORKER] Uploaded {entry.folder} ({sent} bytes)")
+            else:
+                print(f"[WORKER] Uploaded {entry.folder}, but its lease had already expired")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queue", default="shared_queue.txt")
+    parser.add_argument("--target", default="uploaded", help="local directory standing in for the upload target")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--lease", type=float, default=LEASE_SECONDS, help="seconds before an unrenewed claim is redelivered")
+    parser.add_argument("--once", action="store_true", help="exit when the queue is empty")
+    args = parser.parse_args()
+
+    queue = FolderQueue(args.queue, lease_seconds=args.lease)
+    pool = UploadPool(queue, LocalUploadTarget(args.target), args.concurrency, args.chunk_size)
+    print(f"[WORKER] Starting {args.concurrency} upload workers on {args.queue}")
+    pool.run(stop_when_empty=args.once)
+
+
+if __name__ == "__main__":
+    main()